@@ -1,6 +1,10 @@
+import uuid
 import streamlit as st
 import pandas as pd
-from utils.data_generator import generate_forex_data
+from utils.data_generator import load_forex_data
+from utils.portfolio_ledger import PortfolioLedger
+from utils.trade_journal import get_trade_journal
+from utils.startup import start_warm_up
 
 st.set_page_config(
     page_title="Forex Trading Platform",
@@ -10,13 +14,17 @@ st.set_page_config(
 
 st.title("Forex Trading Platform")
 
+# Each session trades its own journal account; the account is kept in the URL so a reload resumes it
+account = st.query_params.get('account')
+if not account:
+    account = st.query_params['account'] = uuid.uuid4().hex[:12]
+
 # Initialize session state
 if 'portfolio' not in st.session_state:
-    st.session_state.portfolio = {
-        'balance': 100000.0,
-        'positions': [],
-        'history': []
-    }
+    # Pick up balances and positions from the account's last snapshot
+    st.session_state.portfolio = PortfolioLedger.restore(get_trade_journal(), account=account,
+                                                         initial_balance=100000.0)
+st.sidebar.caption(f"Account {st.session_state.portfolio.account}")
 
 if 'selected_pair' not in st.session_state:
     st.session_state.selected_pair = 'EUR/USD'
@@ -26,7 +34,7 @@ currency_pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF']
 selected_pair = st.selectbox('Select Currency Pair', currency_pairs)
 
 # Generate mock data
-df = generate_forex_data(selected_pair)
+df = load_forex_data(selected_pair)
 
 # Display current price
 current_price = df['Close'].iloc[-1]
@@ -50,3 +58,6 @@ st.markdown("""
 
 Navigate through the pages on the sidebar to access different features.
 """)
+
+# Preload modules, data and signals for the other pages once per server process
+start_warm_up()
@@ -1,51 +1,99 @@
 import streamlit as st
-import plotly.graph_objects as go
-from utils.data_generator import generate_forex_data
-from utils.trading import execute_trade
+from utils.data_generator import load_forex_data
+from utils.trading import execute_trade, check_exit_triggers
+from utils.risk import get_risk_engine
+from utils.trading_signals import generate_trading_signals
+from utils.indicator_cache import indicator_cache
+from utils.instrumentation import set_labels, session_id
+from utils.charts import VIEW_WINDOWS, figure_cache, visible_slice
+from utils.market_simulator import TIMEFRAMES, max_periods
 
 st.title("Trading Dashboard")
 
 # Currency pair selection
 currency_pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF']
 selected_pair = st.selectbox('Select Currency Pair', currency_pairs)
+set_labels(pair=selected_pair, session=session_id())
+
+# History to load and the part of it the chart shows
+timeframe = st.sidebar.selectbox('Timeframe', list(TIMEFRAMES), index=list(TIMEFRAMES).index('1D'))
+history = st.sidebar.selectbox('History (bars)', [100, 1_000, 10_000, 100_000, 500_000])
+view = st.sidebar.selectbox('Chart range', list(VIEW_WINDOWS), index=list(VIEW_WINDOWS).index('All'))
+source = f'{timeframe}:{history}'
 
 # Generate mock data
-df = generate_forex_data(selected_pair)
+df = load_forex_data(selected_pair, min(history, max_periods(timeframe)), timeframe)
+
+# Optionally read one-minute bars from the background ingestion pipeline
+if st.sidebar.checkbox("Live simulated feed"):
+    from utils.ingestion import get_ingestion_pipeline  # asyncio and the feed load only when used
+    pipeline = get_ingestion_pipeline(currency_pairs, timeframes=('1m',))
+    live_df = pipeline.bars(selected_pair, '1m', 100)
+    if len(live_df) >= 2:
+        df = live_df
+        source = 'live:1m'
+    else:
+        st.sidebar.info("Waiting for the first completed bars from the feed")
+    st.sidebar.json(pipeline.metrics.as_dict())
+
 current_price = df['Close'].iloc[-1]
 
+# Fire any stop-loss/take-profit exits crossed by the latest price
+for fill in check_exit_triggers(selected_pair, current_price):
+    st.info(f"Exit triggered: {fill.side} {fill.amount:g} {fill.pair} at {fill.price:.4f}")
+
+signals = indicator_cache.compute(df, generate_trading_signals)
+portfolio = st.session_state.portfolio
+risk_engine = get_risk_engine(currency_pairs)
+
 # Trading interface
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Market Order")
-    trade_amount = st.number_input("Amount", min_value=0.01, value=1.0, step=0.01)
-    trade_value = trade_amount * current_price
+
+    # Protective exits taken from the current trading signal
+    use_signal_exits = False
+    if signals['action'] != 'hold' and signals['stop_loss'] is not None:
+        use_signal_exits = st.checkbox(
+            f"Attach signal exits (stop {signals['stop_loss']:.4f}, target {signals['take_profit']:.4f})"
+        )
+
+    # Size the order so hitting the signal's stop loses a fixed share of equity
+    stop_for_sizing = signals['stop_loss'] if signals['stop_loss'] is not None else signals['metrics']['support']
+    suggested = risk_engine.size(portfolio.equity, current_price, stop_for_sizing)
+    if suggested > 0 and st.checkbox(f"Size from stop distance ({risk_engine.limits['risk_per_trade']:.0%} of equity at risk)"):
+        trade_amount = st.number_input("Amount", min_value=0.01, value=round(max(suggested, 0.01), 2), step=0.01)
+    else:
+        trade_amount = st.number_input("Amount", min_value=0.01, value=1.0, step=0.01)
+    stop_loss = signals['stop_loss'] if use_signal_exits else None
+    take_profit = signals['take_profit'] if use_signal_exits else None
     
     col1a, col1b = st.columns(2)
     with col1a:
         if st.button("Buy"):
-            success, message = execute_trade('buy', trade_amount, current_price, selected_pair)
+            success, message = execute_trade('buy', trade_amount, current_price, selected_pair,
+                                             stop_loss, take_profit)
             st.write(message)
     
     with col1b:
         if st.button("Sell"):
-            success, message = execute_trade('sell', trade_amount, current_price, selected_pair)
+            success, message = execute_trade('sell', trade_amount, current_price, selected_pair,
+                                             stop_loss, take_profit)
             st.write(message)
 
 with col2:
     st.subheader("Account Information")
-    st.write(f"Available Balance: ${st.session_state.portfolio['balance']:.2f}")
-    st.write(f"Number of Positions: {len(st.session_state.portfolio['positions'])}")
-
-# Candlestick chart
-fig = go.Figure(data=[go.Candlestick(x=df['Date'],
-                open=df['Open'],
-                high=df['High'],
-                low=df['Low'],
-                close=df['Close'])])
-
-fig.update_layout(title=f'{selected_pair} Price Chart',
-                 yaxis_title='Price',
-                 xaxis_title='Date')
+    st.write(f"Available Balance: ${portfolio.balance:.2f}")
+    st.write(f"Number of Positions: {portfolio.open_position_count()}")
+
+    risk = risk_engine.report(portfolio)
+    st.write(f"Equity: ${risk['equity']:.2f} (leverage {risk['leverage']:.2f}x)")
+    st.write(f"1-day 99% VaR: ${risk['var']:.2f} parametric, ${risk['historical_var']:.2f} historical")
+    st.write(f"Expected Shortfall: ${risk['es']:.2f} parametric, ${risk['historical_es']:.2f} historical")
+
+# Candlestick chart, downsampled and updated in place as bars arrive
+chart = figure_cache.price_chart(('trading', selected_pair, source, view), f'{selected_pair} Price Chart')
+fig = chart.render(visible_slice(df, view))
 
 st.plotly_chart(fig, use_container_width=True)
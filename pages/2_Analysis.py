@@ -1,20 +1,35 @@
 import streamlit as st
-import plotly.graph_objects as go
-from utils.data_generator import generate_forex_data
+import pandas as pd
+from utils.data_generator import load_forex_data
 from utils.technical_analysis import calculate_sma, calculate_ema, calculate_rsi, calculate_macd
-from utils.trading_signals import generate_trading_signals
+from utils.trading_signals import generate_trading_signals, generate_multi_timeframe_signals, trend_direction
+from utils.timeframes import get_timeframe_pyramid
+from utils.indicator_cache import indicator_cache
+from utils.streaming_indicators import get_streaming_indicators
+from utils.instrumentation import set_labels, session_id
+from utils.charts import MAX_POINTS, VIEW_WINDOWS, figure_cache, heatmap_figure, visible_slice
+from utils.correlation import DEDUPE_PENALTY, DEDUPE_THRESHOLD, WINDOWS, dedupe_table, get_correlation_engine
+from utils.patterns import detect_patterns
+from utils.market_simulator import TIMEFRAMES, max_periods
 
 st.title("Smart Trading Analysis")
 
 # Currency pair selection
 currency_pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF']
 selected_pair = st.selectbox('Select Currency Pair', currency_pairs)
+set_labels(pair=selected_pair, session=session_id())
+
+# History to load and the part of it the charts show
+timeframe = st.sidebar.selectbox('Timeframe', list(TIMEFRAMES), index=list(TIMEFRAMES).index('1D'))
+history = st.sidebar.selectbox('History (bars)', [100, 1_000, 10_000, 100_000, 500_000])
+view = st.sidebar.selectbox('Chart range', list(VIEW_WINDOWS), index=list(VIEW_WINDOWS).index('All'))
 
 # Generate mock data
-df = generate_forex_data(selected_pair)
+df = load_forex_data(selected_pair, min(history, max_periods(timeframe)), timeframe)
 
-# Generate trading signals
-signals = generate_trading_signals(df)
+# Generate trading signals; the streaming engine only folds in bars appended since the last rerun
+stream = get_streaming_indicators(selected_pair, timeframe, df)
+signals = generate_trading_signals(df, indicators=stream)
 
 # Display trading signals with confidence score
 st.subheader("Trading Signals")
@@ -71,6 +86,31 @@ with col3:
 with col4:
     st.metric("Volume Trend", metrics['volume_trend'].replace('_', ' ').title())
 
+# Multi-timeframe view: 1m bars rolled up into every higher timeframe
+st.subheader("Multi-Timeframe Analysis")
+pyramid = get_timeframe_pyramid(selected_pair)
+entry_timeframe = st.selectbox('Entry Timeframe', pyramid.order[1:], index=pyramid.order.index('1h') - 1)
+frames = pyramid.frames(pyramid.order[1:])
+mtf_signals = generate_multi_timeframe_signals(frames, entry_timeframe)
+
+st.dataframe(pd.DataFrame([{
+    'Timeframe': tf,
+    'Bars': len(data),
+    'Close': data['Close'].iloc[-1],
+    'Trend': trend_direction(data).capitalize(),
+    'RSI': pyramid.compute(tf, calculate_rsi).iloc[-1],
+} for tf, data in frames.items()]), use_container_width=True)
+
+col1, col2 = st.columns(2)
+with col1:
+    st.metric(f"{entry_timeframe} Signal",
+              f"{mtf_signals['action'].upper()} ({mtf_signals['strength']})",
+              f"{mtf_signals['confidence']}% confidence", delta_color='off')
+with col2:
+    st.metric("Trend Alignment", f"{mtf_signals['metrics']['trend_alignment']:+.2f}")
+for reason in mtf_signals['reasoning']:
+    st.markdown(f"• {reason}")
+
 # Technical indicator selection
 indicators = st.multiselect(
     'Select Technical Indicators',
@@ -78,79 +118,74 @@ indicators = st.multiselect(
     default=['SMA', 'RSI']
 )
 
-# Create the base price chart
-fig = go.Figure()
-
-# Add candlestick chart
-fig.add_trace(go.Candlestick(
-    x=df['Date'],
-    open=df['Open'],
-    high=df['High'],
-    low=df['Low'],
-    close=df['Close'],
-    name='Price'
-))
-
-# Add selected indicators
+# Add selected indicators, computed on the full history and windowed with it
+overlays = {}
 if 'SMA' in indicators:
     sma_period = st.sidebar.slider('SMA Period', 5, 50, 20)
-    sma = calculate_sma(df, sma_period)
-    fig.add_trace(go.Scatter(x=df['Date'], y=sma, name=f'SMA-{sma_period}'))
+    overlays[f'SMA-{sma_period}'] = indicator_cache.compute(df, calculate_sma, sma_period)
 
 if 'EMA' in indicators:
     ema_period = st.sidebar.slider('EMA Period', 5, 50, 20)
-    ema = calculate_ema(df, ema_period)
-    fig.add_trace(go.Scatter(x=df['Date'], y=ema, name=f'EMA-{ema_period}'))
-
-# Add support and resistance levels
-fig.add_hline(y=metrics['support'], line_dash="dash", line_color="green", annotation_text="Support")
-fig.add_hline(y=metrics['resistance'], line_dash="dash", line_color="red", annotation_text="Resistance")
-
-# Update chart layout
-fig.update_layout(
-    title=f'{selected_pair} Technical Analysis',
-    yaxis_title='Price',
-    xaxis_title='Date',
-    template='plotly_dark'
-)
+    overlays[f'EMA-{ema_period}'] = indicator_cache.compute(df, calculate_ema, ema_period)
+
+visible = visible_slice(df, view)
+start = len(df) - len(visible)
+key = (selected_pair, f'{timeframe}:{history}', view)
+
+# Price chart with support and resistance levels, downsampled and updated in place
+chart = figure_cache.price_chart(('analysis', *key, tuple(overlays)),
+                                 f'{selected_pair} Technical Analysis', template='plotly_dark')
+fig = chart.render(visible,
+                   {name: values.to_numpy()[start:] for name, values in overlays.items()},
+                   [(metrics['support'], 'green', 'Support'), (metrics['resistance'], 'red', 'Resistance')])
+
+# Mark chart pattern events from the full-history scan inside the visible range
+if st.sidebar.checkbox('Show chart patterns'):
+    events = indicator_cache.compute(df, detect_patterns)
+    events = events[events['bar'] >= start].tail(MAX_POINTS)
+    for bias, color, symbol in (('bullish', 'green', 'triangle-up'), ('bearish', 'red', 'triangle-down'),
+                                ('neutral', 'gray', 'diamond')):
+        marked = events[events['bias'] == bias]
+        fig['data'].append({'type': 'scatter', 'mode': 'markers', 'name': f'{bias.title()} patterns',
+                            'x': marked['Date'].tolist(), 'y': marked['level'].tolist(),
+                            'text': marked['pattern'].tolist(),
+                            'marker': {'color': color, 'symbol': symbol, 'size': 9}})
+    st.caption(f"{len(events)} pattern events in range")
 
 st.plotly_chart(fig, use_container_width=True)
 
 # Display RSI and MACD in separate charts if selected
 if 'RSI' in indicators:
-    rsi = calculate_rsi(df)
-    fig2 = go.Figure()
-    fig2.add_trace(go.Scatter(x=df['Date'], y=rsi, name='RSI'))
-    fig2.add_hline(y=70, line_dash="dash", line_color="red")
-    fig2.add_hline(y=30, line_dash="dash", line_color="green")
-    fig2.update_layout(
-        title='Relative Strength Index (RSI)',
-        template='plotly_dark'
-    )
+    rsi = indicator_cache.compute(df, calculate_rsi)
+    fig2 = figure_cache.line_figure(('rsi', *key), visible['Date'], {'RSI': rsi.to_numpy()[start:]},
+                                    'Relative Strength Index (RSI)',
+                                    levels=[(70, 'red'), (30, 'green')], template='plotly_dark')
     st.plotly_chart(fig2, use_container_width=True)
 
 if 'MACD' in indicators:
-    macd, signal = calculate_macd(df)
-    fig3 = go.Figure()
-    fig3.add_trace(go.Scatter(x=df['Date'], y=macd, name='MACD'))
-    fig3.add_trace(go.Scatter(x=df['Date'], y=signal, name='Signal'))
-    fig3.update_layout(
-        title='MACD',
-        template='plotly_dark'
-    )
+    macd, signal = indicator_cache.compute(df, calculate_macd)
+    fig3 = figure_cache.line_figure(('macd', *key), visible['Date'],
+                                    {'MACD': macd.to_numpy()[start:], 'Signal': signal.to_numpy()[start:]},
+                                    'MACD', template='plotly_dark')
     st.plotly_chart(fig3, use_container_width=True)
 
 # Add volume analysis
 st.subheader("Volume Analysis")
-fig4 = go.Figure()
-fig4.add_trace(go.Bar(
-    x=df['Date'],
-    y=df['Volume'],
-    name='Volume',
-    marker_color='rgba(0,150,255,0.5)'
-))
-fig4.update_layout(
-    title='Trading Volume',
-    template='plotly_dark'
-)
-st.plotly_chart(fig4, use_container_width=True)
\ No newline at end of file
+fig4 = figure_cache.line_figure(('volume', *key), visible['Date'], {'Volume': visible['Volume'].to_numpy()},
+                                'Trading Volume', template='plotly_dark', kind='bar')
+st.plotly_chart(fig4, use_container_width=True)
+
+# Cross-pair correlation, updated bar by bar for the whole pair universe
+st.subheader("Cross-Pair Correlation")
+correlation_window = st.selectbox('Correlation Window (bars)', WINDOWS, index=WINDOWS.index(60))
+correlations = get_correlation_engine(timeframe=timeframe).correlation_frame(correlation_window)
+st.plotly_chart(heatmap_figure(correlations, f'{correlation_window}-bar Return Correlation ({timeframe})',
+                               template='plotly_dark'), use_container_width=True)
+
+# Signals that are the same move on correlated pairs (e.g. long EUR/USD and short USD/CHF) count once
+pair_signals = {pair: signals if pair == selected_pair else indicator_cache.compute(
+                    load_forex_data(pair, min(history, max_periods(timeframe)), timeframe), generate_trading_signals)
+                for pair in currency_pairs}
+st.dataframe(dedupe_table(pair_signals, correlations), use_container_width=True)
+st.caption(f"Buy and sell signals whose direction-adjusted correlation with a more confident one exceeds "
+           f"{DEDUPE_THRESHOLD:.1f} lose {DEDUPE_PENALTY} confidence points.")
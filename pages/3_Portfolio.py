@@ -4,6 +4,8 @@ from utils.trading import get_portfolio_value
 
 st.title("Portfolio Dashboard")
 
+portfolio = st.session_state.portfolio
+
 # Display account summary
 total_value = get_portfolio_value()
 st.metric("Total Portfolio Value", f"${total_value:.2f}")
@@ -12,32 +14,35 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Available Balance")
-    st.write(f"${st.session_state.portfolio['balance']:.2f}")
+    st.write(f"${portfolio.balance:.2f}")
 
 with col2:
     st.subheader("Open Positions")
-    st.write(len(st.session_state.portfolio['positions']))
+    st.write(portfolio.open_position_count())
 
 # Display open positions
-if st.session_state.portfolio['positions']:
+if portfolio.open_position_count():
     st.subheader("Current Positions")
-    positions_df = pd.DataFrame(st.session_state.portfolio['positions'])
-    st.dataframe(positions_df)
+    st.dataframe(portfolio.positions_frame())
 
-# Display trading history
-if st.session_state.portfolio['history']:
+# Display trading history, newest first, one page at a time
+if portfolio.trade_count:
     st.subheader("Trading History")
-    history_df = pd.DataFrame(st.session_state.portfolio['history'])
+    page_size = 100
+    pages = (portfolio.trade_count - 1) // page_size + 1
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+    history_df, total = portfolio.history_page(page - 1, page_size)
     st.dataframe(history_df)
+    st.caption(f"Page {page} of {pages} ({total} trades)")
 
 # Performance metrics
-if st.session_state.portfolio['history']:
+if portfolio.trade_count:
     st.subheader("Performance Metrics")
     
-    # Calculate basic metrics
-    total_trades = len(st.session_state.portfolio['history'])
-    buy_trades = len([t for t in st.session_state.portfolio['history'] if t['side'] == 'buy'])
-    sell_trades = total_trades - buy_trades
+    # Counters are maintained incrementally by the ledger
+    total_trades = portfolio.trade_count
+    buy_trades = portfolio.buy_count
+    sell_trades = portfolio.sell_count
     
     col1, col2, col3 = st.columns(3)
     
@@ -47,5 +52,11 @@ if st.session_state.portfolio['history']:
         st.metric("Buy Trades", buy_trades)
     with col3:
         st.metric("Sell Trades", sell_trades)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Realized PnL", f"${portfolio.realized_pnl:.2f}")
+    with col2:
+        st.metric("Unrealized PnL", f"${portfolio.unrealized_pnl:.2f}")
 else:
     st.info("No trading history available yet. Start trading to see your performance metrics.")
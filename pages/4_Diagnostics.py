@@ -0,0 +1,63 @@
+import streamlit as st
+import pandas as pd
+from utils import instrumentation, startup
+from utils.data_generator import load_forex_data
+from utils.trading_signals import generate_trading_signals
+
+st.title("Diagnostics")
+
+if not instrumentation.ENABLED:
+    st.info("Instrumentation is disabled (FOREX_INSTRUMENTATION=0).")
+    st.stop()
+
+registry = instrumentation.registry
+
+# Per-stage latency, optionally broken down by pair and session
+breakdown = st.multiselect("Break down by", ['pair', 'session'])
+summary = pd.DataFrame(registry.summary(('stage', *breakdown)))
+
+if summary.empty:
+    st.info("No spans recorded yet. Open the Trading or Analysis page to collect timings.")
+else:
+    st.subheader("Stage Latency (ms)")
+    timing_columns = ['total', 'mean', 'p50', 'p95', 'p99', 'max']
+    summary[timing_columns] = summary[timing_columns] * 1000
+    st.dataframe(summary.sort_values('total', ascending=False), use_container_width=True)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.download_button("Prometheus metrics", registry.to_prometheus(), "metrics.txt", "text/plain")
+with col2:
+    st.download_button("JSON metrics", registry.to_json(), "metrics.json", "application/json")
+with col3:
+    if st.button("Reset metrics"):
+        registry.clear()
+        st.rerun()
+
+# Server warm-up (utils.startup)
+warm_up = startup.warm_up_status()
+if warm_up['stages']:
+    st.subheader(f"Warm-up ({warm_up['state']})")
+    st.dataframe(pd.DataFrame({'stage': list(warm_up['stages']),
+                               'seconds': list(warm_up['stages'].values())}), use_container_width=True)
+
+# On-demand profiling
+st.subheader("Profile Capture")
+mode = st.radio("Mode", ['cProfile signal pipeline', 'Sample all sessions'], horizontal=True)
+
+if mode == 'cProfile signal pipeline':
+    pair = st.selectbox('Currency Pair', ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF'])
+    periods = st.number_input("Bars", min_value=100, max_value=1_000_000, value=10_000, step=1000)
+    if st.button("Capture"):
+        df = load_forex_data(pair, periods)
+        _, stats = instrumentation.profile_call(generate_trading_signals, df)
+        st.code(stats)
+else:
+    duration = st.slider("Seconds", 1, 30, 5)
+    if st.button("Capture"):
+        with st.spinner(f"Sampling every thread for {duration}s"):
+            samples = instrumentation.sample_stacks(duration)
+        total = sum(samples.values())
+        rows = [{'samples': n, 'share': n / total, 'stack': ' <- '.join(stack)}
+                for stack, n in samples.most_common(50)]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
@@ -0,0 +1,79 @@
+import streamlit as st
+import pandas as pd
+from utils.alerts import HISTORY, OPERANDS, get_alert_engine
+from utils.data_generator import load_forex_data
+from utils.market_simulator import TIMEFRAMES
+
+st.title("Watchlist Alerts")
+
+currency_pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF']
+engine = get_alert_engine()
+
+# Register a rule; the engine is shared, so every session sees it
+with st.form("add_rule", clear_on_submit=True):
+    expression = st.text_input("Condition", placeholder="adx > 25 and trend == bullish")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        name = st.text_input("Name (optional)")
+    with col2:
+        pairs = st.multiselect("Pairs", currency_pairs, default=currency_pairs)
+    with col3:
+        timeframe = st.selectbox("Timeframe", list(TIMEFRAMES), index=list(TIMEFRAMES).index('1h'))
+    if st.form_submit_button("Add rule") and expression:
+        try:
+            engine.add_rule(expression, None if set(pairs) == set(currency_pairs) else pairs, timeframe, name or None)
+        except ValueError as e:
+            st.error(str(e))
+st.caption("Join clauses with 'and': `rsi < 30`, `macd crosses above signal`, `close within 0.5% of support`, "
+           f"`ema(20) > ema(50)`. Operands: {', '.join(OPERANDS)}, numbers and bullish/neutral/bearish.")
+
+rules = engine.rule_table()
+if rules.empty:
+    st.info("No rules yet. Add one above to start watching every pair.")
+    st.stop()
+
+st.subheader("Rules")
+st.dataframe(rules, use_container_width=True, hide_index=True)
+remove = st.selectbox("Remove rule", [None, *rules['id']],
+                      format_func=lambda rule_id: '' if rule_id is None else f"{rule_id}: {engine.rules[rule_id]['name']}")
+if remove is not None and st.button("Remove"):
+    engine.remove_rule(remove)
+    st.rerun()
+
+# Once attached, the live feed is the only source of 1m bars (for every session: the engine is shared)
+if st.sidebar.checkbox("Watch the live simulated feed (1m bars)", value='1m' in engine.live_timeframes):
+    from utils.ingestion import get_ingestion_pipeline  # asyncio and the feed load only when used
+    engine.attach(get_ingestion_pipeline(currency_pairs, timeframes=('1m',)).aggregator)
+
+# Fold in bars newer than each watched stream's last; a stream's first history only warms it up
+for rule_timeframe in rules['timeframe'].unique():
+    if rule_timeframe in engine.live_timeframes:
+        continue
+    for pair in currency_pairs:
+        if engine.watching(pair, rule_timeframe):
+            warm = (pair, rule_timeframe) not in engine.streams
+            engine.feed(pair, rule_timeframe, load_forex_data(pair, HISTORY, rule_timeframe), alert=not warm)
+if engine.live_timeframes:
+    st.caption(f"{', '.join(sorted(engine.live_timeframes))} rules run on live bars only; "
+               "their indicators warm up as the feed completes bars.")
+
+st.subheader("Matching Now")
+matches = engine.matches()
+if matches.empty:
+    st.write("No rule holds on the latest bar.")
+else:
+    st.dataframe(matches, use_container_width=True, hide_index=True)
+
+st.subheader("Recent Alerts")
+recent = list(engine.recent)[::-1]
+if recent:
+    st.dataframe(pd.DataFrame([{**{key: alert[key] for key in ('time', 'pair', 'timeframe', 'name', 'close')},
+                                'values': ', '.join(f"{k}={v:.4g}" for k, v in alert['values'].items())}
+                               for alert in recent]), use_container_width=True, hide_index=True)
+else:
+    st.write("No alerts yet; rules alert on the bar they turn true.")
+
+stats = engine.stats
+st.caption(f"{stats['bars']:,} bars evaluated against {len(rules)} rules "
+           f"({stats['evaluations']:,} rule checks, {stats['alerts']:,} alerts, {stats['dropped']:,} dropped "
+           f"from the queue)")
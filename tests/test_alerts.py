@@ -0,0 +1,31 @@
+import pandas as pd
+
+from utils.alerts import AlertEngine
+from utils.market_simulator import generate_market_data
+
+
+def _bars(end, periods=300):
+    return generate_market_data(['EUR/USD'], periods, '1h', end=end)['EUR/USD']
+
+
+def _closes(engine):
+    return [bar[3] for bar in engine.streams[('EUR/USD', '1h')].history]
+
+
+def test_feed_appends_only_newer_bars():
+    engine = AlertEngine()
+    engine.add_rule('rsi < 30', timeframe='1h')
+    data = _bars('2026-01-05 10:00', 301)
+    engine.feed('EUR/USD', '1h', data.iloc[:300], alert=False)
+    engine.feed('EUR/USD', '1h', data)
+    assert _closes(engine) == data['Close'].tolist()
+
+
+def test_feed_restarts_stream_on_regenerated_history():
+    # Synthetic data regenerates the same path on new dates: the last bar seen now has another close
+    engine = AlertEngine()
+    engine.add_rule('rsi < 30', timeframe='1h')
+    engine.feed('EUR/USD', '1h', _bars('2026-01-05 10:00'), alert=False)
+    moved = _bars('2026-01-05 11:00')
+    assert engine.feed('EUR/USD', '1h', moved) == []
+    assert _closes(engine) == moved['Close'].tolist()
@@ -0,0 +1,26 @@
+import numpy as np
+
+from utils.backtest import compute_signal_history
+from utils.market_simulator import get_forex_data
+from utils.trading_signals import find_support_resistance
+
+LOOSE = {'rsi_oversold': 60, 'rsi_overbought': 40, 'adx_threshold': 15}
+
+
+def test_level_stops_match_live_signal_without_lookahead():
+    data = get_forex_data('EUR/USD', 5000, timeframe='1h')
+    history = compute_signal_history(data, **LOOSE)
+    signals = np.flatnonzero(history['action'].to_numpy() != 'hold')
+    assert len(signals)
+    for bar in signals:
+        support, resistance = find_support_resistance(data.iloc[:bar + 1])
+        expected = support if history['action'].iloc[bar] == 'buy' else resistance
+        assert np.isclose(history['stop_loss'].iloc[bar], expected)
+
+
+def test_window_stops_use_trailing_extremes():
+    data = get_forex_data('EUR/USD', 5000, timeframe='1h')
+    history = compute_signal_history(data, stops='window', **LOOSE)
+    buys = np.flatnonzero(history['action'].to_numpy() == 'buy')
+    expected = data['Low'].rolling(20).min().to_numpy()[buys]
+    np.testing.assert_allclose(history['stop_loss'].to_numpy()[buys], expected)
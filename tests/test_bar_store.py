@@ -0,0 +1,40 @@
+import pandas as pd
+
+from utils import bar_store
+from utils.bar_store import BarStore
+from utils.data_generator import load_forex_data
+from utils.ingestion import BarAggregator, Tick
+from utils.market_simulator import get_forex_data
+
+
+def test_load_forex_data_reads_generated_history(tmp_path):
+    store = BarStore(str(tmp_path))
+    assert bar_store.main(['--root', str(tmp_path), 'generate', '--pairs', 'EUR/USD',
+                           '--timeframes', '1h', '--periods', '500']) == 0
+    assert store.count('EUR/USD', '1h') == 500
+    data = load_forex_data('EUR/USD', 200, '1h', store=store)
+    pd.testing.assert_frame_equal(data, store.tail('EUR/USD', '1h', 200))
+    # Generating again only adds bars newer than the stored ones
+    assert bar_store.generate_history(store, ['EUR/USD'], ['1h'], 500) == 0
+
+
+def test_import_csv(tmp_path):
+    store = BarStore(str(tmp_path / 'store'))
+    path = tmp_path / 'bars.csv'
+    get_forex_data('GBP/USD', 300, timeframe='1D').to_csv(path, index=False)
+    assert bar_store.import_csv(store, path, 'GBP/USD', '1D') == 300
+    assert load_forex_data('GBP/USD', 300, '1D', store=store)['Close'].iloc[-1] == store.last_bar('GBP/USD', '1D')[1]
+
+
+def test_attach_persists_completed_bars(tmp_path):
+    store = BarStore(str(tmp_path))
+    aggregator = BarAggregator(('1m', '5m'))
+    store.attach(aggregator)
+    start = pd.Timestamp('2026-01-05 09:00').value
+    for minute in range(4):
+        for second in (0, 30):
+            aggregator.add_tick(Tick('EUR/USD', start + (60 * minute + second) * 10**9, 1.1, 1.1002, 1000.0))
+    # The fourth minute is still forming; 5m bars aren't persisted
+    assert store.count('EUR/USD', '1m') == 3
+    assert store.count('EUR/USD', '5m') == 0
+    assert store.last_bar('EUR/USD', '1m') == (pd.Timestamp('2026-01-05 09:02'), 1.1001)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from utils.charts import FigureCache, PriceChart
+from utils.market_simulator import get_forex_data
+
+
+def test_line_figure_rebuilds_when_values_change():
+    cache = FigureCache()
+    data = get_forex_data('EUR/USD', 500, timeframe='1h')
+    first = cache.line_figure('close', data['Date'], {'Close': data['Close']}, 'Close')
+    assert cache.line_figure('close', data['Date'], {'Close': data['Close'].copy()}, 'Close') is first
+    changed = cache.line_figure('close', data['Date'], {'Close': data['Close'] * 2}, 'Close')
+    assert changed is not first
+
+
+def test_price_chart_trims_bars_that_scroll_out_of_view():
+    data = get_forex_data('EUR/USD', 6000, timeframe='1h')
+    chart = PriceChart('EUR/USD', max_points=500)
+    chart.render(data.iloc[:5000].tail(4000))
+    for end in range(5010, 6001, 10):
+        window = data.iloc[:end].tail(4000)
+        chart.render(window)
+    dates = chart.columns['Date']
+    assert len(dates) <= 2 * chart.max_points
+    assert dates[0] >= np.datetime64(window['Date'].iloc[0])
+    assert dates[-1] <= np.datetime64(window['Date'].iloc[-1])
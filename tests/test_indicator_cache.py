@@ -0,0 +1,68 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+from utils.indicator_cache import IndicatorCache, fingerprint
+
+
+def _frame(n=1000):
+    return pd.DataFrame({'Close': np.linspace(1.0, 2.0, n), 'Volume': np.arange(n)})
+
+
+def test_fingerprint_is_memoized_per_frame():
+    cache = IndicatorCache()
+    data = _frame()
+    assert cache.fingerprint(data) == fingerprint(data)
+    assert cache.fingerprint(data) is cache.fingerprint(data)
+    # A frame with different columns is hashed again
+    data['Open'] = data['Close']
+    assert cache.fingerprint(data) == fingerprint(data)
+
+
+def test_fingerprint_memo_drops_dead_frames():
+    cache = IndicatorCache()
+    data = _frame()
+    cache.fingerprint(data)
+    cache.fingerprint(data.iloc[:10])
+    gc.collect()
+    assert len(cache._fingerprints) == 1
+    del data
+    gc.collect()
+    assert not cache._fingerprints
+
+
+def test_equal_frames_share_results():
+    cache = IndicatorCache()
+    calls = []
+
+    def last_close(data):
+        calls.append(1)
+        return data['Close'].iloc[-1]
+
+    cache.compute(_frame(), last_close)
+    cache.compute(_frame(), last_close)
+    assert len(calls) == 1
+
+
+def test_fingerprint_follows_in_place_edits():
+    cache = IndicatorCache()
+    data = _frame()
+    before = cache.fingerprint(data)
+    # A forming bar's close is updated in place
+    data.loc[len(data) - 1, 'Close'] = 3.0
+    assert cache.fingerprint(data) == fingerprint(data) != before
+    data.loc[:, 'Close'] *= 2
+    assert cache.fingerprint(data) == fingerprint(data)
+
+
+def test_edited_frame_gets_fresh_results():
+    cache = IndicatorCache()
+    data = _frame()
+
+    def last_close(data):
+        return data['Close'].iloc[-1]
+
+    assert cache.compute(data, last_close) == 2.0
+    data.loc[len(data) - 1, 'Close'] = 2.5
+    assert cache.compute(data, last_close) == 2.5
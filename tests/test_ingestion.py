@@ -0,0 +1,17 @@
+import pytest
+
+from utils import ingestion
+from utils.bar_store import BarStore
+
+
+def test_pipeline_rejects_different_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, '_pipeline', None)
+    monkeypatch.setattr(ingestion, '_pipeline_args', None)
+    monkeypatch.setattr(ingestion, 'get_bar_store', lambda: BarStore(str(tmp_path)))
+    monkeypatch.setattr(ingestion.IngestionPipeline, 'start_background', lambda self: None)
+    pipeline = ingestion.get_ingestion_pipeline(['EUR/USD', 'GBP/USD'], timeframes=('1m',))
+    assert ingestion.get_ingestion_pipeline(['EUR/USD', 'GBP/USD'], timeframes=['1m']) is pipeline
+    with pytest.raises(ValueError):
+        ingestion.get_ingestion_pipeline(['EUR/USD'], timeframes=('1m',))
+    with pytest.raises(ValueError):
+        ingestion.get_ingestion_pipeline(['EUR/USD', 'GBP/USD'], timeframes=('1m', '5m'))
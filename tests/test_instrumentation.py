@@ -0,0 +1,28 @@
+from utils.instrumentation import Registry
+
+
+def test_sessions_are_bounded_and_totals_kept():
+    registry = Registry(max_sessions=3)
+    for i in range(100):
+        registry.observe('signals', 0.001, pair='EUR/USD', session=f'session-{i}')
+    sessions = {key[2] for key in registry.snapshot()}
+    assert sessions == {'', 'session-97', 'session-98', 'session-99'}
+    assert registry.snapshot(('stage',))[('signals',)].count == 100
+
+
+def test_active_session_is_not_evicted():
+    registry = Registry(max_sessions=2)
+    registry.observe('signals', 0.001, session='busy')
+    for i in range(10):
+        registry.observe('signals', 0.001, session=f'visitor-{i}')
+        registry.observe('signals', 0.001, session='busy')
+    assert ('signals', '', 'busy') in registry.snapshot()
+
+
+def test_exports_have_no_session_label():
+    registry = Registry()
+    for session in ('a', 'b'):
+        registry.observe('signals', 0.002, pair='EUR/USD', session=session)
+    text = registry.to_prometheus()
+    assert 'session=' not in text
+    assert 'forex_stage_seconds_count{stage="signals",pair="EUR/USD"} 2' in text
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import kernels
+from utils.technical_analysis import calculate_ema, calculate_macd, calculate_rsi
+from utils.trading_signals import calculate_adx
+
+LENGTHS = (1, 2, 5, 13, 14, 15, 30, 500)
+NAN_PREFIX = 7
+
+
+def _ohlc(n, seed=0, nan_prefix=0):
+    """Random-walk OHLC frame, optionally with leading NaN bars"""
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    spread = np.abs(rng.normal(0, 0.001, (2, n)))
+    data = pd.DataFrame({'High': close + spread[0], 'Low': close - spread[1], 'Close': close})
+    data.iloc[:nan_prefix] = np.nan
+    return data
+
+
+# The pandas implementations the kernels replaced (technical_analysis and trading_signals before them)
+
+def _pandas_ema(data, period):
+    return data['Close'].ewm(span=period, adjust=False).mean()
+
+
+def _pandas_rsi(data, period=14):
+    delta = data['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def _pandas_macd(data):
+    exp1 = data['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = data['Close'].ewm(span=26, adjust=False).mean()
+    macd = exp1 - exp2
+    return macd, macd.ewm(span=9, adjust=False).mean()
+
+
+def _pandas_adx(data, period=14):
+    high, low, close = data['High'], data['Low'], data['Close']
+    tr = pd.DataFrame([abs(high - low), abs(high - close.shift()), abs(low - close.shift())]).max()
+    up_move = high - high.shift()
+    down_move = low.shift() - low
+    pos_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0)
+    neg_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0)
+    tr_smooth = tr.rolling(window=period).mean()
+    pos_di = 100 * (pd.Series(pos_dm).rolling(window=period).mean() / tr_smooth)
+    neg_di = 100 * (pd.Series(neg_dm).rolling(window=period).mean() / tr_smooth)
+    dx = 100 * abs(pos_di - neg_di) / (pos_di + neg_di)
+    return dx.rolling(window=period).mean(), pos_di, neg_di
+
+
+def _wilder(values, period):
+    """Wilder's smoothing by explicit loop: mean of the first period valid values, then alpha = 1/period"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < period:
+        return out
+    seed_at = valid[0] + period - 1
+    out[seed_at] = values[valid[0]:seed_at + 1].mean()
+    for i in range(seed_at + 1, len(values)):
+        out[i] = out[i - 1] + (values[i] - out[i - 1]) / period
+    return out
+
+
+def _wilder_rsi(close, period=14):
+    delta = np.diff(close)
+    gain = np.concatenate([[np.nan], _wilder(np.where(delta > 0, delta, 0.0), period)])
+    loss = np.concatenate([[np.nan], _wilder(np.where(delta < 0, -delta, 0.0), period)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + gain / loss)
+
+
+def _wilder_adx(high, low, close, period=14):
+    n = len(close)
+    tr = np.full(n, np.nan)
+    pos_dm = np.full(n, np.nan)
+    neg_dm = np.full(n, np.nan)
+    for i in range(1, n):
+        tr[i] = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        up, down = high[i] - high[i - 1], low[i - 1] - low[i]
+        pos_dm[i] = up if up > down and up > 0 else 0.0
+        neg_dm[i] = down if down > up and down > 0 else 0.0
+    tr_smooth = _wilder(tr, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos_di = 100 * _wilder(pos_dm, period) / tr_smooth
+        neg_di = 100 * _wilder(neg_dm, period) / tr_smooth
+        dx = 100 * np.abs(pos_di - neg_di) / (pos_di + neg_di)
+    return _wilder(dx, period), pos_di, neg_di
+
+
+def _close(a, b):
+    np.testing.assert_allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+@pytest.mark.parametrize('nan_prefix', (0, NAN_PREFIX))
+def test_ema_matches_pandas(n, nan_prefix):
+    data = _ohlc(n, nan_prefix=nan_prefix)
+    for period in (1, 3, 12, 26):
+        _close(kernels.ema(data['Close'].to_numpy(), period), _pandas_ema(data, period))
+        _close(calculate_ema(data, period), _pandas_ema(data, period))
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+@pytest.mark.parametrize('nan_prefix', (0, NAN_PREFIX))
+def test_rolling_mean_matches_pandas(n, nan_prefix):
+    close = _ohlc(n, nan_prefix=nan_prefix)['Close']
+    # Short windows are averaged directly, long ones through cumulative sums
+    for window in (1, 5, 14, 64, 65, 100):
+        _close(kernels.rolling_mean(close.to_numpy(), window), close.rolling(window).mean())
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+@pytest.mark.parametrize('nan_prefix', (0, NAN_PREFIX))
+def test_rsi_matches_pandas(n, nan_prefix):
+    data = _ohlc(n, nan_prefix=nan_prefix)
+    _close(kernels.rsi(data['Close'].to_numpy(), 14), _pandas_rsi(data, 14))
+    _close(calculate_rsi(data), _pandas_rsi(data))
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+@pytest.mark.parametrize('nan_prefix', (0, NAN_PREFIX))
+def test_adx_matches_pandas(n, nan_prefix):
+    data = _ohlc(n, nan_prefix=nan_prefix)
+    for got, expected in zip(calculate_adx(data), _pandas_adx(data)):
+        _close(got, expected)
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+def test_macd_matches_pandas(n):
+    data = _ohlc(n)
+    for got, expected in zip(calculate_macd(data), _pandas_macd(data)):
+        _close(got, expected)
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+@pytest.mark.parametrize('nan_prefix', (0, NAN_PREFIX))
+def test_rma_matches_wilder_loop(n, nan_prefix):
+    close = _ohlc(n, nan_prefix=nan_prefix)['Close'].to_numpy()
+    for period in (1, 5, 14):
+        _close(kernels.rma(close, period), _wilder(close, period))
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+def test_wilder_rsi(n):
+    data = _ohlc(n)
+    _close(calculate_rsi(data, 14, rsi_method='wilder'), _wilder_rsi(data['Close'].to_numpy(), 14))
+
+
+@pytest.mark.parametrize('n', LENGTHS)
+def test_wilder_adx(n):
+    data = _ohlc(n)
+    expected = _wilder_adx(*(data[name].to_numpy() for name in ('High', 'Low', 'Close')), 14)
+    for got, reference in zip(calculate_adx(data, 14, adx_method='wilder'), expected):
+        _close(got, reference)
+
+
+def test_true_range_and_directional_movement():
+    data = _ohlc(50)
+    high, low, close = (data[name].to_numpy() for name in ('High', 'Low', 'Close'))
+    tr = pd.DataFrame([abs(data['High'] - data['Low']), abs(data['High'] - data['Close'].shift()),
+                       abs(data['Low'] - data['Close'].shift())]).max()
+    _close(kernels.true_range(high, low, close), tr)
+    pos_dm, neg_dm = kernels.directional_movement(high, low)
+    up, down = np.diff(high), -np.diff(low)
+    _close(pos_dm[1:], np.where((up > down) & (up > 0), up, 0.0))
+    _close(neg_dm[1:], np.where((down > up) & (down > 0), down, 0.0))
+    assert pos_dm[0] == neg_dm[0] == 0.0
+
+
+@pytest.mark.parametrize('method', ('sma', 'wilder'))
+def test_two_dimensional_rows_match_one_dimensional(method):
+    frames = [_ohlc(300, seed=seed) for seed in range(4)]
+    high, low, close = (np.vstack([frame[name].to_numpy() for frame in frames]) for name in ('High', 'Low', 'Close'))
+    ema, rsi = kernels.ema(close, 20), kernels.rsi(close, 14, method)
+    adx = kernels.adx(high, low, close, 14, method)
+    for i, frame in enumerate(frames):
+        _close(ema[i], kernels.ema(close[i], 20))
+        _close(rsi[i], kernels.rsi(close[i], 14, method))
+        for got, expected in zip(adx, kernels.adx(high[i], low[i], close[i], 14, method)):
+            _close(got[i], expected)
+
+
+def test_ema_long_series_stays_stable():
+    # Long inputs go through many recurrence blocks; the result must not drift from pandas
+    data = _ohlc(100000, seed=3)
+    for period in (2, 50, 500):
+        _close(kernels.ema(data['Close'].to_numpy(), period), _pandas_ema(data, period))
+
+
+def test_unknown_methods_raise():
+    close = np.linspace(1.0, 2.0, 30)
+    with pytest.raises(ValueError):
+        kernels.rsi(close, 14, method='ema')
+    with pytest.raises(ValueError):
+        kernels.adx(close, close, close, 14, method='ema')
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from utils.levels import level_index, nearest_levels, nearest_support_resistance
+
+
+def _paths(rows, n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, (rows, n)), axis=1))
+    spread = np.abs(rng.normal(0, 0.001, (2, rows, n)))
+    return close + spread[0], close - spread[1], close
+
+
+@pytest.mark.parametrize('n', (2, 10, 11, 12, 60, 2000))
+@pytest.mark.parametrize('min_touches', (1, 3))
+def test_nearest_levels_match_level_index(n, min_touches):
+    high, low, close = _paths(50, n, seed=n)
+    support, resistance = nearest_levels(high, low, close, min_touches=min_touches)
+    for j in range(len(close)):
+        index = level_index(high[j], low[j], close[j])
+        expected = nearest_support_resistance(index, close[j, -1], low[j], high[j], min_touches)
+        assert (support[j], resistance[j]) == expected
+
+
+def test_nearest_levels_one_row():
+    high, low, close = _paths(1, 500)
+    index = level_index(high[0], low[0], close[0])
+    expected = nearest_support_resistance(index, close[0, -1], low[0], high[0])
+    assert tuple(np.concatenate(nearest_levels(high[0], low[0], close[0]))) == expected
@@ -0,0 +1,53 @@
+import pytest
+
+from utils.matching_engine import MatchingEngine
+
+
+@pytest.fixture
+def engine():
+    engine = MatchingEngine()
+    engine.update_price('EUR/USD', 1.10)
+    return engine
+
+
+def _long_with_exits(engine, amount=1000.0):
+    engine.submit('EUR/USD', 'buy', amount, owner='session')
+    return engine.attach_exits('EUR/USD', 'sell', amount, stop_loss=1.09, take_profit=1.12, owner='session')
+
+
+def test_stop_fires_on_open_position(engine):
+    _long_with_exits(engine)
+    fills = engine.update_price('EUR/USD', 1.085)
+    assert [(fill.side, fill.amount) for fill in fills] == [('sell', 1000.0)]
+    assert engine.positions[('EUR/USD', 'session')] == 0.0
+    # The take-profit sibling was cancelled with it
+    assert engine.update_price('EUR/USD', 1.13) == []
+
+
+def test_manual_close_cancels_exits(engine):
+    _long_with_exits(engine)
+    engine.submit('EUR/USD', 'sell', 1000.0, owner='session')
+    assert engine.update_price('EUR/USD', 1.085) == []
+    assert engine.positions[('EUR/USD', 'session')] == 0.0
+
+
+def test_reversal_cancels_exits(engine):
+    _long_with_exits(engine)
+    engine.submit('EUR/USD', 'sell', 3000.0, owner='session')
+    assert engine.update_price('EUR/USD', 1.125) == []
+    assert engine.positions[('EUR/USD', 'session')] == -2000.0
+
+
+def test_exit_is_capped_at_the_open_position(engine):
+    _long_with_exits(engine)
+    engine.submit('EUR/USD', 'sell', 600.0, owner='session')
+    fills = engine.update_price('EUR/USD', 1.085)
+    assert [fill.amount for fill in fills] == [pytest.approx(400.0)]
+    assert engine.positions[('EUR/USD', 'session')] == pytest.approx(0.0)
+
+
+def test_other_owners_do_not_affect_exits(engine):
+    _long_with_exits(engine)
+    engine.submit('EUR/USD', 'sell', 1000.0, owner='other')
+    fills = engine.update_price('EUR/USD', 1.085)
+    assert [(fill.owner, fill.amount) for fill in fills] == [('session', 1000.0)]
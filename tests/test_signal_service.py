@@ -0,0 +1,50 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.bar_store import BarStore
+from utils.signal_service import SignalService, serve
+
+
+@pytest.fixture
+def server(tmp_path):
+    service = SignalService(pairs=('EUR/USD', 'GBP/USD'), periods=100, max_workers=1,
+                            store=BarStore(str(tmp_path)))
+    server = serve(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.status, json.loads(response.read().decode().splitlines()[0])
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize('path', ('/signals', '/signals/stream'))
+def test_bad_requests_get_a_json_400(server, path):
+    service, url = server
+    status, body = _get(f"{url}{path}?pairs=EUR/USD,XXX/YYY")
+    assert status == 400 and 'XXX/YYY' in body['error']
+
+    def refresh(force=False):
+        raise ValueError("EUR/USD: expected 100 bars, got 10")
+
+    service.refresh = refresh
+    status, body = _get(f"{url}{path}?pairs=EUR/USD")
+    assert status == 400 and body['error'] == "EUR/USD: expected 100 bars, got 10"
+
+
+def test_signals_are_served(server):
+    _, url = server
+    status, body = _get(f"{url}/signals?pairs=EUR/USD")
+    assert status == 200 and body['EUR/USD']['signal']['action'] in ('buy', 'sell', 'hold')
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.streaming_indicators import StreamingIndicators
+from utils.technical_analysis import calculate_ema, calculate_macd, calculate_rsi, calculate_sma
+from utils.trading_signals import calculate_adx, generate_trading_signals
+
+
+def _bars(n, seed=0):
+    """Random-walk OHLCV bars on a one-minute grid"""
+    rng = np.random.default_rng(seed)
+    close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    spread = np.abs(rng.normal(0, 0.001, (2, n)))
+    return pd.DataFrame({
+        'Date': pd.date_range('2026-01-05', periods=n, freq='min'),
+        'Open': close, 'High': close + spread[0], 'Low': close - spread[1], 'Close': close,
+        'Volume': rng.integers(1000, 10000, n),
+    })
+
+
+def _batch(data):
+    adx, pos_di, neg_di = calculate_adx(data)
+    macd, signal = calculate_macd(data)
+    return {'sma': calculate_sma(data, 20).iloc[-1], 'ema': calculate_ema(data, 50).iloc[-1],
+            'rsi': calculate_rsi(data).iloc[-1], 'macd': macd.iloc[-1], 'macd_signal': signal.iloc[-1],
+            'adx': adx.iloc[-1], 'plus_di': pos_di.iloc[-1], 'minus_di': neg_di.iloc[-1]}
+
+
+def _streaming(engine):
+    values = engine.values
+    return {'sma': values['sma'][20], 'ema': values['ema'][50], 'rsi': values['rsi'], 'macd': values['macd'],
+            'macd_signal': values['macd_signal'], 'adx': values['adx'], 'plus_di': values['plus_di'],
+            'minus_di': values['minus_di']}
+
+
+@pytest.mark.parametrize('n', (10, 30, 2000))
+def test_sync_matches_batch(n):
+    data = _bars(n)
+    engine = StreamingIndicators()
+    engine.sync(data)
+    assert engine.bars == n
+    for name, expected in _batch(data).items():
+        np.testing.assert_allclose(_streaming(engine)[name], expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_sync_folds_in_appended_bars_only():
+    data = _bars(3000)
+    engine = StreamingIndicators()
+    engine.sync(data.iloc[:2990])
+
+    def rebuild(data):
+        raise AssertionError("appending bars rebuilt the engine")
+
+    engine._warm = rebuild
+    engine.sync(data)
+    assert engine.bars == 3000
+    for name, expected in _batch(data).items():
+        np.testing.assert_allclose(_streaming(engine)[name], expected, rtol=1e-9, atol=1e-12)
+
+
+def test_sync_rebuilds_on_a_sliding_window():
+    # A window that drops old bars changes the EMA start, so the engine starts over to match batch
+    data = _bars(3000)
+    engine = StreamingIndicators()
+    engine.sync(data.iloc[:2990])
+    window = data.iloc[10:]
+    engine.sync(window)
+    assert engine.bars == 2990 and engine.first_date == window['Date'].iloc[0]
+    for name, expected in _batch(window).items():
+        np.testing.assert_allclose(_streaming(engine)[name], expected, rtol=1e-9, atol=1e-12)
+
+
+def test_sync_rebuilds_on_different_history():
+    data = _bars(500)
+    engine = StreamingIndicators()
+    engine.sync(data)
+    other = _bars(500, seed=1)
+    engine.sync(other)
+    assert engine.bars == 500
+    np.testing.assert_allclose(engine.values['rsi'], calculate_rsi(other).iloc[-1], rtol=1e-9)
+
+
+def test_signals_from_engine_match_batch():
+    for seed in range(5):
+        data = _bars(400, seed=seed)
+        engine = StreamingIndicators()
+        engine.sync(data)
+        streamed, batch = generate_trading_signals(data, indicators=engine), generate_trading_signals(data)
+        assert streamed['action'] == batch['action'] and streamed['confidence'] == batch['confidence']
+        assert streamed['metrics']['trend'] == batch['metrics']['trend']
+        np.testing.assert_allclose(streamed['metrics']['adx'], batch['metrics']['adx'], rtol=1e-9)
@@ -0,0 +1,49 @@
+import pytest
+
+from utils.portfolio_ledger import PortfolioLedger
+from utils.trade_journal import SnapshotConflict, TradeJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return TradeJournal(str(tmp_path / 'journal.db'))
+
+
+def _sessions(journal):
+    first = PortfolioLedger.restore(journal, account='shared')
+    second = PortfolioLedger.restore(journal, account='shared')
+    return first, second
+
+
+def test_snapshot_saves_trades_and_version(journal):
+    ledger = PortfolioLedger.restore(journal, account='solo')
+    ledger.record_fill('EUR/USD', 'buy', 1000, 1.1)
+    ledger.checkpoint()
+    assert ledger.version == 1 and journal.count('solo') == 1
+    assert PortfolioLedger.restore(journal, account='solo').positions['EUR/USD'].quantity == 1000
+
+
+def test_rejected_session_trades_are_not_committed(journal):
+    first, second = _sessions(journal)
+    first.record_fill('EUR/USD', 'buy', 1000, 1.1)
+    first.checkpoint()
+    second.record_fill('GBP/USD', 'sell', 500, 1.3)
+    with pytest.raises(SnapshotConflict):
+        second.checkpoint()
+    assert second.stale
+    # A later flush or snapshot from the winning session must not commit them either
+    journal.flush()
+    first.record_fill('EUR/USD', 'sell', 1000, 1.11)
+    first.checkpoint()
+    trades = journal.trades('shared', limit=10)
+    assert journal.count('shared') == 2 and set(trades['pair']) == {'EUR/USD'}
+
+
+def test_stale_trades_flushed_before_the_conflict_are_dropped(tmp_path):
+    # With batch_size=1 every append flushes before the session gets to checkpoint
+    journal = TradeJournal(str(tmp_path / 'journal.db'), batch_size=1)
+    first, second = _sessions(journal)
+    first.record_fill('EUR/USD', 'buy', 1000, 1.1)
+    first.checkpoint()
+    second.record_fill('GBP/USD', 'sell', 500, 1.3)
+    assert journal.count('shared') == 1
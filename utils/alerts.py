@@ -0,0 +1,525 @@
+import math
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrument
+from .levels import DEFAULT_PARAMS, level_index, nearest_support_resistance
+from .streaming_indicators import ADX, EMA, MACD, RSI, RollingMean
+
+# Bars kept per (pair, timeframe) stream, replayed into indicators a new rule needs
+HISTORY = 1000
+
+# Alerts waiting in the queue before the oldest are dropped
+QUEUE_SIZE = 10000
+
+# Operand name -> (feature, default parameter, output position); name(N) overrides the parameter
+OPERANDS = {
+    'open': ('bar', None, 0),
+    'high': ('bar', None, 1),
+    'low': ('bar', None, 2),
+    'close': ('bar', None, 3),
+    'price': ('bar', None, 3),
+    'rsi': ('rsi', 14, 0),
+    'sma': ('sma', 20, 0),
+    'ema': ('ema', 20, 0),
+    'macd': ('macd', None, 0),
+    'macd_signal': ('macd', None, 1),
+    'signal': ('macd', None, 1),
+    'adx': ('adx', 14, 0),
+    'plus_di': ('adx', 14, 1),
+    'minus_di': ('adx', 14, 2),
+    'trend': ('trend', None, 0),
+    'support': ('levels', None, 0),
+    'resistance': ('levels', None, 1),
+}
+
+# Shortest period each feature accepts; RSI and ADX average changes between bars, so they need two
+MIN_PERIODS = {'rsi': 2, 'adx': 2}
+
+# Words that compare against trend
+TREND_CODES = {'bearish': -1.0, 'neutral': 0.0, 'bullish': 1.0}
+
+COMPARISONS = ('<', '<=', '>', '>=', '==', '!=')
+OPERATORS = COMPARISONS + ('crosses above', 'crosses below', 'within')
+
+_CLAUSE_PATTERNS = (
+    (re.compile(r'^(\S+)\s+within\s+([0-9.]+)\s*%\s+of\s+(\S+)$'), 'within'),
+    (re.compile(r'^(\S+)\s+crosses\s+(above|below)\s+(\S+)$'), 'crosses'),
+    (re.compile(r'^(\S+?)\s*(<=|>=|==|!=|<|>)\s*(\S+)$'), 'compare'),
+)
+_OPERAND = re.compile(r'^([a-z_]+)(?:\((\d+)\))?$')
+
+
+def _operand(token):
+    """Constant (float) or (feature, parameter, output) key for one side of a clause"""
+    token = token.lower()
+    if token in TREND_CODES:
+        return TREND_CODES[token]
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    match = _OPERAND.match(token)
+    if not match or match.group(1) not in OPERANDS:
+        raise ValueError(f"Unknown operand {token!r}; use one of {', '.join(OPERANDS)}")
+    feature, param, output = OPERANDS[match.group(1)]
+    if match.group(2):
+        if param is None:
+            raise ValueError(f"{match.group(1)} takes no period")
+        param = int(match.group(2))
+        if param < MIN_PERIODS.get(feature, 1):
+            raise ValueError(f"{match.group(1)} needs a period of at least {MIN_PERIODS.get(feature, 1)}")
+    return feature, param, output
+
+
+def parse_rule(expression):
+    """Clauses of a rule such as 'adx > 25 and trend == bullish', as (left, operator, right, percent).
+
+    Clauses are joined with 'and' and take one of the forms 'a < b' (any of
+    <, <=, >, >=, ==, !=), 'a crosses above b', 'a crosses below b' and
+    'a within p% of b'. Operands are numbers, trend words (bullish,
+    neutral, bearish) or the names in OPERANDS, with an optional period
+    such as rsi(7) or ema(50). Raises ValueError for anything else.
+    """
+    clauses = []
+    for text in re.split(r'\s+and\s+', expression.strip().lower()):
+        for pattern, kind in _CLAUSE_PATTERNS:
+            match = pattern.match(text.strip())
+            if match:
+                break
+        else:
+            raise ValueError(f"Can't parse {text!r}")
+        if kind == 'within':
+            left, percent, right = match.groups()
+            clause = (_operand(left), 'within', _operand(right), float(percent) / 100)
+        elif kind == 'crosses':
+            left, direction, right = match.groups()
+            clause = (_operand(left), f'crosses {direction}', _operand(right), None)
+        else:
+            left, op, right = match.groups()
+            clause = (_operand(left), op, _operand(right), None)
+        if not isinstance(clause[0], tuple) and not isinstance(clause[2], tuple):
+            raise ValueError(f"{text!r} compares two constants")
+        clauses.append(clause)
+    return clauses
+
+
+class _Bar:
+    outputs = 4
+
+    def update(self, open_, high, low, close):
+        return open_, high, low, close
+
+
+class _Close:
+    """A single-input streaming indicator fed with closes"""
+    outputs = 1
+
+    def __init__(self, indicator):
+        self.indicator = indicator
+
+    def update(self, open_, high, low, close):
+        return (self.indicator.update(close),)
+
+
+class _MACD:
+    outputs = 2
+
+    def __init__(self):
+        self.macd = MACD()
+
+    def update(self, open_, high, low, close):
+        return self.macd.update(close)
+
+
+class _ADX:
+    outputs = 3
+
+    def __init__(self, period):
+        self.adx = ADX(period)
+
+    def update(self, open_, high, low, close):
+        return self.adx.update(high, low, close)
+
+
+class _Trend:
+    """Standing trend code, matching trading_signals.trend_direction"""
+    outputs = 1
+
+    def __init__(self, short_period=20, long_period=50):
+        self.short, self.long = EMA(short_period), EMA(long_period)
+        self.long_period = long_period
+        self.bars = 0
+
+    def update(self, open_, high, low, close):
+        short, long = self.short.update(close), self.long.update(close)
+        self.bars += 1
+        if self.bars < self.long_period:
+            return (0.0,)
+        return (float(np.sign(short - long)),)
+
+
+class _Levels:
+    """Nearest clustered support and resistance around the close.
+
+    The swing index is updated bar by bar. It is re-clustered from the
+    last HISTORY bars whenever the average true range has drifted more
+    than a quarter from the one its tolerance was set with.
+    """
+    outputs = 2
+
+    def __init__(self):
+        self.bars = deque(maxlen=HISTORY)
+        self.index = None
+        self.atr = 0.0
+        self.tr_sum = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+
+    def update(self, open_, high, low, close):
+        prev = self.bars[-1][2] if self.bars else close
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        if len(self.bars) == HISTORY:
+            self.tr_sum -= self.bars[0][3]
+        self.bars.append((high, low, close, tr))
+        self.tr_sum += tr
+        self.low, self.high = min(self.low, low), max(self.high, high)
+        atr = self.tr_sum / len(self.bars)
+        if self.index is None or abs(atr - self.atr) > 0.25 * self.atr:
+            bars = np.array(self.bars)
+            self.index = level_index(bars[:, 0], bars[:, 1], bars[:, 2])
+            self.atr = atr
+        else:
+            self.index.update(high, low)
+        return nearest_support_resistance(self.index, close, self.low, self.high,
+                                          DEFAULT_PARAMS['min_touches'])
+
+
+def _make_feature(feature, param):
+    if feature == 'bar':
+        return _Bar()
+    if feature == 'rsi':
+        return _Close(RSI(param))
+    if feature == 'sma':
+        return _Close(RollingMean(param))
+    if feature == 'ema':
+        return _Close(EMA(param))
+    if feature == 'macd':
+        return _MACD()
+    if feature == 'adx':
+        return _ADX(param)
+    if feature == 'trend':
+        return _Trend()
+    return _Levels()
+
+
+def _token(key):
+    """Display name of an operand key"""
+    if not isinstance(key, tuple):
+        return f'{key:g}'
+    feature, param, output = key
+    name = next(name for name, value in OPERANDS.items() if value[0] == feature and value[2] == output)
+    return name if param is None or param == OPERANDS[name][1] else f'{name}({param})'
+
+
+class _Stream:
+    """Bars, indicator state and compiled rule plan for one (pair, timeframe)"""
+
+    def __init__(self, pair, timeframe):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.history = deque(maxlen=HISTORY)  # (open, high, low, close) per bar
+        self.last_time = None
+        self.features = {}
+        self.outputs = {}  # each indicator's outputs on the latest bar
+        self.prior = {}    # and on the bar before
+        self.plan_version = -1
+        self.rule_ids = []
+        self.state = np.zeros(0, dtype=bool)
+
+    def compile(self, rules, version):
+        """Build the evaluation plan for the rules that watch this stream.
+
+        Identical clauses across rules are evaluated once, and each
+        indicator once however many clauses read it. Indicators a new rule
+        needs are warmed up on the retained bars; rules already in the plan
+        keep their state, and new ones take the current bar's result so
+        they alert on the next change rather than at once.
+        """
+        clauses, operands = {}, {}
+        flat, starts = [], []
+        for rule in rules:
+            starts.append(len(flat))
+            for clause in rule['clauses']:
+                flat.append(clauses.setdefault(clause, len(clauses)))
+                for side in (clause[0], clause[2]):
+                    if isinstance(side, tuple):
+                        operands.setdefault(side, len(operands))
+
+        specs = {(feature, param) for feature, param, _ in operands}
+        for spec in set(self.features) - specs:
+            del self.features[spec], self.outputs[spec], self.prior[spec]
+        for spec in specs - set(self.features):
+            feature = self.features[spec] = _make_feature(*spec)
+            self.prior[spec] = self.outputs[spec] = (math.nan,) * feature.outputs
+            for bar in list(self.history):
+                self.prior[spec], self.outputs[spec] = self.outputs[spec], feature.update(*bar)
+
+        # Operand slots first, then one per distinct constant
+        self.operands = list(operands)
+        self.slots = [((feature, param), output) for feature, param, output in self.operands]
+        constants = sorted({side for clause in clauses for side in (clause[0], clause[2])
+                            if not isinstance(side, tuple)})
+        slot = {**operands, **{value: len(operands) + i for i, value in enumerate(constants)}}
+        self.constants = np.array(constants, dtype=float)
+
+        self.left = np.array([slot[clause[0]] for clause in clauses], dtype=np.intp)
+        self.right = np.array([slot[clause[2]] for clause in clauses], dtype=np.intp)
+        self.percent = np.array([clause[3] or 0.0 for clause in clauses])
+        ops = [clause[1] for clause in clauses]
+        self.groups = {op: np.array([i for i, other in enumerate(ops) if other == op], dtype=np.intp)
+                       for op in OPERATORS if op in ops}
+        self.flat = np.array(flat, dtype=np.intp)
+        self.starts = np.array(starts, dtype=np.intp)
+        names = [_token(key) for key in self.operands]
+        self.rule_operands = [[(names[i], i) for i in sorted({slot[side] for clause in rule['clauses']
+                                                              for side in (clause[0], clause[2])
+                                                              if isinstance(side, tuple)})]
+                              for rule in rules]
+
+        previous_state = dict(zip(self.rule_ids, self.state))
+        self.rule_ids = [rule['id'] for rule in rules]
+        self.plan_version = version
+        current = self.evaluate() if self.history and rules else np.zeros(len(rules), dtype=bool)
+        self.state = np.array([previous_state.get(rule_id, current[i]) for i, rule_id in enumerate(self.rule_ids)],
+                              dtype=bool)
+
+    def update(self, bar):
+        """Fold one (open, high, low, close) bar into the history and every indicator"""
+        self.history.append(bar)
+        self.prior = self.outputs
+        self.outputs = {spec: feature.update(*bar) for spec, feature in self.features.items()}
+
+    def _vector(self, outputs):
+        values = [outputs[spec][output] for spec, output in self.slots]
+        return np.concatenate([np.array(values, dtype=float), self.constants])
+
+    def evaluate(self):
+        """Truth of every rule on the latest bar"""
+        values = self.values = self._vector(self.outputs)
+        previous = self._vector(self.prior)
+        left, right = values[self.left], values[self.right]
+        result = np.zeros(len(self.left), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for op, members in self.groups.items():
+                a, b = left[members], right[members]
+                if op == '<':
+                    hit = a < b
+                elif op == '<=':
+                    hit = a <= b
+                elif op == '>':
+                    hit = a > b
+                elif op == '>=':
+                    hit = a >= b
+                elif op == '==':
+                    hit = a == b
+                elif op == '!=':
+                    hit = a != b
+                elif op == 'within':
+                    hit = np.abs(a - b) <= self.percent[members] * np.abs(b)
+                else:
+                    pa, pb = previous[self.left[members]], previous[self.right[members]]
+                    hit = (a > b) & (pa <= pb) if op == 'crosses above' else (a < b) & (pa >= pb)
+                result[members] = hit
+        return np.logical_and.reduceat(result[self.flat], self.starts)
+
+
+class AlertEngine:
+    """Watchlist rules evaluated on every completed bar, with alerts on a local queue.
+
+    Rules are parsed once (parse_rule) and compiled per (pair, timeframe)
+    stream into a plan: the distinct clauses of every rule watching the
+    stream, grouped by operator into index arrays, plus the distinct
+    indicators those clauses read. A bar only touches its own stream: it
+    updates the indicators once, evaluates each operator group as one
+    vector comparison and ANDs clauses into rule results with reduceat.
+    A rule alerts on the bar it turns true. Streams recompile lazily the
+    next time they see a bar after rules change.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, recent=200):
+        self.rules = {}
+        self.streams = {}
+        self.alerts = deque(maxlen=queue_size)  # thread-safe appends and pops; full drops the oldest
+        self.recent = deque(maxlen=recent)
+        self.version = 0
+        self.stats = {'bars': 0, 'evaluations': 0, 'alerts': 0, 'dropped': 0}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._attached = set()
+        self.live_timeframes = set()  # timeframes an attached aggregator builds; feed() skips them
+
+    def add_rule(self, expression, pairs=None, timeframe='1m', name=None):
+        """Register a rule for some pairs (None for every pair) on one timeframe; returns its id"""
+        clauses = parse_rule(expression)
+        with self._lock:
+            rule_id = self._next_id
+            self._next_id += 1
+            self.rules[rule_id] = {
+                'id': rule_id,
+                'name': name or expression,
+                'expression': expression,
+                'pairs': None if pairs is None else frozenset(pairs),
+                'timeframe': timeframe,
+                'clauses': clauses,
+            }
+            self.version += 1
+        return rule_id
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            if self.rules.pop(rule_id, None) is not None:
+                self.version += 1
+
+    def rule_table(self):
+        """One row per registered rule"""
+        return pd.DataFrame([{'id': rule['id'], 'name': rule['name'], 'expression': rule['expression'],
+                              'pairs': 'all' if rule['pairs'] is None else ', '.join(sorted(rule['pairs'])),
+                              'timeframe': rule['timeframe']} for rule in self.rules.values()],
+                            columns=['id', 'name', 'expression', 'pairs', 'timeframe'])
+
+    def watching(self, pair, timeframe):
+        """Rules that evaluate the bars of pair on timeframe"""
+        return [rule for rule in self.rules.values()
+                if rule['timeframe'] == timeframe and (rule['pairs'] is None or pair in rule['pairs'])]
+
+    def _stream(self, pair, timeframe):
+        stream = self.streams.get((pair, timeframe))
+        if stream is None:
+            stream = self.streams[(pair, timeframe)] = _Stream(pair, timeframe)
+        if stream.plan_version != self.version:
+            stream.compile(self.watching(pair, timeframe), self.version)
+        return stream
+
+    @instrument('alerts.on_bar')
+    def on_bar(self, pair, timeframe, bar, alert=True):
+        """Evaluate one completed bar, [start_ns, open, high, low, close, volume] as BarAggregator publishes.
+
+        Bars no newer than the stream's last one are ignored. Returns the
+        alerts raised (none when alert is False, as while warming up).
+        """
+        with self._lock:
+            stream = self._stream(pair, timeframe)
+            timestamp = int(bar[0])
+            if stream.last_time is not None and timestamp <= stream.last_time:
+                return []
+            stream.last_time = timestamp
+            stream.update((float(bar[1]), float(bar[2]), float(bar[3]), float(bar[4])))
+            self.stats['bars'] += 1
+            if not stream.rule_ids:
+                return []
+            truth = stream.evaluate()
+            self.stats['evaluations'] += len(truth)
+            fired = np.flatnonzero(truth & ~stream.state)
+            stream.state = truth
+            if not alert or not len(fired):
+                return []
+            time = pd.Timestamp(timestamp)
+            raised = [self._alert(stream, i, time) for i in fired]
+        self._deliver(raised)
+        return raised
+
+    def _alert(self, stream, i, time):
+        rule = self.rules[stream.rule_ids[i]]
+        values = {name: float(stream.values[slot]) for name, slot in stream.rule_operands[i]}
+        return {'rule': rule['id'], 'name': rule['name'], 'expression': rule['expression'],
+                'pair': stream.pair, 'timeframe': stream.timeframe, 'time': time,
+                'close': stream.history[-1][3], 'values': values}
+
+    def _deliver(self, raised):
+        self.stats['alerts'] += len(raised)
+        self.recent.extend(raised)
+        # Drop the oldest undelivered alerts rather than block the bar feed
+        self.stats['dropped'] += max(len(self.alerts) + len(raised) - self.alerts.maxlen, 0)
+        self.alerts.extend(raised)
+
+    def feed(self, pair, timeframe, data, alert=True):
+        """Run the bars of an OHLC frame newer than the stream's last one; returns the alerts raised.
+
+        If the frame no longer holds the stream's last bar with the same
+        close (e.g. regenerated synthetic data), the stream starts over and
+        warms up on the whole frame without alerting.
+
+        Timeframes in live_timeframes take bars only from the attached
+        aggregator, so a frame for one of them is ignored: mixing two price
+        series in one stream would make its indicators meaningless.
+        """
+        if timeframe in self.live_timeframes:
+            return []
+        times = data['Date'].to_numpy().astype('datetime64[ns]').view('int64')
+        closes = data['Close'].to_numpy(dtype=float)
+        with self._lock:
+            stream = self.streams.get((pair, timeframe))
+            start = 0
+            if stream is not None and stream.last_time is not None:
+                start = int(np.searchsorted(times, stream.last_time, side='right'))
+                if (start == 0 or times[start - 1] != stream.last_time
+                        or closes[start - 1] != stream.history[-1][3]):
+                    del self.streams[(pair, timeframe)]
+                    start, alert = 0, False
+            raised = []
+            columns = [data[name].to_numpy(dtype=float)[start:] for name in ('Open', 'High', 'Low')]
+            for timestamp, *prices in zip(times[start:], *columns, closes[start:]):
+                raised.extend(self.on_bar(pair, timeframe, (timestamp, *prices), alert))
+        return raised
+
+    def attach(self, aggregator):
+        """Evaluate every bar an ingestion BarAggregator completes; attaching twice does nothing.
+
+        Streams on the aggregator's timeframes start over from its bars, and
+        feed() ignores those timeframes from then on.
+        """
+        with self._lock:
+            if id(aggregator) in self._attached:
+                return
+            self._attached.add(id(aggregator))
+            live = set(aggregator.timeframes) - self.live_timeframes
+            for key in [key for key in self.streams if key[1] in live]:
+                del self.streams[key]
+            self.live_timeframes |= live
+        aggregator.subscribe(self.on_bar)
+
+    def matches(self):
+        """Rules true on their stream's latest bar, one row per (rule, pair)"""
+        rows = []
+        with self._lock:
+            for stream in self.streams.values():
+                if stream.plan_version != self.version:
+                    stream.compile(self.watching(stream.pair, stream.timeframe), self.version)
+                for i in np.flatnonzero(stream.state):
+                    rule = self.rules[stream.rule_ids[i]]
+                    rows.append({'rule': rule['id'], 'name': rule['name'], 'pair': stream.pair,
+                                 'timeframe': stream.timeframe, 'time': pd.Timestamp(stream.last_time),
+                                 'close': stream.history[-1][3]})
+        return pd.DataFrame(rows, columns=['rule', 'name', 'pair', 'timeframe', 'time', 'close'])
+
+    def drain(self, limit=None):
+        """Take up to limit alerts off the queue, oldest first, without waiting"""
+        items = []
+        while self.alerts and (limit is None or len(items) < limit):
+            try:
+                items.append(self.alerts.popleft())
+            except IndexError:
+                break
+        return items
+
+
+@lru_cache(maxsize=None)
+def get_alert_engine():
+    """Process-wide alert engine shared by every session"""
+    return AlertEngine()
@@ -0,0 +1,250 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .technical_analysis import calculate_ema, calculate_rsi, calculate_macd
+from .trading_signals import calculate_adx
+from .levels import level_index, nearest_support_resistance
+from .patterns import detect_patterns, event_features
+
+DEFAULT_PARAMS = {
+    'short_period': 20,
+    'long_period': 50,
+    'rsi_period': 14,
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'adx_period': 14,
+    'adx_threshold': 25,
+    'stops': 'levels',  # 'levels': the live signal's support/resistance; 'window': sr_window-bar low/high
+    'sr_window': 20,
+    'reward_ratio': 2,
+    'pattern_decay': None,  # bars; when set, entries must not go against recent chart patterns
+}
+
+
+def _crossover(fast, slow):
+    """Per-bar crossover flags: +1 bullish, -1 bearish, 0 otherwise"""
+    fast_prev, slow_prev = fast.shift(), slow.shift()
+    up = (fast > slow) & (fast_prev <= slow_prev)
+    down = (fast < slow) & (fast_prev >= slow_prev)
+    return np.where(up, 1, np.where(down, -1, 0))
+
+
+def _level_stops(data, bars, levels):
+    """Support and resistance at each of bars, from a LevelIndex over the bars up to it.
+
+    This is what generate_trading_signals computes live on that bar, so the
+    backtest's stops match the live ones and never look ahead. The index is
+    only built on the given (signal) bars, and results are kept in levels,
+    a dict of bar -> (support, resistance).
+    """
+    high, low, close = (data[name].to_numpy(dtype=float) for name in ('High', 'Low', 'Close'))
+    support = np.full(len(data), np.nan)
+    resistance = np.full(len(data), np.nan)
+    for bar in bars:
+        if bar not in levels:
+            end = bar + 1
+            index = level_index(high[:end], low[:end], close[:end])
+            levels[bar] = nearest_support_resistance(index, close[bar], low[:end], high[:end])
+        support[bar], resistance[bar] = levels[bar]
+    return support, resistance
+
+
+def compute_signal_history(data, cache=None, **params):
+    """Evaluate the generate_trading_signals conditions on every bar at once.
+
+    Stops and targets come from the support and resistance the live signal
+    would find on that bar (stops='levels'), or from the trailing sr_window
+    low and high (stops='window'); either way each bar only sees data
+    available at that bar. Returns a DataFrame with the per-bar action,
+    stop_loss and take_profit alongside the underlying indicators.
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    cache = {} if cache is None else cache
+
+    def cached(key, func):
+        if key not in cache:
+            cache[key] = func()
+        return cache[key]
+
+    short_ma = cached(('ema', p['short_period']), lambda: calculate_ema(data, p['short_period']))
+    long_ma = cached(('ema', p['long_period']), lambda: calculate_ema(data, p['long_period']))
+    rsi = cached(('rsi', p['rsi_period']), lambda: calculate_rsi(data, p['rsi_period']))
+    macd, macd_line_signal = cached(('macd',), lambda: calculate_macd(data))
+    adx = cached(('adx', p['adx_period']), lambda: calculate_adx(data, p['adx_period'])[0])
+
+    trend = _crossover(short_ma, long_ma)
+    macd_signal = _crossover(macd, macd_line_signal)
+    strong = (adx > p['adx_threshold']).values
+    rsi_values = rsi.values
+
+    buy = (trend == 1) & strong & (rsi_values < p['rsi_oversold']) & (macd_signal == 1)
+    sell = (trend == -1) & strong & (rsi_values > p['rsi_overbought']) & (macd_signal == -1)
+
+    pattern_bias = None
+    if p['pattern_decay'] is not None:
+        events = cached(('patterns',), lambda: detect_patterns(data))
+        pattern_bias = cached(('pattern_bias', p['pattern_decay']),
+                              lambda: event_features(events, len(data), p['pattern_decay']))
+        buy &= pattern_bias >= 0
+        sell &= pattern_bias <= 0
+
+    close = data['Close'].values
+    if p['stops'] == 'levels':
+        support_values, resistance_values = _level_stops(data, np.flatnonzero(buy | sell),
+                                                         cached(('levels',), dict))
+    else:
+        support_values = cached(('support', p['sr_window']),
+                                lambda: data['Low'].rolling(window=p['sr_window']).min().to_numpy())
+        resistance_values = cached(('resistance', p['sr_window']),
+                                   lambda: data['High'].rolling(window=p['sr_window']).max().to_numpy())
+
+    history = pd.DataFrame({
+        'action': np.where(buy, 'buy', np.where(sell, 'sell', 'hold')),
+        'entry_price': close,
+        'stop_loss': np.where(buy, support_values, np.where(sell, resistance_values, np.nan)),
+        'take_profit': np.where(
+            buy, close + (close - support_values) * p['reward_ratio'],
+            np.where(sell, close - (resistance_values - close) * p['reward_ratio'], np.nan)),
+        'trend': trend,
+        'rsi': rsi_values,
+        'macd_signal': macd_signal,
+        'adx': np.asarray(adx, dtype=float),
+    }, index=data.index)
+    if pattern_bias is not None:
+        history['pattern_bias'] = pattern_bias
+    return history
+
+
+def _first_exit(side, stop, target, high, low, start, end, chunk=256):
+    """First bar in [start, end) that touches the stop or target, scanning in growing chunks.
+
+    Returns the bar index and whether it was the stop, or (-1, False).
+    """
+    while start < end:
+        stop_at = min(start + chunk, end)
+        if side == 1:
+            stop_hit = low[start:stop_at] <= stop
+            target_hit = high[start:stop_at] >= target
+        else:
+            stop_hit = high[start:stop_at] >= stop
+            target_hit = low[start:stop_at] <= target
+        found = np.flatnonzero(stop_hit | target_hit)
+        if len(found):
+            return start + found[0], bool(stop_hit[found[0]])
+        start = stop_at
+        chunk *= 2
+    return -1, False
+
+
+def trade_rows(high, low, close, sides, stops, targets, max_bars=None):
+    """simulate_trades on arrays: sides holds +1 buy, -1 sell or 0 per bar.
+
+    Returns a list of (entry_index, exit_index, side, entry_price,
+    exit_price, stop_loss, take_profit, exit_reason) tuples.
+    """
+    n = len(close)
+    candidates = np.flatnonzero((sides != 0) & ~np.isnan(stops))
+
+    trades = []
+    next_free = 0
+    for i in candidates:
+        if i < next_free:
+            continue
+        side = int(sides[i])
+        entry, stop, target = close[i], stops[i], targets[i]
+
+        end = n if max_bars is None else min(n, i + 1 + max_bars)
+        exit_idx, stopped = _first_exit(side, stop, target, high, low, i + 1, end)
+
+        if exit_idx == -1:
+            exit_idx = end - 1
+            exit_price = close[exit_idx]
+            reason = 'timeout' if end < n else 'end_of_data'
+        elif stopped:
+            exit_price, reason = stop, 'stop_loss'
+        else:
+            exit_price, reason = target, 'take_profit'
+
+        trades.append((i, exit_idx, side, entry, exit_price, stop, target, reason))
+        next_free = exit_idx + 1
+    return trades
+
+
+def simulate_trades(data, history, max_bars=None):
+    """Fill signals at the signal bar close and exit on stop loss, take profit or timeout.
+
+    Only one position is held at a time. When a bar touches both the stop and
+    the target, the stop is assumed to fill first.
+    """
+    actions = history['action'].values
+    sides = np.where(actions == 'buy', 1, np.where(actions == 'sell', -1, 0))
+    trades = trade_rows(data['High'].values, data['Low'].values, data['Close'].values, sides,
+                        history['stop_loss'].values, history['take_profit'].values, max_bars)
+
+    trades = pd.DataFrame(trades, columns=['entry_index', 'exit_index', 'side', 'entry_price',
+                                           'exit_price', 'stop_loss', 'take_profit', 'exit_reason'])
+    trades['return'] = trades['side'] * (trades['exit_price'] - trades['entry_price']) / trades['entry_price']
+    return trades
+
+
+def summarize_trades(trades):
+    """Summarize trade returns into PnL, drawdown and hit rate"""
+    if trades.empty:
+        return {'trades': 0, 'total_return': 0.0, 'max_drawdown': 0.0,
+                'hit_rate': float('nan'), 'avg_return': float('nan')}
+
+    equity = (1 + trades['return'].values).cumprod()
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    return {
+        'trades': len(trades),
+        'total_return': float(equity[-1] - 1),
+        'max_drawdown': float((equity / peak - 1).min()),
+        'hit_rate': float((trades['return'] > 0).mean()),
+        'avg_return': float(trades['return'].mean()),
+    }
+
+
+def run_backtest(data, max_bars=None, cache=None, **params):
+    """Backtest the signal rules over the full history of one pair"""
+    history = compute_signal_history(data, cache=cache, **params)
+    trades = simulate_trades(data, history, max_bars=max_bars)
+    return summarize_trades(trades), trades
+
+
+_worker_data = None
+_worker_cache = {}
+
+
+def _init_worker(data):
+    """Keep one copy of the bars and an indicator cache per worker process"""
+    global _worker_data, _worker_cache
+    _worker_data = data
+    _worker_cache = {}
+
+
+def _run_params(params, max_bars=None):
+    summary, _ = run_backtest(_worker_data, max_bars=max_bars, cache=_worker_cache, **params)
+    return {**params, **summary}
+
+
+def run_parameter_sweep(data, grid, max_workers=None, max_bars=None):
+    """Backtest every combination in grid across a process pool.
+
+    grid maps parameter names from DEFAULT_PARAMS to lists of values. The
+    bars are sent to each worker once, and indicators shared between
+    combinations are computed once per worker.
+    """
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    max_workers = max_workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(data,)) as pool:
+        chunksize = max(1, len(combos) // (max_workers * 4))
+        results = list(pool.map(_run_params, combos, itertools.repeat(max_bars), chunksize=chunksize))
+
+    return pd.DataFrame(results).sort_values('total_return', ascending=False, ignore_index=True)
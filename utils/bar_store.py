@@ -0,0 +1,234 @@
+"""Columnar OHLCV bar store: fill it with generated or imported history.
+
+Run from the repository root:
+
+    python -m utils.bar_store generate --pairs EUR/USD GBP/USD --timeframes 1m 1h 1D --periods 100000
+    python -m utils.bar_store import bars.csv --pair EUR/USD --timeframe 1h
+    python -m utils.bar_store info
+
+The app reads pairs and timeframes with enough stored bars from the store
+instead of generating them, and the live ingestion pipeline appends the
+1m bars it completes.
+"""
+import argparse
+import json
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .market_simulator import generate_market_data
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_ROOT = os.environ.get('FOREX_BAR_STORE', os.path.join('data', 'bars'))
+
+
+def _to_nanoseconds(dates):
+    """Convert a sequence of dates to int64 nanoseconds since the epoch"""
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+class BarStore:
+    """Append-only columnar OHLCV store, memory-mapped from disk.
+
+    Each pair and timeframe is a directory with one flat binary file per
+    column plus a meta.json holding the dtype and committed row count.
+    Timestamps are int64 nanoseconds and must be strictly increasing, so
+    time ranges are found by binary search and returned as zero-copy views.
+    A store has a single writer; readers only see committed rows.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, dtype='float64'):
+        self.root = root
+        self.dtype = np.dtype(dtype)
+        self._maps = {}
+
+    def _path(self, pair, timeframe):
+        return os.path.join(self.root, pair.replace('/', ''), timeframe)
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def count(self, pair, timeframe):
+        """Number of committed bars for pair and timeframe"""
+        meta = self._read_meta(self._path(pair, timeframe))
+        return meta['count'] if meta else 0
+
+    def append(self, pair, timeframe, data):
+        """Append bars from a DataFrame with Date and OHLCV columns"""
+        if len(data) == 0:
+            return 0
+        path = self._path(pair, timeframe)
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta(path) or {'dtype': self.dtype.str, 'count': 0, 'last': None}
+        dtype = np.dtype(meta['dtype'])
+
+        timestamps = _to_nanoseconds(data['Date'])
+        if np.any(np.diff(timestamps) <= 0):
+            raise ValueError("Bar timestamps must be strictly increasing")
+        if meta['last'] is not None and timestamps[0] <= meta['last']:
+            raise ValueError("Bars must be appended after the last stored timestamp")
+
+        columns = {'Date': (timestamps, np.dtype('int64'))}
+        for name in OHLCV_COLUMNS:
+            columns[name] = (data[name].to_numpy(), dtype)
+
+        for name, (values, column_dtype) in columns.items():
+            file_path = os.path.join(path, f'{name}.bin')
+            with open(file_path, 'ab') as f:
+                # Drop any rows left over from an append that never committed
+                f.truncate(meta['count'] * column_dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(values, dtype=column_dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta['count'] += len(timestamps)
+        meta['last'] = int(timestamps[-1])
+        self._write_meta(path, meta)
+        return len(timestamps)
+
+    def last_bar(self, pair, timeframe):
+        """(date, close) of the last committed bar, or None when there are none"""
+        bars = self.tail_arrays(pair, timeframe, 1)
+        if not len(bars['Date']):
+            return None
+        return pd.Timestamp(bars['Date'][0]), float(bars['Close'][0])
+
+    def append_new(self, pair, timeframe, data):
+        """Append only the bars of data dated after the last stored one; returns how many"""
+        meta = self._read_meta(self._path(pair, timeframe))
+        if meta and meta['last'] is not None:
+            data = data[_to_nanoseconds(data['Date']) > meta['last']]
+        return self.append(pair, timeframe, data)
+
+    def attach(self, aggregator, timeframes=('1m',)):
+        """Persist the bars an ingestion BarAggregator completes on the given timeframes"""
+        def on_bar(pair, timeframe, bar):
+            if timeframe in timeframes:
+                self.append_new(pair, timeframe, pd.DataFrame(
+                    [[pd.Timestamp(int(bar[0])), *bar[1:6]]], columns=['Date'] + OHLCV_COLUMNS))
+        aggregator.subscribe(on_bar)
+
+    def _columns(self, pair, timeframe):
+        """Memory-mapped column arrays for the committed rows"""
+        path = self._path(pair, timeframe)
+        meta = self._read_meta(path)
+        if not meta or meta['count'] == 0:
+            return None
+
+        key = (path, meta['count'])
+        if key not in self._maps:
+            dtype = np.dtype(meta['dtype'])
+            maps = {'Date': np.memmap(os.path.join(path, 'Date.bin'), dtype='int64',
+                                      mode='r', shape=(meta['count'],))}
+            for name in OHLCV_COLUMNS:
+                maps[name] = np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype,
+                                       mode='r', shape=(meta['count'],))
+            self._maps = {k: v for k, v in self._maps.items() if k[0] != path}
+            self._maps[key] = maps
+        return self._maps[key]
+
+    def _bounds(self, timestamps, start, end):
+        """Row range for [start, end) found by binary search on the timestamps"""
+        lo = 0 if start is None else int(np.searchsorted(timestamps, _to_nanoseconds([start])[0], 'left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, _to_nanoseconds([end])[0], 'left'))
+        return lo, hi
+
+    def slice_arrays(self, pair, timeframe, start=None, end=None):
+        """Zero-copy column views for bars with start <= Date < end"""
+        columns = self._columns(pair, timeframe)
+        if columns is None:
+            return {name: np.empty(0) for name in ['Date'] + OHLCV_COLUMNS}
+        lo, hi = self._bounds(columns['Date'], start, end)
+        views = {name: values[lo:hi] for name, values in columns.items()}
+        views['Date'] = views['Date'].view('datetime64[ns]')
+        return views
+
+    def tail_arrays(self, pair, timeframe, n):
+        """Zero-copy column views for the last n bars"""
+        columns = self._columns(pair, timeframe)
+        if columns is None:
+            return self.slice_arrays(pair, timeframe)
+        views = {name: values[max(len(values) - n, 0):] for name, values in columns.items()}
+        views['Date'] = views['Date'].view('datetime64[ns]')
+        return views
+
+    def load(self, pair, timeframe, start=None, end=None):
+        """DataFrame of bars with start <= Date < end, backed by the memory map"""
+        return pd.DataFrame(self.slice_arrays(pair, timeframe, start, end), copy=False)
+
+    def tail(self, pair, timeframe, n):
+        """DataFrame of the last n bars, backed by the memory map"""
+        return pd.DataFrame(self.tail_arrays(pair, timeframe, n), copy=False)
+
+
+@lru_cache(maxsize=None)
+def get_bar_store(root=DEFAULT_ROOT):
+    """Process-wide BarStore so memory maps are shared across reruns"""
+    return BarStore(root)
+
+
+def generate_history(store, pairs, timeframes, periods, seed=42):
+    """Write synthetic bars ending now for every pair and timeframe; returns the bars added"""
+    added = 0
+    for timeframe in timeframes:
+        frames = generate_market_data(pairs, periods, timeframe, seed=seed)
+        for pair in pairs:
+            added += store.append_new(pair, timeframe, frames[pair])
+    return added
+
+
+def import_csv(store, path, pair, timeframe):
+    """Append the bars of a CSV file with Date and OHLCV columns; returns the bars added"""
+    data = pd.read_csv(path, parse_dates=['Date']).sort_values('Date')
+    return store.append_new(pair, timeframe, data.drop_duplicates('Date'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', default=DEFAULT_ROOT)
+    sub = parser.add_subparsers(dest='command', required=True)
+    gen = sub.add_parser('generate', help='write synthetic history ending now')
+    gen.add_argument('--pairs', nargs='*', default=['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF'])
+    gen.add_argument('--timeframes', nargs='*', default=['1m', '1h', '1D'])
+    gen.add_argument('--periods', type=int, default=100_000)
+    gen.add_argument('--seed', type=int, default=42)
+    imp = sub.add_parser('import', help='append bars from a CSV file')
+    imp.add_argument('path')
+    imp.add_argument('--pair', required=True)
+    imp.add_argument('--timeframe', required=True)
+    sub.add_parser('info', help='stored bar counts')
+    args = parser.parse_args(argv)
+
+    store = BarStore(args.root)
+    if args.command == 'generate':
+        added = generate_history(store, args.pairs, args.timeframes, args.periods, args.seed)
+        print(f"Added {added:,} bars to {args.root}")
+    elif args.command == 'import':
+        added = import_csv(store, args.path, args.pair, args.timeframe)
+        print(f"Added {added:,} bars to {args.root}")
+    else:
+        for pair_dir in sorted(os.listdir(args.root)) if os.path.isdir(args.root) else []:
+            for timeframe in sorted(os.listdir(os.path.join(args.root, pair_dir))):
+                meta = store._read_meta(os.path.join(args.root, pair_dir, timeframe))
+                if meta:
+                    print(f"{pair_dir:8} {timeframe:4} {meta['count']:>10,} bars, last "
+                          f"{pd.Timestamp(meta['last']) if meta['last'] is not None else '-'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
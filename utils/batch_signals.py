@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .levels import nearest_levels
+from .signal_records import MAX_REASONS, Reason, SignalBatch, render_reasons
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def stack_forex_data(frames):
+    """Stack per-pair OHLCV DataFrames into a (pairs, bars, 5) array"""
+    pairs = list(frames)
+    lengths = {len(frames[pair]) for pair in pairs}
+    if len(lengths) > 1:
+        raise ValueError("All pairs must have the same number of bars")
+    ohlcv = np.stack([frames[pair][OHLCV_COLUMNS].to_numpy(dtype=float) for pair in pairs])
+    return pairs, ohlcv
+
+
+def _from_multiindex(data):
+    """Convert a (pair, bar) MultiIndex frame into pair labels and an OHLCV tensor"""
+    pairs = list(data.index.get_level_values(0).unique())
+    return stack_forex_data({pair: data.xs(pair, level=0) for pair in pairs})
+
+
+def _crossover(fast, slow):
+    """+1 for a bullish crossover on the last bar, -1 for bearish, else 0"""
+    up = (fast[:, -1] > slow[:, -1]) & (fast[:, -2] <= slow[:, -2])
+    down = (fast[:, -1] < slow[:, -1]) & (fast[:, -2] >= slow[:, -2])
+    return np.where(up, 1, np.where(down, -1, 0))
+
+
+def _rsi_last(close, period=14):
+    """RSI on the last bar, matching calculate_rsi"""
+    if close.shape[1] < period:
+        return np.full(close.shape[0], np.nan)
+    delta = np.diff(close, axis=1, prepend=close[:, :1])
+    recent = delta[:, -period:]
+    gain = np.where(recent > 0, recent, 0).mean(axis=1)
+    loss = np.where(recent < 0, -recent, 0).mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+
+def _adx_last(high, low, close, period=14):
+    """ADX on the last bar, matching calculate_adx"""
+    return kernels.adx(high, low, close, period)[0][:, -1]
+
+
+def _double_pattern(values, peaks):
+    """True where the last two local extrema of the last 20 bars are within 1%"""
+    recent = values[:, -20:]
+    inner = recent[:, 1:-1]
+    if peaks:
+        mask = (recent[:, :-2] < inner) & (recent[:, 2:] < inner)
+    else:
+        mask = (recent[:, :-2] > inner) & (recent[:, 2:] > inner)
+
+    idx = np.arange(inner.shape[1])
+    last = np.where(mask, idx, -1).max(axis=1)
+    second = np.where(mask & (idx < last[:, None]), idx, -1).max(axis=1)
+
+    rows = np.arange(values.shape[0])
+    last_value = inner[rows, last]
+    second_value = inner[rows, second]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        close_enough = np.abs(last_value - second_value) / last_value < 0.01
+    return (second >= 0) & close_enough
+
+
+def _signal_columns(data, pairs):
+    """Pair labels and per-pair signal field arrays for every accepted input layout"""
+    if isinstance(data, pd.DataFrame):
+        pairs, ohlcv = _from_multiindex(data)
+    elif isinstance(data, dict):
+        pairs, ohlcv = stack_forex_data(data)
+    else:
+        ohlcv = np.asarray(data, dtype=float)
+        if pairs is None:
+            pairs = list(range(ohlcv.shape[0]))
+
+    if ohlcv.ndim != 3 or ohlcv.shape[2] != 5:
+        raise ValueError("Expected a (pairs, bars, 5) OHLCV array")
+    if ohlcv.shape[1] < 2:
+        raise ValueError("At least two bars are required")
+
+    high, low, close, volume = ohlcv[:, :, 1], ohlcv[:, :, 2], ohlcv[:, :, 3], ohlcv[:, :, 4]
+    n_pairs, n_bars = close.shape
+
+    # Trend from the EMA crossover
+    trend_code = _crossover(kernels.ema(close, 20), kernels.ema(close, 50))
+    trend = np.array(['neutral', 'bullish', 'bearish'])[trend_code]
+
+    # Support and resistance
+    support, resistance = nearest_levels(high, low, close)
+
+    # RSI and MACD
+    rsi = _rsi_last(close)
+    rsi_signal = np.where(rsi < 30, 1, np.where(rsi > 70, -1, 0))
+    macd, macd_line_signal = kernels.macd(close)
+    macd_signal = _crossover(macd, macd_line_signal)
+
+    # ADX and volume
+    adx = _adx_last(high, low, close)
+    strong = adx > 25
+
+    if n_bars >= 20:
+        vol_sma = volume[:, -20:].mean(axis=1)
+    else:
+        vol_sma = np.full(n_pairs, np.nan)
+    price_change = close[:, -1] - close[:, -2]
+    high_volume = volume[:, -1] > vol_sma * 1.5
+    volume_trend = np.where(high_volume & (price_change > 0), 'strong_bullish',
+                            np.where(high_volume & (price_change < 0), 'strong_bearish', 'neutral'))
+
+    # Price patterns
+    if n_bars > 20:
+        double_top = _double_pattern(high, peaks=True)
+        double_bottom = _double_pattern(low, peaks=False)
+    else:
+        double_top = double_bottom = np.zeros(n_pairs, dtype=bool)
+
+    # Signal generation logic
+    current_price = close[:, -1]
+    buy = (trend_code == 1) & strong & (rsi_signal == 1) & (macd_signal == 1)
+    sell = (trend_code == -1) & strong & (rsi_signal == -1) & (macd_signal == -1)
+    action = np.where(buy, 'buy', np.where(sell, 'sell', 'hold'))
+    stop_loss = np.where(buy, support, np.where(sell, resistance, np.nan))
+    take_profit = np.where(buy, current_price + (current_price - support) * 2,
+                           np.where(sell, current_price - (resistance - current_price) * 2, np.nan))
+
+    # Signal confidence
+    with np.errstate(invalid='ignore'):
+        trend_aligned = buy | sell
+        rsi_confirms = (buy & (rsi < 30)) | (sell & (rsi > 70))
+        near_support = buy & (np.abs(current_price - support) / current_price < 0.005)
+        near_resistance = sell & (np.abs(current_price - resistance) / current_price < 0.005)
+    confidence = 20 * (trend_aligned.astype(int) + rsi_confirms + (near_support | near_resistance))
+
+    columns = {
+        'action': action,
+        'strength': np.where(buy | sell, 'strong', 'neutral'),
+        'entry_price': current_price,
+        'stop_loss': stop_loss,
+        'take_profit': take_profit,
+        'confidence': confidence,
+        'trend': trend,
+        'trend_strength': np.where(strong, 'strong', 'weak'),
+        'rsi': rsi,
+        'macd': macd[:, -1],
+        'support': support,
+        'resistance': resistance,
+        'adx': adx,
+        'volume_trend': volume_trend,
+        'double_top': double_top,
+        'double_bottom': double_bottom,
+    }
+    return pairs, columns
+
+
+def _reason_codes(columns):
+    """(pairs, MAX_REASONS) Reason codes, in generate_trading_signals order"""
+    buy = columns['action'] == 'buy'
+    sell = columns['action'] == 'sell'
+    price = columns['entry_price']
+    with np.errstate(invalid='ignore'):
+        candidates = [
+            (Reason.STRONG_TREND, columns['trend_strength'] == 'strong'),
+            (Reason.STRONG_BUY, buy),
+            (Reason.BULLISH_VOLUME, buy & (columns['volume_trend'] == 'strong_bullish')),
+            (Reason.STRONG_SELL, sell),
+            (Reason.BEARISH_VOLUME, sell & (columns['volume_trend'] == 'strong_bearish')),
+            (Reason.DOUBLE_TOP, columns['double_top']),
+            (Reason.DOUBLE_BOTTOM, columns['double_bottom']),
+            (Reason.TREND_ALIGNED, buy | sell),
+            (Reason.RSI_OVERSOLD, buy & (columns['rsi'] < 30)),
+            (Reason.RSI_OVERBOUGHT, sell & (columns['rsi'] > 70)),
+            (Reason.NEAR_SUPPORT, buy & (np.abs(price - columns['support']) / price < 0.005)),
+            (Reason.NEAR_RESISTANCE, sell & (np.abs(price - columns['resistance']) / price < 0.005)),
+        ]
+    codes = np.stack([np.where(applies, int(reason), 0) for reason, applies in candidates], axis=1)
+    # Move each row's reasons to the front, keeping their order
+    codes = np.take_along_axis(codes, np.argsort(codes == 0, axis=1, kind='stable'), axis=1)
+    return codes[:, :MAX_REASONS].astype('u1')
+
+
+def generate_signal_batch(data, pairs=None):
+    """Generate trading signals for many pairs as a compact SignalBatch.
+
+    Accepts the same inputs as generate_trading_signals_batch; reasons are
+    kept as codes instead of text, so results for large universes stay small.
+    """
+    pairs, columns = _signal_columns(data, pairs)
+    return SignalBatch.from_columns(columns, _reason_codes(columns), pd.Index(pairs, name='pair'))
+
+
+def generate_trading_signals_batch(data, pairs=None):
+    """Generate trading signals for many pairs in one vectorized pass.
+
+    data is either a (pairs, bars, 5) OHLCV array, a dict of per-pair
+    DataFrames, or a DataFrame with a (pair, bar) MultiIndex. Returns one
+    row per pair with the same fields as generate_trading_signals.
+    """
+    pairs, columns = _signal_columns(data, pairs)
+    result = pd.DataFrame(columns, index=pd.Index(pairs, name='pair'))
+    result['reasoning'] = [render_reasons(codes, adx)
+                           for codes, adx in zip(_reason_codes(columns), columns['adx'])]
+    return result
@@ -0,0 +1,299 @@
+"""Benchmark harness for the indicator, signal, data and trading helpers.
+
+Run from the repository root:
+
+    python -m utils.benchmarks --bars 100 10000 1000000 --pairs 1 100 --save data/benchmarks/baseline.json
+    python -m utils.benchmarks --baseline data/benchmarks/baseline.json --pages
+
+Each case is timed over a grid of series lengths and pair counts. Every
+pair gets its own frame, generated outside the timed region, and the
+indicator cache is cleared before each call so results measure cold
+computation. Peak memory comes from a separate tracemalloc pass, which
+would otherwise distort the timings.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import data_generator, market_simulator, technical_analysis, trading_signals
+from .indicator_cache import indicator_cache
+from .portfolio_ledger import PortfolioLedger
+
+BAR_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+PAIR_COUNTS = (1, 10, 100, 500)
+
+# Grid cells above this many bars x pairs are skipped unless raised on the command line
+MAX_CELLS = 20_000_000
+
+# Relative slowdown (or memory growth) over the baseline that counts as a regression
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+
+# Differences smaller than these are timer or allocator noise, never regressions
+MIN_TIME_DELTA = 0.002
+MIN_MEMORY_DELTA = 1 << 20
+
+PAGES = ('app.py', 'pages/1_Trading.py', 'pages/2_Analysis.py', 'pages/3_Portfolio.py',
+         'pages/4_Diagnostics.py', 'pages/5_Watchlist.py')
+
+
+def _frame(pair_index, bars):
+    """Synthetic OHLCV frame for the pair_index-th pair; distinct data per pair.
+
+    Minute bars, since daily dates for the longer series would run past the
+    range pandas timestamps can represent.
+    """
+    return market_simulator.generate_market_data(['EUR/USD'], bars, '1m', seed=pair_index)['EUR/USD']
+
+
+def _session():
+    """Fresh portfolio in Streamlit session state for the trading helpers"""
+    import streamlit as st
+    st.session_state.portfolio = PortfolioLedger(initial_balance=1e18)
+    st.session_state.pop('matching_engine', None)
+
+
+def _execute_trades(data):
+    from .trading import execute_trade
+    _session()
+    for i, price in enumerate(data['Close'].to_numpy()):
+        execute_trade('buy' if i % 2 == 0 else 'sell', 1000.0, price, 'EUR/USD')
+
+
+def _check_exit_triggers(data):
+    from .trading import check_exit_triggers, execute_trade
+    _session()
+    closes = data['Close'].to_numpy()
+    execute_trade('buy', 1000.0, closes[0], 'EUR/USD', closes[0] * 0.9, closes[0] * 1.1)
+    for price in closes:
+        check_exit_triggers('EUR/USD', price)
+
+
+def _get_portfolio_value(data):
+    from .trading import get_portfolio_value
+    _session()
+    for _ in range(len(data)):
+        get_portfolio_value()
+
+
+def _uses_frame(func, *args, **kwargs):
+    return lambda data: func(data, *args, **kwargs)
+
+
+# name -> (callable taking one pair's frame, largest series length worth timing).
+# Per-bar Python loops are capped well below the vectorised cases.
+CASES = {
+    'technical_analysis.calculate_sma': (_uses_frame(technical_analysis.calculate_sma, 20), None),
+    'technical_analysis.calculate_ema': (_uses_frame(technical_analysis.calculate_ema, 20), None),
+    'technical_analysis.calculate_rsi': (_uses_frame(technical_analysis.calculate_rsi), None),
+    'technical_analysis.calculate_rsi[wilder]': (_uses_frame(technical_analysis.calculate_rsi, rsi_method='wilder'), None),
+    'technical_analysis.calculate_macd': (_uses_frame(technical_analysis.calculate_macd), None),
+    'trading_signals.calculate_adx': (_uses_frame(trading_signals.calculate_adx), None),
+    'trading_signals.calculate_adx[wilder]': (_uses_frame(trading_signals.calculate_adx, adx_method='wilder'), None),
+    'trading_signals.identify_price_patterns': (_uses_frame(trading_signals.identify_price_patterns), None),
+    'trading_signals.analyze_volume': (_uses_frame(trading_signals.analyze_volume), None),
+    'trading_signals.identify_trend': (_uses_frame(trading_signals.identify_trend), None),
+    'trading_signals.find_support_resistance': (_uses_frame(trading_signals.find_support_resistance), None),
+    'trading_signals.calculate_signal_strength': (_uses_frame(trading_signals.calculate_signal_strength), None),
+    'trading_signals.generate_trading_signals': (_uses_frame(trading_signals.generate_trading_signals), None),
+    # generate_forex_data spaces its dates a day apart, which overflows beyond ~200k bars
+    'data_generator.generate_forex_data': (lambda data: data_generator.generate_forex_data('EUR/USD', len(data)), 100_000),
+    'data_generator.load_forex_data': (lambda data: data_generator.load_forex_data('EUR/USD', len(data), '1m'), None),
+    'trading.execute_trade': (_execute_trades, 100_000),
+    'trading.check_exit_triggers': (_check_exit_triggers, 100_000),
+    'trading.get_portfolio_value': (_get_portfolio_value, 1_000_000),
+}
+
+
+def _reset_caches():
+    indicator_cache.clear()
+    market_simulator._cached_market_data.cache_clear()
+
+
+def _run_once(func, bars, pairs, trace):
+    """Total seconds spent in func over every pair, and the peak traced allocation"""
+    seconds, peak = 0.0, 0
+    for pair_index in range(pairs):
+        data = _frame(pair_index, bars)
+        _reset_caches()
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        func(data)
+        seconds += time.perf_counter() - started
+        if trace:
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    return seconds, peak
+
+
+def run_case(name, bars, pairs, repeats=3, measure_memory=True):
+    """Time one case at one grid point; returns a result dict"""
+    func, _ = CASES[name]
+    timings = [_run_once(func, bars, pairs, False)[0] for _ in range(repeats)]
+    result = {
+        'case': name,
+        'bars': bars,
+        'pairs': pairs,
+        'repeats': repeats,
+        'seconds': min(timings),
+        'median_seconds': statistics.median(timings),
+        'seconds_per_pair': min(timings) / pairs,
+        'peak_bytes': None,
+    }
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            result['peak_bytes'] = _run_once(func, bars, pairs, True)[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(cases=None, bar_sizes=BAR_SIZES, pair_counts=PAIR_COUNTS, repeats=3,
+              max_cells=MAX_CELLS, measure_memory=True, log=None):
+    """Run every selected case over the bars x pairs grid; returns the result dicts"""
+    results = []
+    for name in CASES if cases is None else cases:
+        limit = CASES[name][1]
+        for bars in bar_sizes:
+            if limit is not None and bars > limit:
+                continue
+            for pairs in pair_counts:
+                if bars * pairs > max_cells:
+                    continue
+                # Large grid points take long enough that one timing is representative
+                runs = repeats if bars * pairs <= 1_000_000 else 1
+                result = run_case(name, bars, pairs, runs, measure_memory)
+                results.append(result)
+                if log:
+                    log(_format(result))
+    return results
+
+
+def time_pages(pages=PAGES, repeats=3, timeout=60):
+    """Headless render time of each Streamlit page script, via Streamlit's AppTest runner"""
+    from streamlit.testing.v1 import AppTest
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for page in pages:
+        timings, errors = [], []
+        for _ in range(repeats):
+            _reset_caches()
+            app = AppTest.from_file(os.path.join(root, page), default_timeout=timeout)
+            # Pages other than app.py expect the portfolio the entry page creates
+            app.session_state['portfolio'] = PortfolioLedger(initial_balance=100000.0)
+            started = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - started)
+            errors = [str(e.value) for e in app.exception]
+        results.append({
+            'case': f'page:{page}',
+            'bars': None,
+            'pairs': None,
+            'repeats': repeats,
+            'seconds': min(timings),
+            'median_seconds': statistics.median(timings),
+            'peak_bytes': None,
+            'errors': errors,
+        })
+    return results
+
+
+def _key(result):
+    return f"{result['case']}|{result['bars']}|{result['pairs']}"
+
+
+def save_baseline(results, path):
+    """Write results, keyed by case and grid point, with the environment they came from"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'results': {_key(result): result for result in results},
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Results slower or hungrier than the baseline beyond the tolerances"""
+    regressions = []
+    for result in results:
+        previous = baseline['results'].get(_key(result))
+        if previous is None:
+            continue
+        slower = result['seconds'] - previous['seconds']
+        if slower > MIN_TIME_DELTA and result['seconds'] > previous['seconds'] * (1 + time_tolerance):
+            regressions.append({'key': _key(result), 'metric': 'seconds',
+                                'baseline': previous['seconds'], 'current': result['seconds']})
+        if result['peak_bytes'] is not None and previous.get('peak_bytes') is not None:
+            grown = result['peak_bytes'] - previous['peak_bytes']
+            if grown > MIN_MEMORY_DELTA and result['peak_bytes'] > previous['peak_bytes'] * (1 + memory_tolerance):
+                regressions.append({'key': _key(result), 'metric': 'peak_bytes',
+                                    'baseline': previous['peak_bytes'], 'current': result['peak_bytes']})
+    return regressions
+
+
+def _format(result):
+    memory = '' if result['peak_bytes'] is None else f"  peak {result['peak_bytes'] / 2**20:9.1f} MiB"
+    grid = '' if result['bars'] is None else f"{result['bars']:>10} bars x {result['pairs']:>3} pairs"
+    return f"{result['case']:<45} {grid}  {result['seconds'] * 1000:11.2f} ms{memory}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', nargs='*', help='substrings selecting which cases to run')
+    parser.add_argument('--bars', nargs='*', type=int, default=list(BAR_SIZES))
+    parser.add_argument('--pairs', nargs='*', type=int, default=list(PAIR_COUNTS))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--max-cells', type=int, default=MAX_CELLS, help='skip grid points above bars x pairs')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--pages', action='store_true', help='also time each Streamlit page headlessly')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--baseline', help='compare against a JSON baseline; exits 1 on regression')
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    cases = [name for name in CASES if not args.cases or any(s in name for s in args.cases)]
+    results = run_suite(cases, args.bars, args.pairs, args.repeats, args.max_cells,
+                        not args.no_memory, log=print)
+    if args.pages:
+        for result in time_pages(repeats=args.repeats):
+            results.append(result)
+            print(_format(result), *result['errors'])
+
+    if args.save:
+        save_baseline(results, args.save)
+    if args.baseline:
+        regressions = compare(results, load_baseline(args.baseline),
+                              args.time_tolerance, args.memory_tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['key']} {r['metric']}: {r['baseline']:.6g} -> {r['current']:.6g}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
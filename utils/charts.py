@@ -0,0 +1,275 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from .instrumentation import instrument
+
+# Upper bound on the points any trace sends to the browser
+MAX_POINTS = 2000
+
+# Visible range choices: how far back from the latest bar the chart shows
+VIEW_WINDOWS = {
+    '1D': pd.Timedelta(days=1),
+    '1W': pd.Timedelta(weeks=1),
+    '1M': pd.Timedelta(days=30),
+    '3M': pd.Timedelta(days=91),
+    '1Y': pd.Timedelta(days=365),
+    'All': None,
+}
+
+
+def visible_slice(data, window='All'):
+    """Rows of data inside the view window ending at the latest bar"""
+    span = VIEW_WINDOWS[window]
+    if span is None or len(data) == 0:
+        return data
+    dates = data['Date'].to_numpy()
+    start = np.searchsorted(dates, dates[-1] - span.to_timedelta64(), side='left')
+    return data.iloc[start:]
+
+
+def bucket_size(n, max_points=MAX_POINTS):
+    """Bars per aggregated point so that n bars fit in max_points"""
+    return max(1, math.ceil(n / max_points))
+
+
+def aggregate_ohlc(data, bucket):
+    """Merge each run of bucket bars into one OHLCV bar dated at its first bar"""
+    n = len(data)
+    if bucket <= 1:
+        return data
+    starts = np.arange(0, n, bucket)
+    ends = np.minimum(starts + bucket, n) - 1
+    result = {
+        'Date': data['Date'].to_numpy()[starts],
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in data:
+        result['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return pd.DataFrame(result)
+
+
+def bucket_last(values, bucket):
+    """Last value of each bucket, matching the Close of aggregate_ohlc"""
+    values = np.asarray(values)
+    if bucket <= 1:
+        return values
+    ends = np.minimum(np.arange(0, len(values), bucket) + bucket, len(values)) - 1
+    return values[ends]
+
+
+def lttb(y, threshold=MAX_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling; returns the indices to keep.
+
+    Points are treated as evenly spaced in x, which is how bars are laid out.
+    The first and last points are always kept; NaNs (indicator warm-up) are
+    skipped when choosing each bucket's representative.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= threshold:
+        return valid
+    x = valid.astype(float)
+    y = y[valid]
+    n = len(y)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third vertex of the triangle
+        cx = x[hi:next_hi].mean() if next_hi > hi else x[-1]
+        cy = y[hi:next_hi].mean() if next_hi > hi else y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return valid[selected]
+
+
+class PriceChart:
+    """Downsampled candlestick figure with line overlays that absorbs appended bars.
+
+    The figure is built once from the visible bars, aggregated so it holds at
+    most max_points candles. Later calls with the same series plus newer bars
+    only re-aggregate the last (partial) bucket and append new ones, and drop
+    the buckets that scrolled out of the window; a full rebuild happens when
+    the history no longer lines up or the figure has grown to twice max_points.
+    """
+
+    def __init__(self, title, max_points=MAX_POINTS, template=None):
+        self.title = title
+        self.max_points = max_points
+        self.template = template
+        self.figure = None
+        self.lock = threading.Lock()
+
+    def _build(self, data, overlays):
+        import plotly.graph_objects as go  # deferred: plotly is only needed once a chart is drawn
+
+        self.bucket = bucket_size(len(data), self.max_points)
+        bars = aggregate_ohlc(data, self.bucket)
+        self.columns = {name: bars[name].to_numpy() for name in ('Date', 'Open', 'High', 'Low', 'Close')}
+        self.overlays = {name: bucket_last(values, self.bucket) for name, values in overlays.items()}
+        self.partial = len(data) - (len(bars) - 1) * self.bucket  # bars in the last bucket
+        self.last_date = data['Date'].iloc[-1]
+
+        self.figure = go.Figure()
+        self.figure.add_trace(go.Candlestick(x=self.columns['Date'], open=self.columns['Open'],
+                                             high=self.columns['High'], low=self.columns['Low'],
+                                             close=self.columns['Close'], name='Price'))
+        for name, values in self.overlays.items():
+            self.figure.add_trace(go.Scatter(x=self.columns['Date'], y=values, name=name))
+        self.figure.update_layout(title=self.title, yaxis_title='Price', xaxis_title='Date',
+                                  template=self.template)
+
+    def _extend(self, data, overlays):
+        """Fold bars newer than the last one drawn into the figure; False if a rebuild is needed"""
+        if set(overlays) != set(self.overlays):
+            return False
+        dates = data['Date'].to_numpy()
+        position = np.searchsorted(dates, np.datetime64(self.last_date))
+        if position >= len(dates) or dates[position] != np.datetime64(self.last_date):
+            return False
+        if position == len(dates) - 1:
+            return True  # nothing new
+        start = position + 1 - self.partial
+        if start < 0:
+            return False
+
+        bars = aggregate_ohlc(data.iloc[start:], self.bucket)
+        # Buckets starting before the window's first bar have scrolled out of view
+        first = min(int(np.searchsorted(self.columns['Date'], np.datetime64(data['Date'].iloc[0]))),
+                    len(self.columns['Date']) - 1)
+        if len(self.columns['Date']) - 1 - first + len(bars) > 2 * self.max_points:
+            return False
+        for name in self.columns:
+            self.columns[name] = np.concatenate([self.columns[name][first:-1], bars[name].to_numpy()])
+        for name, values in overlays.items():
+            tail = bucket_last(np.asarray(values)[start:], self.bucket)
+            self.overlays[name] = np.concatenate([self.overlays[name][first:-1], tail])
+        self.partial = len(data) - start - (len(bars) - 1) * self.bucket
+        self.last_date = data['Date'].iloc[-1]
+
+        with self.figure.batch_update():
+            candles = self.figure.data[0]
+            candles.x = self.columns['Date']
+            candles.open = self.columns['Open']
+            candles.high = self.columns['High']
+            candles.low = self.columns['Low']
+            candles.close = self.columns['Close']
+            for trace, values in zip(self.figure.data[1:], self.overlays.values()):
+                trace.x = self.columns['Date']
+                trace.y = values
+        return True
+
+    @instrument('charts.price_figure')
+    def render(self, data, overlays=None, levels=()):
+        """Figure dict for data (already windowed); levels are (y, color, label) lines"""
+        overlays = overlays or {}
+        with self.lock:
+            if self.figure is None or not self._extend(data, overlays):
+                self._build(data, overlays)
+            self.figure.layout.shapes = ()
+            self.figure.layout.annotations = ()
+            for y, color, label in levels:
+                if y is not None and not pd.isna(y):
+                    self.figure.add_hline(y=y, line_dash="dash", line_color=color, annotation_text=label)
+            # A snapshot, so another session extending the figure can't race the serializer
+            return self.figure.to_dict()
+
+
+@instrument('charts.line_figure')
+def line_figure(dates, series, title, levels=(), template=None, kind='line', max_points=MAX_POINTS):
+    """Figure with one trace per named series, each LTTB-downsampled to max_points"""
+    import plotly.graph_objects as go
+
+    dates = np.asarray(dates)
+    fig = go.Figure()
+    for name, values in series.items():
+        values = np.asarray(values, dtype=float)
+        keep = lttb(values, max_points)
+        if kind == 'bar':
+            fig.add_trace(go.Bar(x=dates[keep], y=values[keep], name=name,
+                                 marker_color='rgba(0,150,255,0.5)'))
+        else:
+            fig.add_trace(go.Scatter(x=dates[keep], y=values[keep], name=name))
+    for y, color in levels:
+        fig.add_hline(y=y, line_dash="dash", line_color=color)
+    fig.update_layout(title=title, template=template)
+    return fig.to_dict()
+
+
+@instrument('charts.heatmap_figure')
+def heatmap_figure(matrix, title, template=None, zmin=-1.0, zmax=1.0):
+    """Annotated heatmap of a square, labelled frame (e.g. a correlation matrix)"""
+    import plotly.graph_objects as go
+
+    labels = list(matrix.columns)
+    values = matrix.to_numpy(dtype=float)
+    # Cell labels only while they stay readable
+    text = np.round(values, 2) if len(labels) <= 20 else None
+    fig = go.Figure(go.Heatmap(z=values, x=labels, y=labels, zmin=zmin, zmax=zmax,
+                               colorscale='RdBu', reversescale=True, text=text,
+                               texttemplate='%{text}' if text is not None else None))
+    fig.update_layout(title=title, template=template, yaxis_autorange='reversed')
+    return fig.to_dict()
+
+
+class FigureCache:
+    """Process-wide LRU of built figures, keyed by (pair, range, indicators, ...)"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def price_chart(self, key, title, template=None):
+        """The PriceChart for key, created on first use"""
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is None:
+                chart = self._entries[key] = PriceChart(title, template=template)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return chart
+
+    def line_figure(self, key, dates, series, title, **kwargs):
+        """line_figure(...) memoized on key plus a content hash of the dates and series"""
+        dates = np.asarray(dates)
+        digest = hashlib.blake2b(np.ascontiguousarray(dates).tobytes(), digest_size=16)
+        for name, values in series.items():
+            digest.update(str(name).encode())
+            digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+        full_key = (key, digest.hexdigest())
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                return self._entries[full_key]
+        fig = line_figure(dates, series, title, **kwargs)
+        with self._lock:
+            self._entries[full_key] = fig
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+figure_cache = FigureCache()
@@ -0,0 +1,282 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .instrumentation import instrument
+from .market_simulator import BASE_PRICES, TIMEFRAMES, generate_market_data
+
+# Rolling windows, in bars, that the correlation engine keeps statistics for
+WINDOWS = (20, 60, 250)
+
+# Buy/sell signals on pairs whose direction-adjusted correlation is above this count as one trade
+DEDUPE_THRESHOLD = 0.7
+DEDUPE_PENALTY = 20
+
+
+class CorrelationEngine:
+    """Rolling covariance and correlation of one-bar returns across a pair universe.
+
+    The last max(windows) rows of simple returns sit in one ring buffer.
+    Each window keeps running sums of returns and of their outer products:
+    a new bar adds its row and removes the row that just left that window,
+    so an update costs O(pairs^2) per window however long the windows are.
+    Matrices are derived from the sums on request and cached until the
+    next bar. The sums are recomputed from the buffer once per lap so
+    rounding errors can't accumulate.
+    """
+
+    def __init__(self, pairs, windows=WINDOWS):
+        self.pairs = list(pairs)
+        self.columns = {pair: i for i, pair in enumerate(self.pairs)}
+        self.windows = tuple(sorted(windows))
+        self.capacity = self.windows[-1]
+        n = len(self.pairs)
+        self.returns = np.zeros((self.capacity, n))
+        self.count = 0        # rows filled, up to capacity
+        self.position = 0     # next row to write
+        self.bars = 0         # rows ever appended
+        self.last_close = None
+        self.last_date = None
+        self.version = 0
+        self._sums = {window: np.zeros(n) for window in self.windows}
+        self._outer = {window: np.zeros((n, n)) for window in self.windows}
+        self._matrices = {}
+        self._lock = threading.RLock()  # refresh() holds it across its own append() and reset()
+
+    @instrument('correlation.append')
+    def append(self, closes, date=None):
+        """Add one bar of closes (array in pair order), or several as a (bars, pairs) array"""
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        with self._lock:
+            if self.last_close is None:
+                self.last_close, closes = closes[0], closes[1:]
+            previous = np.vstack([self.last_close, closes[:-1]])
+            rows = closes / previous - 1.0
+            # Past a few rows per window, one rescan is cheaper than a running update per row
+            if len(rows) * (len(self.windows) + 1) > sum(self.windows):
+                self._extend(rows)
+            else:
+                for row in rows:
+                    self._push(row)
+            if len(closes):
+                self.last_close = closes[-1]
+            if date is not None:
+                self.last_date = date
+            self._changed()
+
+    def _push(self, row):
+        for window in self.windows:
+            if self.bars >= window:
+                old = self.returns[(self.position - window) % self.capacity]
+                self._sums[window] -= old
+                self._outer[window] -= np.outer(old, old)
+        self.returns[self.position] = row
+        added = np.outer(row, row)
+        for window in self.windows:
+            self._sums[window] += row
+            self._outer[window] += added
+        self.position = (self.position + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.bars += 1
+        if self.position == 0:
+            self._resync()
+
+    def _extend(self, rows):
+        """Write many rows into the buffer at once, then recompute every window's sums"""
+        self.bars += len(rows)
+        rows = rows[-self.capacity:]
+        self.returns[(self.position + np.arange(len(rows))) % self.capacity] = rows
+        self.position = (self.position + len(rows)) % self.capacity
+        self.count = min(self.count + len(rows), self.capacity)
+        self._resync()
+
+    def _resync(self):
+        for window in self.windows:
+            rows = self.window_returns(window)
+            self._sums[window] = rows.sum(axis=0)
+            self._outer[window] = rows.T @ rows
+
+    def _changed(self):
+        self._matrices.clear()
+        self.version += 1
+
+    def _window(self, window):
+        window = self.capacity if window is None else window
+        if window not in self._sums:
+            raise ValueError(f"No statistics for a {window}-bar window; windows are {self.windows}")
+        return window
+
+    def window_returns(self, window=None):
+        """Returns of the last window bars, oldest first"""
+        n = min(self.count, self._window(window))
+        return self.returns[(self.position - np.arange(n, 0, -1)) % self.capacity]
+
+    def observations(self, window=None):
+        """Bars of returns in a window so far"""
+        return min(self.count, self._window(window))
+
+    def mean(self, window=None):
+        window = self._window(window)
+        return self._sums[window] / max(self.observations(window), 1)
+
+    def covariance(self, window=None):
+        """Sample covariance of one-bar returns over the last window bars (the longest by default)"""
+        window = self._window(window)
+        key = ('covariance', window)
+        covariance = self._matrices.get(key)
+        if covariance is None:
+            with self._lock:
+                n = max(self.observations(window), 2)
+                mean = self.mean(window)
+                covariance = (self._outer[window] - n * np.outer(mean, mean)) / (n - 1)
+                self._matrices[key] = covariance
+        return covariance
+
+    def correlation(self, window=None):
+        """Correlation matrix over the last window bars; pairs with no variance correlate 0 with the rest"""
+        window = self._window(window)
+        key = ('correlation', window)
+        correlation = self._matrices.get(key)
+        if correlation is None:
+            covariance = self.covariance(window)
+            sd = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation = covariance / np.outer(sd, sd)
+            correlation = np.clip(np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0), -1.0, 1.0)
+            np.fill_diagonal(correlation, 1.0)
+            with self._lock:
+                # Keep it only if no bar arrived while it was being computed
+                if self._matrices.get(('covariance', window)) is covariance:
+                    self._matrices[key] = correlation
+        return correlation
+
+    def correlation_frame(self, window=None):
+        """correlation(window) labelled with the pairs"""
+        return pd.DataFrame(self.correlation(window), index=self.pairs, columns=self.pairs)
+
+    def reset(self):
+        """Forget every stored return"""
+        with self._lock:
+            self.returns[:] = 0.0
+            self.count = self.position = self.bars = 0
+            self.last_close = self.last_date = None
+            for window in self.windows:
+                self._sums[window][:] = 0.0
+                self._outer[window][:] = 0.0
+            self._changed()
+
+    def refresh(self, dates, closes):
+        """Append the bars of a (bars, pairs) close history newer than the last one seen.
+
+        If the history no longer contains the last bar seen with the same
+        closes (e.g. regenerated synthetic data), the engine starts over
+        from the given bars. Returns the number of bars appended. The
+        check and the append happen under one lock, so concurrent refreshes
+        can't append the same bars twice.
+        """
+        dates = np.asarray(dates)
+        closes = np.asarray(closes, dtype=float)
+        with self._lock:
+            start = 0
+            if self.last_date is not None:
+                start = int(np.searchsorted(dates, self.last_date, side='right'))
+                if (start == 0 or dates[start - 1] != self.last_date
+                        or not np.array_equal(closes[start - 1], self.last_close)):
+                    self.reset()
+                    start = 0
+            if start == len(dates):
+                return 0
+            self.append(closes[start:], dates[-1])
+            return len(dates) - start
+
+
+@lru_cache(maxsize=8)
+def _simulated_closes(pairs, periods, timeframe, end):
+    frames = generate_market_data(pairs, periods, timeframe, end=end)
+    return frames[pairs[0]]['Date'].to_numpy(), np.column_stack([frames[pair]['Close'].to_numpy() for pair in pairs])
+
+
+def load_closes(pairs, periods, timeframe='1D', store=None):
+    """(dates, closes) for the last periods bars of several pairs, closes shaped (bars, pairs).
+
+    Uses the bar store when it holds enough bars for every pair, keeping
+    the dates all pairs share. Otherwise the pairs are simulated together,
+    so the synthetic closes carry the BASE_CORRELATIONS structure (the
+    per-pair mock data the pages chart is drawn independently).
+    """
+    pairs = tuple(pairs)
+    store = store or get_bar_store()
+    if all(store.count(pair, timeframe) >= periods for pair in pairs):
+        closes = pd.concat([store.tail(pair, timeframe, periods).set_index('Date')['Close'].rename(pair)
+                            for pair in pairs], axis=1, join='inner').sort_index()
+        return closes.index.to_numpy(), closes.to_numpy()
+    end = pd.Timestamp.now().floor(TIMEFRAMES[timeframe][1])
+    return _simulated_closes(pairs, periods, timeframe, end)
+
+
+@lru_cache(maxsize=8)
+def _cached_engine(pairs, timeframe, windows):
+    return CorrelationEngine(pairs, windows)
+
+
+def get_correlation_engine(pairs=tuple(BASE_PRICES), timeframe='1D', windows=WINDOWS):
+    """Process-wide correlation engine for a pair universe and timeframe, topped up with newer bars"""
+    engine = _cached_engine(tuple(pairs), timeframe, tuple(windows))
+    engine.refresh(*load_closes(pairs, engine.capacity + 1, timeframe))
+    return engine
+
+
+def _direction(signal):
+    return {'buy': 1, 'sell': -1}.get(signal['action'], 0)
+
+
+@instrument()
+def dedupe_signals(signals, correlation, threshold=DEDUPE_THRESHOLD, penalty=DEDUPE_PENALTY):
+    """Mark buy/sell signals that repeat a more confident one on a correlated pair.
+
+    signals maps pair -> generate_trading_signals dict and correlation is
+    a pair-labelled frame (CorrelationEngine.correlation_frame). Buying one
+    pair and selling another is the same bet when the two are negatively
+    correlated, so correlations are signed by both directions. Going from
+    the most confident signal down, a signal whose adjusted correlation
+    with one already kept is above threshold loses penalty confidence and
+    names that pair in metrics['duplicate_of']. Returns new dicts.
+    """
+    result = {pair: {**signal, 'metrics': {**signal['metrics'], 'duplicate_of': None}}
+              for pair, signal in signals.items()}
+    active = [pair for pair, signal in signals.items() if _direction(signal) and pair in correlation.index]
+    active.sort(key=lambda pair: signals[pair]['confidence'], reverse=True)
+
+    kept = []
+    for pair in active:
+        direction = _direction(signals[pair])
+        match = None
+        for other in kept:
+            rho = float(correlation.at[pair, other]) * direction * _direction(signals[other])
+            if rho > threshold and (match is None or rho > match[1]):
+                match = (other, rho)
+        if match is None:
+            kept.append(pair)
+            continue
+        other, rho = match
+        signal = result[pair]
+        signal['confidence'] = max(signal['confidence'] - penalty, 0)
+        signal['reasoning'] = [*signal['reasoning'],
+                               f"Repeats the {signals[other]['action']} signal on {other} "
+                               f"(adjusted correlation {rho:.2f})"]
+        signal['metrics']['duplicate_of'] = other
+    return result
+
+
+def dedupe_table(signals, correlation, threshold=DEDUPE_THRESHOLD, penalty=DEDUPE_PENALTY):
+    """One row per pair: action, confidence before and after de-duplication, and the pair it repeats"""
+    deduped = dedupe_signals(signals, correlation, threshold, penalty)
+    return pd.DataFrame({
+        'Action': [signal['action'].upper() for signal in signals.values()],
+        'Confidence': [signal['confidence'] for signal in signals.values()],
+        'Adjusted': [signal['confidence'] for signal in deduped.values()],
+        'Repeats': [signal['metrics']['duplicate_of'] or '' for signal in deduped.values()],
+    }, index=pd.Index(list(signals), name='Pair'))
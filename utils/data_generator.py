@@ -1,36 +1,40 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from .bar_store import get_bar_store
+from .market_simulator import BASE_PRICES, get_forex_data
+from .instrumentation import instrument
 
-def generate_forex_data(pair, periods=100):
+@instrument()
+def generate_forex_data(pair, periods=100, seed=42):
     """Generate mock forex data for the given currency pair."""
-    np.random.seed(42)  # For reproducible mock data
+    rng = np.random.RandomState(seed)  # For reproducible mock data without touching global state
     
     end_date = datetime.now()
     start_date = end_date - timedelta(days=periods)
     dates = pd.date_range(start=start_date, end=end_date, periods=periods)
     
-    # Base prices for different pairs
-    base_prices = {
-        'EUR/USD': 1.10,
-        'GBP/USD': 1.25,
-        'USD/JPY': 110.0,
-        'USD/CHF': 0.90
-    }
-    
-    base_price = base_prices.get(pair, 1.0)
+    base_price = BASE_PRICES.get(pair, 1.0)
     
     # Generate price data with random walk
-    prices = np.random.normal(0, 0.002, periods).cumsum()
+    prices = rng.normal(0, 0.002, periods).cumsum()
     prices = base_price + prices
     
     df = pd.DataFrame({
         'Date': dates,
-        'Open': prices + np.random.normal(0, 0.001, periods),
-        'High': prices + np.abs(np.random.normal(0, 0.002, periods)),
-        'Low': prices - np.abs(np.random.normal(0, 0.002, periods)),
+        'Open': prices + rng.normal(0, 0.001, periods),
+        'High': prices + np.abs(rng.normal(0, 0.002, periods)),
+        'Low': prices - np.abs(rng.normal(0, 0.002, periods)),
         'Close': prices,
-        'Volume': np.random.randint(1000, 10000, periods)
+        'Volume': rng.randint(1000, 10000, periods)
     })
     
     return df
+
+@instrument()
+def load_forex_data(pair, periods=100, timeframe='1D', store=None):
+    """Load the latest bars for a pair from the bar store, falling back to cached mock data"""
+    store = store or get_bar_store()
+    if store.count(pair, timeframe) >= periods:
+        return store.tail(pair, timeframe, periods)
+    return get_forex_data(pair, periods, timeframe=timeframe)
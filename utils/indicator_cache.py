@@ -0,0 +1,161 @@
+import hashlib
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(data):
+    """Content hash of a DataFrame's index, column names and values"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(data.index, pd.RangeIndex):
+        digest.update(repr((data.index.start, data.index.stop, data.index.step)).encode())
+    else:
+        digest.update(pd.util.hash_pandas_object(data.index, index=False).to_numpy().tobytes())
+
+    for name in data.columns:
+        values = data[name].to_numpy()
+        digest.update(str(name).encode())
+        if values.dtype.kind in 'biufcmM':
+            digest.update(str(values.dtype).encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        else:
+            digest.update(pd.util.hash_pandas_object(data[name], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _signature(data, samples=64):
+    """Shape, columns and a sample of rows (always the first and last) of a frame.
+
+    Cheap to compute, and changes when bars are appended or the forming bar
+    is updated in place.
+    """
+    rows = np.unique(np.linspace(0, len(data) - 1, min(samples, len(data))).astype(np.int64))
+    values = []
+    for name in data.columns:
+        sample = data[name].to_numpy()[rows]
+        values.append(sample.tobytes() if sample.dtype.kind in 'biufcmM' else tuple(sample.tolist()))
+    return data.shape, tuple(data.columns), tuple(values)
+
+
+def _result_size(result):
+    """Approximate memory footprint of a cached result in bytes"""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(index=True))
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(_result_size(item) for item in result)
+    return sys.getsizeof(result)
+
+
+class IndicatorCache:
+    """Process-wide, content-addressed cache for indicator results.
+
+    Entries are keyed on (data fingerprint, function, params), so every page,
+    rerun and session computing the same indicator on the same bars shares
+    one result. Eviction is LRU, bounded by entry count and total bytes.
+    Cached results are shared objects and must be treated as read-only.
+    A frame is hashed once per object and again only if its shape, columns
+    or a sample of its rows (always including the last) change, so an edit
+    to the forming bar is picked up; other in-place edits may not be, so
+    copy a frame before editing values in the middle of it.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._fingerprints = {}  # id(frame) -> (weakref, _signature(frame), fingerprint)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def compute(self, data, func, *args, **kwargs):
+        """Return func(data, *args, **kwargs), computing it at most once per distinct input"""
+        key = (self.fingerprint(data), f'{func.__module__}.{func.__qualname__}', args,
+               tuple(sorted(kwargs.items())))
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                pending = self._pending.get(key)
+                if pending is None:
+                    # This thread computes; concurrent callers wait for it
+                    self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            pending.wait()
+
+        try:
+            result = func(data, *args, **kwargs)
+            self._store(key, result)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+        return result
+
+    def fingerprint(self, data):
+        """fingerprint(data), memoized for as long as the frame object is alive and unchanged"""
+        signature = _signature(data)
+        entry = self._fingerprints.get(id(data))
+        if entry is not None and entry[0]() is data and entry[1] == signature:
+            return entry[2]
+
+        digest = fingerprint(data)
+        try:
+            ref = weakref.ref(data, lambda ref, key=id(data): self._forget(key, ref))
+        except TypeError:
+            return digest
+        self._fingerprints[id(data)] = (ref, signature, digest)
+        return digest
+
+    def _forget(self, key, ref):
+        # Drop a dead frame's entry unless its id has already been reused
+        entry = self._fingerprints.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._fingerprints[key]
+
+    def _store(self, key, result):
+        size = _result_size(result)
+        with self._lock:
+            self._entries[key] = (result, size)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+# Shared by every page and session in the Streamlit server process
+indicator_cache = IndicatorCache()
@@ -0,0 +1,427 @@
+import asyncio
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .market_simulator import TIMEFRAMES, generate_ticks
+
+
+class Tick(NamedTuple):
+    pair: str
+    timestamp: int  # nanoseconds since the epoch
+    bid: float
+    ask: float
+    volume: float
+
+    @property
+    def mid(self):
+        return (self.bid + self.ask) / 2
+
+
+class FeedAdapter:
+    """Interface for market data feeds.
+
+    Subclasses implement ticks() as an async iterator of Tick tuples and
+    may override connect() and close() for connection handling.
+    """
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def ticks(self):
+        raise NotImplementedError
+
+
+class SimulatedFeed(FeedAdapter):
+    """In-process feed replaying synthetic ticks for several pairs.
+
+    Ticks are generated in chunks per pair with generate_ticks and merged
+    by timestamp. With ticks_per_second set, the feed paces itself in
+    wall-clock time; with None it emits as fast as the consumer allows.
+    start_prices maps pairs to the mid their ticks start from (by default
+    the pair's base price).
+    """
+
+    def __init__(self, pairs, ticks_per_second=1000.0, seed=42, chunk_size=10000, batch_size=100,
+                 start_prices=None):
+        self.pairs = list(pairs)
+        self.start_prices = dict(start_prices or {})
+        self.ticks_per_second = ticks_per_second
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def _chunks(self):
+        """Merged tick chunks across pairs, each pair continuing from its last quote"""
+        rate = (self.ticks_per_second or 1000.0) / len(self.pairs)
+        starts = {pair: pd.Timestamp.now() for pair in self.pairs}
+        prices = {pair: self.start_prices.get(pair) for pair in self.pairs}
+        chunk = 0
+        while True:
+            frames = []
+            for pair in self.pairs:
+                ticks = generate_ticks(pair, self.chunk_size, seed=self.seed + chunk, start=starts[pair],
+                                       ticks_per_second=rate, start_price=prices[pair])
+                ticks['pair'] = pair
+                starts[pair] = ticks['Date'].iloc[-1]
+                prices[pair] = (ticks['Bid'].iloc[-1] + ticks['Ask'].iloc[-1]) / 2
+                frames.append(ticks)
+            yield pd.concat(frames).sort_values('Date', kind='stable')
+            chunk += 1
+
+    async def ticks(self):
+        started = time.monotonic()
+        emitted = 0
+        for chunk in self._chunks():
+            rows = zip(chunk['pair'].values, chunk['Date'].values.view('int64'),
+                       chunk['Bid'].values, chunk['Ask'].values, chunk['Volume'].values)
+            for i, (pair, ts, bid, ask, volume) in enumerate(rows):
+                yield Tick(pair, int(ts), float(bid), float(ask), float(volume))
+                emitted += 1
+                if (i + 1) % self.batch_size == 0:
+                    delay = 0.0
+                    if self.ticks_per_second:
+                        delay = max(0.0, emitted / self.ticks_per_second - (time.monotonic() - started))
+                    await asyncio.sleep(delay)
+
+
+class SimulatedTickServer:
+    """Local TCP server streaming simulated ticks as CSV lines.
+
+    Stands in for a real market data endpoint: each connected client gets
+    'pair,timestamp_ns,bid,ask,volume' lines from its own SimulatedFeed.
+    """
+
+    def __init__(self, pairs, host='127.0.0.1', port=0, **feed_kwargs):
+        self.pairs = list(pairs)
+        self.host = host
+        self.port = port
+        self.feed_kwargs = feed_kwargs
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        feed = SimulatedFeed(self.pairs, **self.feed_kwargs)
+        try:
+            async for tick in feed.ticks():
+                # A dead peer doesn't fill the buffer (asyncio drops the writes), so check for it directly
+                if writer.is_closing():
+                    return
+                writer.write(f'{tick.pair},{tick.timestamp},{tick.bid!r},{tick.ask!r},{tick.volume!r}\n'.encode())
+                if writer.transport.get_write_buffer_size() > 64 * 1024:
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class SocketFeed(FeedAdapter):
+    """Feed adapter reading CSV tick lines from a TCP endpoint"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    async def ticks(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return
+            pair, ts, bid, ask, volume = line.decode().rstrip().split(',')
+            yield Tick(pair, int(ts), float(bid), float(ask), float(volume))
+
+
+class BarRingBuffer:
+    """Fixed-capacity ring buffer of completed OHLCV bars.
+
+    One writer appends; readers take consistent snapshots without locks by
+    checking a sequence number that is odd while a write is in progress.
+    """
+
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self._dates = np.zeros(capacity, dtype='int64')
+        self._values = np.zeros((capacity, 5))
+        self._count = 0
+        self._sequence = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp, open_, high, low, close, volume):
+        self._sequence += 1
+        slot = self._count % self.capacity
+        self._dates[slot] = timestamp
+        self._values[slot] = (open_, high, low, close, volume)
+        self._count += 1
+        self._sequence += 1
+
+    def snapshot(self, n=None):
+        """Copy of the last n bars (all retained bars by default) as a DataFrame"""
+        while True:
+            sequence = self._sequence
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            count = self._count
+            size = min(count, self.capacity) if n is None else min(n, count, self.capacity)
+            idx = np.arange(count - size, count) % self.capacity
+            dates = self._dates[idx]
+            values = self._values[idx]
+            if sequence == self._sequence:
+                break
+
+        return pd.DataFrame({
+            'Date': dates.view('datetime64[ns]'),
+            'Open': values[:, 0],
+            'High': values[:, 1],
+            'Low': values[:, 2],
+            'Close': values[:, 3],
+            'Volume': values[:, 4],
+        })
+
+
+class BarAggregator:
+    """Aggregates ticks into OHLCV bars for several timeframes at once"""
+
+    def __init__(self, timeframes=('1m', '5m', '1h'), capacity=10000):
+        self.timeframes = list(timeframes)
+        self._bucket_ns = {tf: TIMEFRAMES[tf][0] * 1_000_000_000 for tf in self.timeframes}
+        self.capacity = capacity
+        self.buffers = {}
+        self._forming = {}
+        self._subscribers = []
+        self._tick_subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(pair, timeframe, bar) with each completed bar"""
+        self._subscribers.append(callback)
+
+    def subscribe_ticks(self, callback):
+        """Call callback(tick) with each tick, before the bars it completes are published"""
+        self._tick_subscribers.append(callback)
+
+    def buffer(self, pair, timeframe):
+        key = (pair, timeframe)
+        if key not in self.buffers:
+            self.buffers[key] = BarRingBuffer(self.capacity)
+        return self.buffers[key]
+
+    def forming_bar(self, pair, timeframe):
+        """The bar currently being built, as [bucket_start, open, high, low, close, volume]"""
+        bar = self._forming.get((pair, timeframe))
+        return None if bar is None else list(bar)
+
+    def add_tick(self, tick):
+        """Fold one tick into every timeframe; returns the number of bars completed"""
+        for callback in self._tick_subscribers:
+            callback(tick)
+        price = tick.mid
+        completed = 0
+        for timeframe, bucket_ns in self._bucket_ns.items():
+            key = (tick.pair, timeframe)
+            bucket = tick.timestamp - tick.timestamp % bucket_ns
+            bar = self._forming.get(key)
+
+            if bar is not None and bar[0] == bucket:
+                if price > bar[2]:
+                    bar[2] = price
+                if price < bar[3]:
+                    bar[3] = price
+                bar[4] = price
+                bar[5] += tick.volume
+                continue
+
+            if bar is not None:
+                self._publish(tick.pair, timeframe, bar)
+                completed += 1
+            self._forming[key] = [bucket, price, price, price, price, tick.volume]
+        return completed
+
+    def _publish(self, pair, timeframe, bar):
+        self.buffer(pair, timeframe).append(*bar)
+        for callback in self._subscribers:
+            callback(pair, timeframe, bar)
+
+
+class IngestionMetrics:
+    """Counters for the ingestion pipeline"""
+
+    def __init__(self):
+        self.ticks_received = 0
+        self.ticks_processed = 0
+        self.ticks_dropped = 0
+        self.bars_published = 0
+        self.queue_high_watermark = 0
+        self.started_at = time.monotonic()
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'ticks_received': self.ticks_received,
+            'ticks_processed': self.ticks_processed,
+            'ticks_dropped': self.ticks_dropped,
+            'bars_published': self.bars_published,
+            'queue_high_watermark': self.queue_high_watermark,
+            'ticks_per_second': self.ticks_processed / elapsed,
+        }
+
+
+class IngestionPipeline:
+    """Asyncio pipeline from a feed adapter through bar aggregation to ring buffers.
+
+    The feed and the aggregator are decoupled by a bounded queue. When the
+    queue is full, overflow='drop_oldest' discards the oldest queued tick,
+    'drop_newest' discards the incoming one, and 'block' applies
+    backpressure to the feed. Dropped ticks are counted in metrics.
+    """
+
+    def __init__(self, feed, timeframes=('1m', '5m', '1h'), queue_size=10000,
+                 overflow='drop_oldest', capacity=10000):
+        if overflow not in ('drop_oldest', 'drop_newest', 'block'):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.feed = feed
+        self.aggregator = BarAggregator(timeframes, capacity)
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.metrics = IngestionMetrics()
+        self._queue = None
+        self._tasks = []
+        self._loop = None
+        self._thread = None
+
+    async def _produce(self):
+        await self.feed.connect()
+        try:
+            async for tick in self.feed.ticks():
+                self.metrics.ticks_received += 1
+                if self._queue.full():
+                    if self.overflow == 'drop_newest':
+                        self.metrics.ticks_dropped += 1
+                        continue
+                    if self.overflow == 'drop_oldest':
+                        self._queue.get_nowait()
+                        self.metrics.ticks_dropped += 1
+                if self.overflow == 'block':
+                    await self._queue.put(tick)
+                else:
+                    self._queue.put_nowait(tick)
+                self.metrics.queue_high_watermark = max(self.metrics.queue_high_watermark,
+                                                        self._queue.qsize())
+        finally:
+            await self.feed.close()
+        # Tell the consumer the feed has ended
+        await self._queue.put(None)
+
+    async def _consume(self):
+        while True:
+            tick = await self._queue.get()
+            # Drain whatever is already queued before yielding to the producer
+            while tick is not None:
+                self.metrics.bars_published += self.aggregator.add_tick(tick)
+                self.metrics.ticks_processed += 1
+                if self._queue.empty():
+                    break
+                tick = self._queue.get_nowait()
+            if tick is None:
+                return
+
+    async def run(self, duration=None):
+        """Run the pipeline until cancelled, or for duration seconds"""
+        self._queue = asyncio.Queue(self.queue_size)
+        self.metrics = IngestionMetrics()
+        self._tasks = [asyncio.create_task(self._produce()), asyncio.create_task(self._consume())]
+        try:
+            if duration is None:
+                await asyncio.gather(*self._tasks)
+            else:
+                await asyncio.wait(self._tasks, timeout=duration)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def start_background(self):
+        """Run the pipeline on its own event loop in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_in_thread, name='ingestion', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run_in_thread(self):
+        try:
+            self._loop.run_until_complete(self.run())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def stop(self):
+        """Cancel a pipeline started with start_background"""
+        if self._loop is not None:
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+            self._thread.join(timeout=5)
+
+    def bars(self, pair, timeframe, n=None):
+        """Latest completed bars for a pair and timeframe, read without blocking"""
+        return self.aggregator.buffer(pair, timeframe).snapshot(n)
+
+
+_pipeline = None
+_pipeline_args = None
+_pipeline_lock = threading.Lock()
+
+
+def get_ingestion_pipeline(pairs, **kwargs):
+    """Process-wide pipeline on a simulated feed, started on first use.
+
+    Each pair's feed continues from its last stored 1m close, and the 1m
+    bars the pipeline completes are appended to the bar store. Later calls
+    must pass the same pairs and settings; a ValueError is raised otherwise.
+    """
+    global _pipeline, _pipeline_args
+    args = (tuple(pairs), {name: tuple(value) if isinstance(value, list) else value
+                           for name, value in kwargs.items()})
+    with _pipeline_lock:
+        if _pipeline is not None and args != _pipeline_args:
+            raise ValueError(f"Ingestion pipeline already running with pairs={list(_pipeline_args[0])} "
+                             f"and settings {_pipeline_args[1]}")
+        if _pipeline is None:
+            store = get_bar_store()
+            last = {pair: store.last_bar(pair, '1m') for pair in pairs}
+            feed = SimulatedFeed(pairs, start_prices={pair: bar[1] for pair, bar in last.items() if bar})
+            _pipeline = IngestionPipeline(feed, **kwargs)
+            if '1m' in _pipeline.aggregator.timeframes:
+                store.attach(_pipeline.aggregator)
+            _pipeline.start_background()
+            _pipeline_args = args
+        return _pipeline
@@ -0,0 +1,304 @@
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds, log-spaced (about 45% apart) from 10us to 30s
+BUCKETS = tuple(float(b) for b in np.round(np.logspace(-5, np.log10(30), 41), 7))
+
+ENABLED = os.environ.get('FOREX_INSTRUMENTATION', '1') != '0'
+
+# Sessions whose spans are kept apart; older ones are folded into session ''
+MAX_SESSIONS = 32
+
+# Labels attached to every span recorded in the current thread or task
+_pair = contextvars.ContextVar('pair', default='')
+_session = contextvars.ContextVar('session', default='')
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Registry:
+    """Span histograms keyed on (stage, pair, session).
+
+    Only the max_sessions most recently active sessions keep their own
+    histograms; the least recently active one is merged into session ''
+    when a new one arrives, so memory stays bounded in a long-running app.
+    Exports drop the session label altogether.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._histograms = {}
+        self._sessions = OrderedDict()  # session -> its histogram keys, least recently active first
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, pair='', session=''):
+        key = (stage, pair, session)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                if session:
+                    self._sessions.setdefault(session, []).append(key)
+            histogram.observe(seconds)
+            if session:
+                self._sessions.move_to_end(session)
+                if len(self._sessions) > self.max_sessions:
+                    self._retire(self._sessions.popitem(last=False)[1])
+
+    def _retire(self, keys):
+        """Fold a session's histograms into the session-less ones; the caller holds the lock"""
+        for stage, pair, session in keys:
+            merged = self._histograms.get((stage, pair, ''))
+            if merged is None:
+                merged = self._histograms[(stage, pair, '')] = Histogram()
+            merged.merge(self._histograms.pop((stage, pair, session)))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._sessions.clear()
+
+    def snapshot(self, by=('stage', 'pair', 'session')):
+        """Copies of the histograms, aggregated over the labels not in by"""
+        positions = [('stage', 'pair', 'session').index(label) for label in by]
+        merged = {}
+        with self._lock:
+            for key, histogram in self._histograms.items():
+                group = tuple(key[i] for i in positions)
+                if group not in merged:
+                    merged[group] = Histogram()
+                merged[group].merge(histogram)
+        return merged
+
+    def summary(self, by=('stage',)):
+        """One row per label group: count, total, mean, p50/p95/p99 and max in seconds"""
+        rows = []
+        for group, h in sorted(self.snapshot(by).items()):
+            row = dict(zip(by, group))
+            row.update({
+                'count': h.count,
+                'total': h.total,
+                'mean': h.total / h.count,
+                'p50': h.quantile(0.50),
+                'p95': h.quantile(0.95),
+                'p99': h.quantile(0.99),
+                'max': h.max,
+            })
+            rows.append(row)
+        return rows
+
+    def to_json(self):
+        """Every histogram with its bucket bounds, as a JSON string"""
+        return json.dumps({
+            'buckets': list(BUCKETS),
+            'series': [{'stage': stage, 'pair': pair,
+                        'counts': h.counts, 'count': h.count, 'sum': h.total, 'max': h.max}
+                       for (stage, pair), h in sorted(self.snapshot(('stage', 'pair')).items())],
+        })
+
+    def to_prometheus(self, name='forex_stage_seconds'):
+        """Histograms in the Prometheus text exposition format, one series per stage and pair"""
+        lines = [f'# HELP {name} Time spent in each instrumented stage.',
+                 f'# TYPE {name} histogram']
+        for (stage, pair), h in sorted(self.snapshot(('stage', 'pair')).items()):
+            labels = f'stage="{_escape(stage)}",pair="{_escape(pair)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), h.counts):
+                cumulative += n
+                le = bound if isinstance(bound, str) else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {h.total!r}')
+            lines.append(f'{name}_count{{{labels}}} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def set_labels(pair=None, session=None):
+    """Attach pair and/or session labels to spans recorded from here on in this context"""
+    if pair is not None:
+        _pair.set(pair)
+    if session is not None:
+        _session.set(session)
+
+
+@contextmanager
+def labels(pair=None, session=None):
+    """Attach labels for the duration of a block"""
+    tokens = []
+    if pair is not None:
+        tokens.append((_pair, _pair.set(pair)))
+    if session is not None:
+        tokens.append((_session, _session.set(session)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def session_id():
+    """Id of the Streamlit session running this script, or '' outside Streamlit"""
+    module = sys.modules.get('streamlit.runtime.scriptrunner')
+    if module is None:
+        return ''
+    ctx = module.get_script_run_ctx(suppress_warning=True)
+    return '' if ctx is None else ctx.session_id
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one observation of stage"""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, time.perf_counter() - started, _pair.get(), _session.get())
+
+
+def instrument(stage=None):
+    """Decorator recording every call of the function as a span"""
+    def decorate(func):
+        name = stage or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - started, _pair.get(), _session.get())
+        return wrapper
+    return decorate
+
+
+def profile_call(func, *args, sort='cumulative', limit=30, **kwargs):
+    """Run func under cProfile; returns its result and the formatted stats"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return result, out.getvalue()
+
+
+def sample_stacks(duration=5.0, interval=0.005, depth=8):
+    """Statistical profile of every other thread in the process.
+
+    Polls the threads' current frames every interval for duration seconds
+    and counts the innermost depth frames of each stack, so it can watch
+    other sessions' script threads without slowing them down. Returns a
+    Counter of (stack tuple) -> samples, innermost frame first.
+    """
+    me = threading.get_ident()
+    samples = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None and len(stack) < depth:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            samples[tuple(stack)] += 1
+        time.sleep(interval)
+    return samples
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body, content_type = registry.to_json(), 'application/json'
+        elif self.path.startswith('/metrics'):
+            body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def serve_metrics(port=9108, host='127.0.0.1'):
+    """Expose /metrics (Prometheus) and /metrics.json from a daemon thread; idempotent"""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+    return _server
+
+
+if ENABLED and os.environ.get('FOREX_METRICS_PORT'):
+    serve_metrics(int(os.environ['FOREX_METRICS_PORT']))
@@ -0,0 +1,215 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # scipy is optional; the NumPy path below is used instead
+    lfilter = None
+
+# Largest power of the inverse decay allowed inside one block of the NumPy recurrence
+_MAX_BLOCK_GROWTH = 1e150
+_MAX_BLOCK = 4096
+# Windows up to this length are averaged directly; longer ones use cumulative sums
+_MAX_DIRECT_WINDOW = 64
+
+
+@lru_cache(maxsize=256)
+def _block_weights(decay, block):
+    """Decay powers d**1..d**block and their inverses for one recurrence block"""
+    powers = decay ** np.arange(1, block + 1)
+    return powers, 1.0 / powers
+
+
+def _linear_recurrence(values, decay, carry):
+    """Solve y[t] = decay * y[t-1] + (1 - decay) * x[t] along the last axis.
+
+    carry is y[-1] for each row. The NumPy path works in blocks: within a
+    block the recurrence is a cumulative sum of inverse-decay weighted
+    inputs, rescaled by the decay, which keeps everything in vectorized
+    ufunc calls. Block length is bounded so the weights never overflow.
+    """
+    values = np.asarray(values, dtype=float)
+    carry = np.asarray(carry, dtype=float)
+    gain = 1.0 - decay
+
+    if lfilter is not None:
+        out, _ = lfilter([gain], [1.0, -decay], values, axis=-1, zi=(decay * carry)[..., None])
+        return out
+
+    n = values.shape[-1]
+    if decay == 0:
+        return values.copy()
+    block = int(min(n, _MAX_BLOCK, max(1, math.log(_MAX_BLOCK_GROWTH) / -math.log(decay))))
+    powers, inverse = _block_weights(decay, block)
+
+    out = np.empty(values.shape)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        size = stop - start
+        weighted = np.cumsum(values[..., start:stop] * inverse[:size], axis=-1)
+        out[..., start:stop] = powers[:size] * (carry[..., None] + gain * weighted)
+        carry = out[..., stop - 1]
+    return out
+
+
+def ema(values, span=None, alpha=None):
+    """Exponential moving average along the last axis, matching ewm(adjust=False).
+
+    Leading NaNs in a 1-D series are skipped, as pandas does.
+    """
+    values = np.asarray(values, dtype=float)
+    alpha = 2.0 / (span + 1.0) if alpha is None else alpha
+    out = np.full(values.shape, np.nan)
+
+    if values.ndim == 1:
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            return out
+        first = valid[0]
+        out[first:] = _linear_recurrence(values[first:], 1.0 - alpha, values[first])
+        return out
+
+    if values.shape[-1] == 0:
+        return out
+    return _linear_recurrence(values, 1.0 - alpha, values[..., 0])
+
+
+def rma(values, period):
+    """Wilder's running moving average along the last axis.
+
+    Seeded with the simple mean of the first period valid values, then
+    smoothed with alpha = 1 / period. Leading NaNs in a 1-D series are skipped.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+
+    first = 0
+    if values.ndim == 1:
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            return out
+        first = valid[0]
+
+    seed_at = first + period - 1
+    if values.shape[-1] <= seed_at:
+        return out
+    seed = values[..., first:seed_at + 1].mean(axis=-1)
+    out[..., seed_at] = seed
+    if values.shape[-1] > seed_at + 1:
+        out[..., seed_at + 1:] = _linear_recurrence(values[..., seed_at + 1:], 1.0 - 1.0 / period, seed)
+    return out
+
+
+def rolling_mean(values, window):
+    """Rolling mean along the last axis; NaN until a full window of valid values"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    if window <= _MAX_DIRECT_WINDOW:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+        out[..., window - 1:] = windows.mean(axis=-1)
+        return out
+
+    # Long windows: difference of cumulative sums, with NaNs counted separately
+    missing = np.isnan(values)
+    sums = np.cumsum(np.where(missing, 0.0, values), axis=-1)
+    counts = np.cumsum(missing, axis=-1)
+    window_sums = sums[..., window - 1:].copy()
+    window_sums[..., 1:] -= sums[..., :-window]
+    window_missing = counts[..., window - 1:].copy()
+    window_missing[..., 1:] -= counts[..., :-window]
+    out[..., window - 1:] = np.where(window_missing > 0, np.nan, window_sums / window)
+    return out
+
+
+def true_range(high, low, close):
+    """True range along the last axis; the first bar uses the high-low range"""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = np.empty(close.shape)
+    prev_close[..., 0] = np.nan
+    prev_close[..., 1:] = close[..., :-1]
+    return np.fmax(np.abs(high - low), np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def directional_movement(high, low):
+    """+DM and -DM along the last axis; zero on the first bar"""
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    up_move = np.zeros(high.shape)
+    down_move = np.zeros(low.shape)
+    up_move[..., 1:] = high[..., 1:] - high[..., :-1]
+    down_move[..., 1:] = low[..., :-1] - low[..., 1:]
+    pos_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    neg_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    return pos_dm, neg_dm
+
+
+def adx(high, low, close, period=14, method='sma'):
+    """ADX, +DI and -DI along the last axis.
+
+    method='sma' reproduces calculate_adx's rolling means; method='wilder'
+    uses Wilder's recursive smoothing throughout.
+    """
+    if method not in ('sma', 'wilder'):
+        raise ValueError(f"Unknown ADX method: {method}")
+    smooth = rolling_mean if method == 'sma' else rma
+
+    tr = true_range(high, low, close)
+    pos_dm, neg_dm = directional_movement(high, low)
+    if method == 'wilder':
+        # Wilder's smoothing starts from the first bar with a previous close
+        tr, pos_dm, neg_dm = tr[..., 1:], pos_dm[..., 1:], neg_dm[..., 1:]
+
+    tr_smooth = smooth(tr, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos_di = 100 * (smooth(pos_dm, period) / tr_smooth)
+        neg_di = 100 * (smooth(neg_dm, period) / tr_smooth)
+        dx = 100 * np.abs(pos_di - neg_di) / (pos_di + neg_di)
+
+    if method == 'sma':
+        return rolling_mean(dx, period), pos_di, neg_di
+
+    shape = np.shape(high)
+    adx_out, pos_out, neg_out = np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    pos_out[..., 1:] = pos_di
+    neg_out[..., 1:] = neg_di
+    # DX is valid from the period-th bar with a previous close onwards
+    if dx.shape[-1] >= period:
+        adx_out[..., period:] = rma(dx[..., period - 1:], period)
+    return adx_out, pos_out, neg_out
+
+
+def rsi(close, period=14, method='sma'):
+    """Relative Strength Index along the last axis.
+
+    method='sma' reproduces calculate_rsi (rolling means, first delta
+    counted as zero); method='wilder' uses Wilder's smoothing of the
+    gains and losses seeded from the first period deltas.
+    """
+    if method not in ('sma', 'wilder'):
+        raise ValueError(f"Unknown RSI method: {method}")
+    close = np.asarray(close, dtype=float)
+    delta = np.zeros(close.shape)
+    delta[..., 1:] = close[..., 1:] - close[..., :-1]
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    if method == 'sma':
+        avg_gain, avg_loss = rolling_mean(gain, period), rolling_mean(loss, period)
+    else:
+        avg_gain = np.full(close.shape, np.nan)
+        avg_loss = np.full(close.shape, np.nan)
+        avg_gain[..., 1:] = rma(gain[..., 1:], period)
+        avg_loss[..., 1:] = rma(loss[..., 1:], period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD line and signal line along the last axis"""
+    line = ema(close, fast) - ema(close, slow)
+    return line, ema(line, signal)
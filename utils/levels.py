@@ -0,0 +1,248 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .patterns import Pivots
+
+LEVEL_COLUMNS = ['price', 'low', 'high', 'touches', 'first', 'last']
+
+DEFAULT_PARAMS = {
+    'order': 5,         # swing points are the extreme of order bars either side
+    'tolerance': 0.5,   # max width of a level, in multiples of the average true range
+    'min_touches': 1,   # weaker levels are skipped by support/resistance lookups
+}
+
+
+class LevelIndex:
+    """Support and resistance levels clustered from swing highs and lows, sorted by price.
+
+    Each level is a cluster of swing prices no wider than tolerance (an
+    absolute price distance); its price is the mean of its swings and its
+    strength the number of swings (touches) in it. Levels never overlap,
+    so the nearest one on either side of a price is found by bisection.
+    New bars are folded in with update(): each newly confirmed swing joins
+    the nearest level it fits in, or opens a new one.
+    """
+
+    def __init__(self, tolerance, order=5):
+        self.tolerance = tolerance
+        self.order = order
+        self.bars = 0
+        self._tail = ([], [])  # highs and lows of the last 2 * order bars, to confirm swings at the edge
+        # One entry per level, all kept in price order
+        self.prices, self.lows, self.highs = [], [], []
+        self.sums, self.touches, self.first, self.last = [], [], [], []
+
+    def __len__(self):
+        return len(self.prices)
+
+    def update(self, high, low):
+        """Add bars (arrays of highs and lows, or one bar's scalars) and index the swings they confirm"""
+        carried = len(self._tail[0])
+        if carried == 2 * self.order and np.size(high) == 1:
+            self._update_bar(float(np.ravel(high)[0]), float(np.ravel(low)[0]))
+            return
+        high = np.concatenate([self._tail[0], np.atleast_1d(np.asarray(high, dtype=float))])
+        low = np.concatenate([self._tail[1], np.atleast_1d(np.asarray(low, dtype=float))])
+        offset = self.bars - carried
+        self.bars = offset + len(high)
+        keep = min(len(high), 2 * self.order)
+        self._tail = (high[len(high) - keep:].tolist(), low[len(low) - keep:].tolist())
+
+        piv = Pivots(high, low, self.order)
+        # Swings in the carried bars up to order from the old edge were already indexed
+        fresh = carried - self.order
+        prices = np.concatenate([piv.peak_values[piv.peaks >= fresh], piv.trough_values[piv.troughs >= fresh]])
+        bars = np.concatenate([piv.peaks[piv.peaks >= fresh], piv.troughs[piv.troughs >= fresh]]) + offset
+        if not len(self.prices):
+            self._sweep(prices, bars)
+            return
+        for i in np.argsort(bars, kind='stable'):
+            self.add(float(prices[i]), int(bars[i]))
+
+    def _update_bar(self, high, low):
+        """One new bar confirms at most one swing high and one swing low, order bars back"""
+        highs, lows = self._tail
+        highs.append(high)
+        lows.append(low)
+        k = self.order
+        bar = self.bars - k
+        if highs[k] > max(highs[:k]) and highs[k] >= max(highs[k + 1:]):
+            self.add(highs[k], bar)
+        if lows[k] < min(lows[:k]) and lows[k] <= min(lows[k + 1:]):
+            self.add(lows[k], bar)
+        del highs[0], lows[0]
+        self.bars += 1
+
+    def _sweep(self, prices, bars):
+        """Cluster swings from scratch: from the lowest price up, each level spans at most tolerance"""
+        order = np.argsort(prices, kind='stable')
+        prices, bars = prices[order], bars[order]
+        starts = []
+        start = 0
+        while start < len(prices):
+            starts.append(start)
+            start = int(np.searchsorted(prices, prices[start] + self.tolerance, side='right'))
+        if not starts:
+            return
+        starts = np.array(starts)
+        sums = np.add.reduceat(prices, starts)
+        touches = np.diff(np.append(starts, len(prices)))
+        self.prices = (sums / touches).tolist()
+        self.lows = prices[starts].tolist()
+        self.highs = prices[np.append(starts[1:], len(prices)) - 1].tolist()
+        self.sums = sums.tolist()
+        self.touches = touches.tolist()
+        self.first = np.minimum.reduceat(bars, starts).tolist()
+        self.last = np.maximum.reduceat(bars, starts).tolist()
+
+    def add(self, price, bar):
+        """Index one swing price confirmed at bar"""
+        i = bisect_right(self.lows, price)
+        if i and price <= self.highs[i - 1]:
+            best = i - 1  # inside an existing level
+        else:
+            # In the gap between two levels: join the nearer one that stays within tolerance
+            best = None
+            for j in (i - 1, i):
+                if 0 <= j < len(self.prices) and max(self.highs[j], price) - min(self.lows[j], price) <= self.tolerance:
+                    if best is None or abs(self.prices[j] - price) < abs(self.prices[best] - price):
+                        best = j
+        if best is None:
+            for values, value in ((self.prices, price), (self.lows, price), (self.highs, price),
+                                  (self.sums, price), (self.touches, 1), (self.first, bar), (self.last, bar)):
+                values.insert(i, value)
+            return
+        self.lows[best] = min(self.lows[best], price)
+        self.highs[best] = max(self.highs[best], price)
+        self.sums[best] += price
+        self.touches[best] += 1
+        self.prices[best] = self.sums[best] / self.touches[best]
+        self.last[best] = max(self.last[best], bar)
+
+    def support(self, price, min_touches=1):
+        """Position of the nearest level at or below price with enough touches, or None"""
+        i = bisect_right(self.prices, price) - 1
+        while i >= 0 and self.touches[i] < min_touches:
+            i -= 1
+        return i if i >= 0 else None
+
+    def resistance(self, price, min_touches=1):
+        """Position of the nearest level above price with enough touches, or None"""
+        i = bisect_left(self.prices, price)
+        if i < len(self.prices) and self.prices[i] == price:
+            i += 1
+        while i < len(self.prices) and self.touches[i] < min_touches:
+            i += 1
+        return i if i < len(self.prices) else None
+
+    def nearest(self, price, min_touches=1):
+        """(support, resistance) prices around price; None where there is no level"""
+        below = self.support(price, min_touches)
+        above = self.resistance(price, min_touches)
+        return (None if below is None else self.prices[below],
+                None if above is None else self.prices[above])
+
+    def level(self, i):
+        return dict(zip(LEVEL_COLUMNS, (self.prices[i], self.lows[i], self.highs[i],
+                                        self.touches[i], self.first[i], self.last[i])))
+
+    def levels(self, min_touches=1):
+        """Table of levels in price order"""
+        table = pd.DataFrame({'price': self.prices, 'low': self.lows, 'high': self.highs,
+                              'touches': self.touches, 'first': self.first, 'last': self.last},
+                             columns=LEVEL_COLUMNS)
+        return table[table['touches'] >= min_touches].reset_index(drop=True)
+
+
+def level_index(high, low, close, order=DEFAULT_PARAMS['order'], tolerance=DEFAULT_PARAMS['tolerance']):
+    """LevelIndex over whole-history arrays, with tolerance in average true ranges"""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    atr = float(np.nanmean(kernels.true_range(high, low, close))) if len(close) else 0.0
+    index = LevelIndex(tolerance * atr, order)
+    index.update(high, low)
+    return index
+
+
+def build_level_index(data, order=DEFAULT_PARAMS['order'], tolerance=DEFAULT_PARAMS['tolerance']):
+    """LevelIndex over the whole history of an OHLC frame"""
+    return level_index(data['High'].to_numpy(), data['Low'].to_numpy(), data['Close'].to_numpy(),
+                       order, tolerance)
+
+
+def nearest_support_resistance(index, price, low, high, min_touches=DEFAULT_PARAMS['min_touches']):
+    """Nearest levels around price; the lowest low and highest high (arrays) stand in where there is none"""
+    support, resistance = index.nearest(price, min_touches)
+    return (float(np.min(low)) if support is None else support,
+            float(np.max(high)) if resistance is None else resistance)
+
+
+def _swing_mask(values, order, beats_left, beats_right):
+    """Pivots swing points along the last axis of a (rows, bars) array, as a mask"""
+    n = values.shape[1]
+    mask = np.zeros(values.shape, dtype=bool)
+    if n < 2 * order + 1:
+        return mask
+    centre = values[:, order:n - order]
+    keep = np.ones(centre.shape, dtype=bool)
+    for shift in range(1, order + 1):
+        keep &= beats_left(centre, values[:, order - shift:n - order - shift])
+        keep &= beats_right(centre, values[:, order + shift:n - order + shift])
+    mask[:, order:n - order] = keep
+    return mask
+
+
+def nearest_levels(high, low, close, order=DEFAULT_PARAMS['order'], tolerance=DEFAULT_PARAMS['tolerance'],
+                   min_touches=DEFAULT_PARAMS['min_touches']):
+    """Support and resistance around the last close of each row of (rows, bars) arrays.
+
+    Matches nearest_support_resistance over level_index of each row, without
+    a loop over rows. Swings of every row are sorted together on complex
+    (row + 1j * price) keys, which order by row and then price, so one
+    searchsorted covers all rows. The sweep that clusters swings into levels
+    steps through every row at once, one level per step.
+    """
+    high, low, close = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (high, low, close))
+    rows = np.arange(close.shape[0])
+    support, resistance = np.min(low, axis=1), np.max(high, axis=1)
+    peaks = _swing_mask(high, order, np.greater, np.greater_equal)
+    troughs = _swing_mask(low, order, np.less, np.less_equal)
+    keys = np.sort(np.concatenate([np.nonzero(peaks)[0] + 1j * high[peaks],
+                                   np.nonzero(troughs)[0] + 1j * low[troughs]]))
+    if not len(keys):
+        return support, resistance
+
+    # Tolerance in price per row, then where a level opened by each swing would end
+    width = tolerance * np.nanmean(kernels.true_range(high, low, close), axis=1)
+    key_rows, prices = keys.real.astype(np.int64), keys.imag
+    ends = np.searchsorted(keys, key_rows + 1j * (prices + width[key_rows]), side='right')
+
+    # Walk every row's chain of level starts in step
+    row_ends = np.searchsorted(keys.real, rows, side='right')
+    current = np.searchsorted(keys.real, rows, side='left')
+    current = current[current < row_ends]
+    starts = []
+    while len(current):
+        starts.append(current)
+        following = ends[current]
+        current = following[following < row_ends[key_rows[current]]]
+    starts = np.sort(np.concatenate(starts))
+
+    touches = np.diff(np.append(starts, len(keys)))
+    level_rows = key_rows[starts]
+    level_prices = np.add.reduceat(prices, starts) / touches
+    strong = touches >= min_touches
+    level_keys = level_rows[strong] + 1j * level_prices[strong]
+    if not len(level_keys):
+        return support, resistance
+
+    # Nearest level at or below, and above, each row's last close
+    position = np.searchsorted(level_keys, rows + 1j * close[:, -1], side='right')
+    below = np.clip(position - 1, 0, len(level_keys) - 1)
+    above = np.clip(position, 0, len(level_keys) - 1)
+    has_below = (position > 0) & (level_keys.real[below] == rows)
+    has_above = (position < len(level_keys)) & (level_keys.real[above] == rows)
+    return (np.where(has_below, level_keys.imag[below], support),
+            np.where(has_above, level_keys.imag[above], resistance))
@@ -0,0 +1,189 @@
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Base prices for different pairs
+BASE_PRICES = {
+    'EUR/USD': 1.10,
+    'GBP/USD': 1.25,
+    'USD/JPY': 110.0,
+    'USD/CHF': 0.90
+}
+
+# Bar length in seconds and the matching pandas frequency for each timeframe
+TIMEFRAMES = {
+    '1m': (60, 'min'),
+    '5m': (300, '5min'),
+    '15m': (900, '15min'),
+    '1h': (3600, 'h'),
+    '4h': (14400, '4h'),
+    '1D': (86400, 'D'),
+}
+
+# Annualized volatility used when a pair has no explicit setting
+BASE_VOLATILITY = {
+    'EUR/USD': 0.07,
+    'GBP/USD': 0.08,
+    'USD/JPY': 0.09,
+    'USD/CHF': 0.07,
+}
+
+# Typical cross-pair return correlations for the default pair list
+BASE_CORRELATIONS = {
+    ('EUR/USD', 'GBP/USD'): 0.7,
+    ('EUR/USD', 'USD/JPY'): -0.3,
+    ('EUR/USD', 'USD/CHF'): -0.8,
+    ('GBP/USD', 'USD/JPY'): -0.2,
+    ('GBP/USD', 'USD/CHF'): -0.6,
+    ('USD/JPY', 'USD/CHF'): 0.4,
+}
+
+SECONDS_PER_YEAR = 252 * 86400
+
+
+def pair_rng(pair, seed, stream=''):
+    """Independent random generator for one pair, stable across pair lists"""
+    return np.random.default_rng([seed, zlib.crc32(f'{pair}|{stream}'.encode())])
+
+
+def pip_size(pair):
+    """Price increment of one pip for a pair"""
+    return 0.01 if pair.endswith('JPY') else 0.0001
+
+
+def correlation_matrix(pairs, correlations=None):
+    """Correlation matrix for pairs from a dict of pair tuples, defaulting to BASE_CORRELATIONS"""
+    correlations = BASE_CORRELATIONS if correlations is None else correlations
+    matrix = np.eye(len(pairs))
+    for i, a in enumerate(pairs):
+        for j, b in enumerate(pairs[i + 1:], start=i + 1):
+            rho = correlations.get((a, b), correlations.get((b, a), 0.0))
+            matrix[i, j] = matrix[j, i] = rho
+    return matrix
+
+
+def simulate_log_returns(pairs, periods, timeframe='1D', seed=42, model='gbm',
+                         correlation=None, volatility=None, drift=0.0,
+                         jump_intensity=5.0, jump_mean=0.0, jump_std=0.01):
+    """Correlated log returns for every pair as a (periods, pairs) matrix.
+
+    Each pair draws from its own generator; correlation is applied to the
+    whole matrix with one Cholesky product. model is 'gbm' or 'jump' for
+    Merton jump-diffusion with jump_intensity jumps per year.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    if model not in ('gbm', 'jump'):
+        raise ValueError(f"Unknown model: {model}")
+
+    pairs = list(pairs)
+    dt = TIMEFRAMES[timeframe][0] / SECONDS_PER_YEAR
+    volatility = volatility or {}
+    sigma = np.array([volatility.get(p, BASE_VOLATILITY.get(p, 0.08)) for p in pairs])
+
+    if correlation is None or isinstance(correlation, dict):
+        correlation = correlation_matrix(pairs, correlation)
+    try:
+        chol = np.linalg.cholesky(np.asarray(correlation, dtype=float))
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix must be positive definite")
+
+    rngs = [pair_rng(p, seed, timeframe) for p in pairs]
+    shocks = np.column_stack([rng.standard_normal(periods) for rng in rngs]) @ chol.T
+    returns = (drift - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+
+    if model == 'jump':
+        for j, rng in enumerate(rngs):
+            counts = rng.poisson(jump_intensity * dt, periods)
+            jumps = np.flatnonzero(counts)
+            returns[jumps, j] += rng.normal(jump_mean * counts[jumps], jump_std * np.sqrt(counts[jumps]))
+
+    return returns
+
+
+def max_periods(timeframe):
+    """Most bars of a timeframe that can end now without dating before pandas' earliest timestamp"""
+    seconds = TIMEFRAMES[timeframe][0]
+    return int((pd.Timestamp.now().value - pd.Timestamp.min.value) // 10**9 // seconds) - 1
+
+
+def _bar_dates(periods, timeframe, end):
+    """Bar timestamps ending at end, one bar per timeframe step"""
+    freq = TIMEFRAMES[timeframe][1]
+    end = pd.Timestamp.now().floor(freq) if end is None else pd.Timestamp(end)
+    return pd.date_range(end=end, periods=periods, freq=freq)
+
+
+def generate_market_data(pairs, periods=100, timeframe='1D', seed=42, model='gbm', end=None, **kwargs):
+    """Generate correlated OHLCV bars for several pairs at once.
+
+    Returns a dict of pair -> DataFrame with the same columns as
+    generate_forex_data. Extra keyword arguments go to simulate_log_returns.
+    """
+    pairs = list(pairs)
+    returns = simulate_log_returns(pairs, periods, timeframe, seed, model, **kwargs)
+    base = np.array([BASE_PRICES.get(p, 1.0) for p in pairs])
+    closes = base * np.exp(np.cumsum(returns, axis=0))
+    opens = np.vstack([base, closes[:-1]])
+    dates = _bar_dates(periods, timeframe, end)
+
+    frames = {}
+    for j, pair in enumerate(pairs):
+        rng = pair_rng(pair, seed, f'{timeframe}|bars')
+        bar_range = np.abs(returns[:, j]).mean() * closes[:, j]
+        top = np.maximum(opens[:, j], closes[:, j])
+        bottom = np.minimum(opens[:, j], closes[:, j])
+        frames[pair] = pd.DataFrame({
+            'Date': dates,
+            'Open': opens[:, j],
+            'High': top + np.abs(rng.normal(0, 1, periods)) * bar_range,
+            'Low': bottom - np.abs(rng.normal(0, 1, periods)) * bar_range,
+            'Close': closes[:, j],
+            'Volume': rng.integers(1000, 10000, periods),
+        })
+    return frames
+
+
+def generate_ticks(pair, n_ticks, seed=42, start=None, ticks_per_second=5.0,
+                   spread_pips=1.0, volatility=None, start_price=None):
+    """Generate tick-level quotes with a bid/ask spread for one pair.
+
+    Arrival times are exponential with the given rate and the mid follows
+    GBM scaled to each inter-arrival gap, starting from start_price (the
+    pair's base price by default). Returns Date, Bid, Ask and Volume.
+    """
+    rng = pair_rng(pair, seed, 'ticks')
+    sigma = (volatility or {}).get(pair, BASE_VOLATILITY.get(pair, 0.08))
+    start = pd.Timestamp.now().floor('D') if start is None else pd.Timestamp(start)
+
+    gaps = rng.exponential(1.0 / ticks_per_second, n_ticks)
+    dt = gaps / SECONDS_PER_YEAR
+    log_mid = np.cumsum(-0.5 * sigma ** 2 * dt + sigma * np.sqrt(dt) * rng.standard_normal(n_ticks))
+    mid = (start_price or BASE_PRICES.get(pair, 1.0)) * np.exp(log_mid)
+
+    # Spread widens randomly around its typical value
+    half_spread = 0.5 * spread_pips * pip_size(pair) * rng.lognormal(0.0, 0.25, n_ticks)
+    return pd.DataFrame({
+        'Date': start + pd.to_timedelta(np.cumsum(gaps), unit='s'),
+        'Bid': mid - half_spread,
+        'Ask': mid + half_spread,
+        'Volume': rng.integers(1, 10, n_ticks) * 100000,
+    })
+
+
+@lru_cache(maxsize=64)
+def _cached_market_data(pair, periods, seed, timeframe, model, end):
+    return generate_market_data([pair], periods, timeframe, seed, model, end=end)[pair]
+
+
+def get_forex_data(pair, periods=100, seed=42, timeframe='1D', model='gbm'):
+    """Memoized synthetic bars for one pair, keyed by (pair, periods, seed, timeframe).
+
+    The cache is a bounded LRU shared by every page in the process; bars end
+    at the current timeframe boundary, so a new bar yields a new entry.
+    Callers get a shallow copy and may add columns freely.
+    """
+    end = pd.Timestamp.now().floor(TIMEFRAMES[timeframe][1])
+    return _cached_market_data(pair, periods, seed, timeframe, model, end).copy(deep=False)
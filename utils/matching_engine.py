@@ -0,0 +1,311 @@
+import heapq
+import itertools
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Quantities below this are treated as fully filled
+EPSILON = 1e-9
+
+
+class Order:
+    """A limit or market order resting in, or matched against, an order book"""
+
+    __slots__ = ('order_id', 'pair', 'side', 'amount', 'remaining', 'price',
+                 'order_type', 'owner', 'sequence', 'status')
+
+    def __init__(self, order_id, pair, side, amount, price, order_type, owner, sequence):
+        self.order_id = order_id
+        self.pair = pair
+        self.side = side
+        self.amount = amount
+        self.remaining = amount
+        self.price = price
+        self.order_type = order_type
+        self.owner = owner
+        self.sequence = sequence
+        self.status = 'open'
+
+    @property
+    def filled(self):
+        return self.amount - self.remaining
+
+
+class Fill(NamedTuple):
+    order_id: int
+    counter_order_id: int  # None when filled against external liquidity
+    pair: str
+    side: str
+    amount: float
+    price: float
+    owner: object
+
+
+class OrderBook:
+    """Price-time priority limit order book for one pair.
+
+    Bids and asks are heaps keyed on (price, arrival sequence); cancelled
+    and filled orders are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, pair):
+        self.pair = pair
+        self._bids = []
+        self._asks = []
+        self.orders = {}
+
+    def add(self, order):
+        """Rest a limit order in the book"""
+        if order.side == 'buy':
+            heapq.heappush(self._bids, (-order.price, order.sequence, order))
+        else:
+            heapq.heappush(self._asks, (order.price, order.sequence, order))
+        self.orders[order.order_id] = order
+
+    def cancel(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            order.status = 'cancelled'
+        return order
+
+    def _top(self, heap):
+        while heap and heap[0][2].status != 'open':
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self):
+        order = self._top(self._bids)
+        return None if order is None else order.price
+
+    def best_ask(self):
+        order = self._top(self._asks)
+        return None if order is None else order.price
+
+    def match(self, order):
+        """Fill order against the opposite side; returns the fills"""
+        heap = self._asks if order.side == 'buy' else self._bids
+        fills = []
+        while order.remaining > EPSILON:
+            resting = self._top(heap)
+            if resting is None:
+                break
+            if order.order_type == 'limit':
+                if order.side == 'buy' and resting.price > order.price:
+                    break
+                if order.side == 'sell' and resting.price < order.price:
+                    break
+
+            quantity = min(order.remaining, resting.remaining)
+            order.remaining -= quantity
+            resting.remaining -= quantity
+            fills.append(Fill(order.order_id, resting.order_id, self.pair, order.side,
+                              quantity, resting.price, order.owner))
+            fills.append(Fill(resting.order_id, order.order_id, self.pair, resting.side,
+                              quantity, resting.price, resting.owner))
+
+            if resting.remaining <= EPSILON:
+                resting.status = 'filled'
+                heapq.heappop(heap)
+                self.orders.pop(resting.order_id, None)
+        return fills
+
+    def depth(self, levels=5):
+        """Aggregated (price, amount) levels for each side, best first"""
+        def aggregate(heap, sign):
+            totals = {}
+            for key, _, order in heap:
+                if order.status == 'open':
+                    totals[sign * key] = totals.get(sign * key, 0.0) + order.remaining
+            return sorted(totals.items(), reverse=sign < 0)[:levels]
+        return {'bids': aggregate(self._bids, -1), 'asks': aggregate(self._asks, 1)}
+
+
+class MatchingEngine:
+    """In-process matching engine with one order book per pair.
+
+    Market orders walk the book and, when the book runs dry, fill the rest
+    against external liquidity at the pair's last reference price (set with
+    update_price). Stop-loss and take-profit triggers are kept in per-pair
+    heaps and fire market orders when a price update crosses them.
+
+    Net positions are tracked per (pair, owner) from the fills. Exit triggers
+    belong to their owner's position: they are cancelled once it is flat or
+    reversed, and never close more than is still open.
+    """
+
+    def __init__(self, external_liquidity=True):
+        self.external_liquidity = external_liquidity
+        self.books = {}
+        self.last_price = {}
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._below = {}  # fire when price <= trigger, max-heap
+        self._above = {}  # fire when price >= trigger, min-heap
+        self._triggers = {}
+        self._groups = {}
+        self._exits = {}  # (pair, owner) -> ids of the exit groups protecting that position
+        self.positions = {}  # (pair, owner) -> signed net quantity
+        self.fill_count = 0
+
+    def book(self, pair):
+        if pair not in self.books:
+            self.books[pair] = OrderBook(pair)
+        return self.books[pair]
+
+    def submit(self, pair, side, amount, order_type='market', price=None, owner=None):
+        """Submit an order; returns the order and the resulting fills"""
+        if side not in ('buy', 'sell'):
+            raise ValueError("Invalid trade side")
+        if order_type not in ('market', 'limit'):
+            raise ValueError("Invalid order type")
+        if amount <= 0:
+            raise ValueError("Order amount must be positive")
+        if order_type == 'limit' and price is None:
+            raise ValueError("Limit orders need a price")
+
+        order = Order(next(self._ids), pair, side, amount, price, order_type, owner, next(self._sequence))
+        book = self.book(pair)
+        fills = book.match(order)
+
+        if order.remaining > EPSILON:
+            if order_type == 'limit':
+                book.add(order)
+            elif self.external_liquidity and pair in self.last_price:
+                fills.append(Fill(order.order_id, None, pair, side, order.remaining,
+                                  self.last_price[pair], owner))
+                order.remaining = 0.0
+            else:
+                order.status = 'cancelled'  # Unfilled market remainder is not kept
+
+        if order.remaining <= EPSILON:
+            order.status = 'filled'
+        self.fill_count += len(fills)
+        self._book_positions(fills)
+        return order, fills
+
+    def _book_positions(self, fills):
+        """Update net positions and retire the exits of positions that are now flat or reversed"""
+        touched = set()
+        for fill in fills:
+            key = (fill.pair, fill.owner)
+            signed = fill.amount if fill.side == 'buy' else -fill.amount
+            self.positions[key] = self.positions.get(key, 0.0) + signed
+            touched.add(key)
+        for key in touched:
+            groups = self._exits.get(key)
+            if not groups:
+                continue
+            position = self.positions[key]
+            for group in list(groups):
+                # A 'sell' exit protects a long; it is orphaned once the position is no longer long
+                side = self._groups[group]['side']
+                if (position <= EPSILON) if side == 'sell' else (position >= -EPSILON):
+                    self.cancel_group(group)
+
+    def cancel(self, order_id):
+        for book in self.books.values():
+            order = book.cancel(order_id)
+            if order is not None:
+                return order
+        return None
+
+    def attach_exits(self, pair, side, amount, stop_loss=None, take_profit=None, owner=None):
+        """Register one-cancels-other exit triggers for a position.
+
+        side is the side of the exit order ('sell' closes a long). Returns
+        the trigger ids.
+        """
+        group = next(self._ids)
+        ids = []
+        for kind, level in (('stop_loss', stop_loss), ('take_profit', take_profit)):
+            if level is None or np.isnan(level):
+                continue
+            trigger_id = next(self._ids)
+            fires_below = (side == 'sell') == (kind == 'stop_loss')
+            self._triggers[trigger_id] = {'pair': pair, 'side': side, 'amount': amount, 'kind': kind,
+                                          'level': level, 'owner': owner, 'group': group, 'active': True}
+            if fires_below:
+                heapq.heappush(self._below.setdefault(pair, []), (-level, trigger_id))
+            else:
+                heapq.heappush(self._above.setdefault(pair, []), (level, trigger_id))
+            ids.append(trigger_id)
+        self._groups[group] = {'key': (pair, owner), 'side': side, 'ids': ids}
+        self._exits.setdefault((pair, owner), []).append(group)
+        return ids
+
+    def cancel_trigger(self, trigger_id):
+        trigger = self._triggers.pop(trigger_id, None)
+        if trigger is not None:
+            trigger['active'] = False
+
+    def cancel_group(self, group):
+        """Cancel every trigger of an exit group"""
+        entry = self._groups.pop(group, None)
+        if entry is None:
+            return
+        self._exits[entry['key']].remove(group)
+        for trigger_id in entry['ids']:
+            self.cancel_trigger(trigger_id)
+
+    def update_price(self, pair, price):
+        """Set the reference price and fire any crossed triggers; returns their fills"""
+        self.last_price[pair] = price
+        fired = []
+        below = self._below.get(pair, [])
+        while below and -below[0][0] >= price:
+            fired.append(heapq.heappop(below)[1])
+        above = self._above.get(pair, [])
+        while above and above[0][0] <= price:
+            fired.append(heapq.heappop(above)[1])
+
+        fills = []
+        for trigger_id in fired:
+            trigger = self._triggers.pop(trigger_id, None)
+            if trigger is None or not trigger['active']:
+                continue
+            # One-cancels-other: retire the sibling exit
+            self.cancel_group(trigger['group'])
+            # Close no more than the owner still holds on the side this exit protects
+            position = self.positions.get((pair, trigger['owner']), 0.0)
+            held = position if trigger['side'] == 'sell' else -position
+            amount = min(trigger['amount'], held)
+            if amount <= EPSILON:
+                continue
+            _, trigger_fills = self.submit(pair, trigger['side'], amount, owner=trigger['owner'])
+            fills.extend(trigger_fills)
+        return fills
+
+    def submit_signal(self, pair, signal, amount, owner=None):
+        """Act on a generate_trading_signals result: market entry plus stop/target exits"""
+        if signal['action'] not in ('buy', 'sell'):
+            return None, []
+        self.last_price.setdefault(pair, signal['entry_price'])
+        order, fills = self.submit(pair, signal['action'], amount, owner=owner)
+        exit_side = 'sell' if signal['action'] == 'buy' else 'buy'
+        self.attach_exits(pair, exit_side, order.filled, signal['stop_loss'], signal['take_profit'], owner)
+        return order, fills
+
+
+def benchmark(n_orders=100000, pairs=('EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF'), seed=42):
+    """Throughput of a random mix of limit and market orders, in orders per second"""
+    rng = np.random.default_rng(seed)
+    engine = MatchingEngine()
+    pair_idx = rng.integers(0, len(pairs), n_orders)
+    sides = np.where(rng.random(n_orders) < 0.5, 'buy', 'sell')
+    is_market = rng.random(n_orders) < 0.2
+    offsets = rng.normal(0, 0.0005, n_orders)
+    amounts = rng.integers(1, 100, n_orders) * 1000.0
+    for pair in pairs:
+        engine.update_price(pair, 1.0)
+
+    started = time.perf_counter()
+    for i in range(n_orders):
+        pair = pairs[pair_idx[i]]
+        if is_market[i]:
+            engine.submit(pair, sides[i], amounts[i])
+        else:
+            engine.submit(pair, sides[i], amounts[i], 'limit', 1.0 + offsets[i])
+    elapsed = time.perf_counter() - started
+    return {'orders': n_orders, 'fills': engine.fill_count, 'seconds': elapsed,
+            'orders_per_second': n_orders / elapsed}
@@ -0,0 +1,435 @@
+"""Monte Carlo stress test: the backtest signal and exit rules over thousands of simulated paths.
+
+Run from the repository root:
+
+    python -m utils.montecarlo --pair EUR/USD --paths 10000 --bars 100000 --model regime
+    python -m utils.montecarlo --model bootstrap --paths 2000 --bars 20000 --rsi-oversold 60 --rsi-overbought 40
+
+Paths are drawn in batches of (paths, bars) arrays:
+    bootstrap   stationary block bootstrap of the pair's historical bar returns
+    student_t   constant volatility with Student-t shocks (fat tails)
+    regime      calm and stressed volatility regimes switching as a Markov chain, Student-t shocks
+
+Each batch runs the compute_signal_history rules on every path at once with
+the array kernels, then the backtest's one-position-at-a-time exits per
+path. Batches go to a process pool. Each one returns fixed-size quantile
+sketches of PnL, drawdown, trade return and time to stop, and the sketches
+are merged as batches finish, so memory stays flat however many paths run.
+A batch's random numbers depend only on the seed and the batch number, so
+results don't depend on the worker count.
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .backtest import DEFAULT_PARAMS, trade_rows
+from .data_generator import load_forex_data
+from .instrumentation import instrument
+from .market_simulator import BASE_PRICES, BASE_VOLATILITY, SECONDS_PER_YEAR, TIMEFRAMES
+
+MODELS = ('bootstrap', 'student_t', 'regime')
+
+PATH_PARAMS = {
+    'df': 4,             # Student-t degrees of freedom; None for normal shocks
+    'calm_bars': 500,    # mean length of a calm regime, in bars
+    'stress_bars': 100,  # mean length of a stressed regime, in bars
+    'stress_vol': 2.5,   # stressed volatility as a multiple of calm volatility
+    'block_bars': 50,    # mean block length of the stationary bootstrap
+}
+
+# Bars of the pair's history the bootstrap resamples
+HISTORY_BARS = 5000
+
+# Paths per batch are chosen so each (paths, bars) array holds about this many values
+BATCH_VALUES = 1_000_000
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+METRICS = ('total_return', 'max_drawdown', 'trades', 'trade_return', 'time_to_stop')
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile estimate in fixed memory.
+
+    Values are counted in logarithmic buckets, one set for each sign, so
+    any quantile is returned within the relative accuracy of its true
+    value (DDSketch). Magnitudes below min_value count as zero and those
+    above max_value fall in the top bucket.
+    """
+
+    def __init__(self, accuracy=0.01, min_value=1e-9, max_value=1e9):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.min_value = min_value
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.floor(math.log(min_value) / self._log_gamma)
+        self.size = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+        self.positive = np.zeros(self.size, dtype=np.int64)
+        self.negative = np.zeros(self.size, dtype=np.int64)
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _keys(self, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64) - self._offset
+        return np.clip(keys, 0, self.size - 1)
+
+    def update(self, values):
+        """Add an array of values; NaNs are ignored"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        large = np.abs(values) >= self.min_value
+        self.zero += int(len(values) - large.sum())
+        for store, part in ((self.positive, values[large & (values > 0)]),
+                            (self.negative, -values[large & (values < 0)])):
+            if len(part):
+                store += np.bincount(self._keys(part), minlength=self.size)
+
+    def merge(self, other):
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+    def quantile(self, q):
+        if not self.count:
+            return float('nan')
+        # Buckets from the most negative value up: negative keys descending, zero, positive keys ascending
+        cumulative = np.cumsum(np.concatenate([self.negative[::-1], [self.zero], self.positive]))
+        i = int(np.searchsorted(cumulative, q * (self.count - 1), side='right'))
+        if i < self.size:
+            value = -self._value(self.size - 1 - i)
+        elif i == self.size:
+            value = 0.0
+        else:
+            value = self._value(i - self.size - 1)
+        return min(max(value, self.min), self.max)
+
+    def _value(self, key):
+        return 2 * self.gamma ** (key + self._offset) / (self.gamma + 1)
+
+
+def _regimes(rng, n_paths, bars, calm_bars, stress_bars):
+    """Boolean (paths, bars) array, True in stressed bars, from alternating geometric regime lengths"""
+    enter, leave = 1.0 / calm_bars, 1.0 / stress_bars
+    stressed = rng.random(n_paths) < enter / (enter + leave)
+    ends = np.zeros((n_paths, 0), dtype=np.int64)
+    while not len(ends[0]) or ends[:, -1].min() < bars:
+        k = 2 * int(bars / (calm_bars + stress_bars)) + 8
+        parity = (np.arange(len(ends[0]), len(ends[0]) + k) % 2).astype(bool)
+        p = np.where(stressed[:, None] ^ parity, leave, enter)
+        lengths = rng.geometric(p)
+        start = ends[:, -1:] if len(ends[0]) else 0
+        ends = np.hstack([ends, start + np.cumsum(lengths, axis=1)])
+    # Each regime end flips the state from that bar on
+    flips = np.zeros((n_paths, bars + 1), dtype=np.int8)
+    rows, cols = np.nonzero(ends < bars)
+    flips[rows, ends[rows, cols]] = 1
+    return stressed[:, None] ^ (np.cumsum(flips[:, :bars], axis=1) % 2).astype(bool)
+
+
+def _shocks(rng, shape, df):
+    """Unit-variance shocks: Student-t with df degrees of freedom, or normal when df is None"""
+    if df is None:
+        return rng.standard_normal(shape)
+    return rng.standard_t(df, shape) * math.sqrt((df - 2) / df)
+
+
+def simulate_returns(rng, n_paths, bars, model, sigma, sample=None, **path_params):
+    """(paths, bars) log returns of one model; sigma is the per-bar volatility"""
+    p = {**PATH_PARAMS, **path_params}
+    if model == 'bootstrap':
+        # Stationary bootstrap: a new block starts at a random bar with probability 1/block_bars
+        m = len(sample)
+        new_block = rng.random((n_paths, bars)) < 1.0 / p['block_bars']
+        new_block[:, 0] = True
+        t = np.arange(bars)
+        anchor = np.maximum.accumulate(np.where(new_block, t, 0), axis=1)
+        starts = rng.integers(0, m, (n_paths, bars))
+        return sample[(np.take_along_axis(starts, anchor, axis=1) + t - anchor) % m]
+
+    scale = np.full((n_paths, bars), sigma)
+    if model == 'regime':
+        # Calm volatility is set so the long-run variance stays sigma**2
+        enter, leave = 1.0 / p['calm_bars'], 1.0 / p['stress_bars']
+        stress_share = enter / (enter + leave)
+        calm = sigma / math.sqrt(1 - stress_share + p['stress_vol'] ** 2 * stress_share)
+        scale = np.where(_regimes(rng, n_paths, bars, p['calm_bars'], p['stress_bars']),
+                         calm * p['stress_vol'], calm)
+    elif model != 'student_t':
+        raise ValueError(f"Unknown model: {model}")
+    return -0.5 * scale ** 2 + scale * _shocks(rng, (n_paths, bars), p['df'])
+
+
+def price_paths(rng, returns, start_price):
+    """High, low and close arrays from log returns, with wicks sized like generate_market_data's"""
+    close = start_price * np.exp(np.cumsum(returns, axis=1))
+    open_ = np.empty_like(close)
+    open_[:, 0] = start_price
+    open_[:, 1:] = close[:, :-1]
+    wick = np.abs(returns).mean(axis=1, keepdims=True) * close
+    high = np.maximum(open_, close) + np.abs(rng.standard_normal(close.shape)) * wick
+    low = np.minimum(open_, close) - np.abs(rng.standard_normal(close.shape)) * wick
+    return high, low, close
+
+
+def _crossover(fast, slow):
+    """Per-bar crossover flags along the last axis: +1 bullish, -1 bearish, 0 otherwise"""
+    fast_prev = np.full(fast.shape, np.nan)
+    slow_prev = np.full(slow.shape, np.nan)
+    fast_prev[..., 1:] = fast[..., :-1]
+    slow_prev[..., 1:] = slow[..., :-1]
+    up = (fast > slow) & (fast_prev <= slow_prev)
+    down = (fast < slow) & (fast_prev >= slow_prev)
+    return up.astype(np.int8) - down.astype(np.int8)
+
+
+def _rolling_extreme(values, window, ufunc):
+    """Rolling np.minimum or np.maximum along the last axis; NaN until a full window.
+
+    Van Herk/Gil-Werman: running extremes forward and backward inside
+    window-long blocks, so every window is one combination of two of them
+    whatever its length.
+    """
+    n = values.shape[-1]
+    out = np.full(values.shape, np.nan)
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full(values.shape[:-1] + (blocks * window,), values[..., -1:])
+    padded[..., :n] = values
+    padded = padded.reshape(values.shape[:-1] + (blocks, window))
+    forward = ufunc.accumulate(padded, axis=-1).reshape(values.shape[:-1] + (-1,))
+    backward = np.flip(ufunc.accumulate(np.flip(padded, -1), axis=-1), -1).reshape(values.shape[:-1] + (-1,))
+    out[..., window - 1:] = ufunc(backward[..., :n - window + 1], forward[..., window - 1:n])
+    return out
+
+
+def signal_arrays(high, low, close, **params):
+    """compute_signal_history's rules over (paths, bars) arrays.
+
+    Returns the per-bar side (+1 buy, -1 sell, 0 hold), stop loss and take
+    profit arrays. Stops are always the trailing sr_window low and high
+    (the backtest's stops='window'): rebuilding a level index per signal
+    bar doesn't vectorize across paths. pattern_decay isn't supported:
+    pattern detection runs on one series at a time.
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    if p['pattern_decay'] is not None:
+        raise ValueError("pattern_decay is not supported over simulated paths")
+
+    trend = _crossover(kernels.ema(close, p['short_period']), kernels.ema(close, p['long_period']))
+    macd, macd_signal_line = kernels.macd(close)
+    macd_signal = _crossover(macd, macd_signal_line)
+    rsi = kernels.rsi(close, p['rsi_period'])
+    adx = kernels.adx(high, low, close, p['adx_period'])[0]
+    with np.errstate(invalid='ignore'):
+        strong = adx > p['adx_threshold']
+        buy = (trend == 1) & strong & (rsi < p['rsi_oversold']) & (macd_signal == 1)
+        sell = (trend == -1) & strong & (rsi > p['rsi_overbought']) & (macd_signal == -1)
+
+    support = _rolling_extreme(low, p['sr_window'], np.minimum)
+    resistance = _rolling_extreme(high, p['sr_window'], np.maximum)
+    sides = buy.astype(np.int8) - sell.astype(np.int8)
+    stops = np.where(buy, support, np.where(sell, resistance, np.nan))
+    targets = np.where(buy, close + (close - support) * p['reward_ratio'],
+                       np.where(sell, close - (resistance - close) * p['reward_ratio'], np.nan))
+    return sides, stops, targets
+
+
+def _new_sketches():
+    return {metric: QuantileSketch() for metric in METRICS}
+
+
+@instrument('montecarlo.batch')
+def simulate_batch(rng, n_paths, config):
+    """Simulate n_paths paths and trade them; returns metric sketches, exit reason counts and path count"""
+    returns = simulate_returns(rng, n_paths, config['bars'], config['model'], config['sigma'],
+                               config['sample'], **config['path_params'])
+    high, low, close = price_paths(rng, returns, config['start_price'])
+    del returns
+    sides, stops, targets = signal_arrays(high, low, close, **config['params'])
+
+    path_returns, drawdowns, counts, trade_returns, stop_times = [], [], [], [], []
+    reasons = {}
+    for i in range(n_paths):
+        trades = trade_rows(high[i], low[i], close[i], sides[i], stops[i], targets[i], config['max_bars'])
+        counts.append(len(trades))
+        if not trades:
+            path_returns.append(0.0)
+            drawdowns.append(0.0)
+            continue
+        entry_index, exit_index, side, entry, exit_price, _, _, reason = map(np.array, zip(*trades))
+        trade_return = side * (exit_price - entry) / entry
+        # Same compounding and drawdown as summarize_trades
+        equity = np.cumprod(1 + trade_return)
+        peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+        path_returns.append(equity[-1] - 1)
+        drawdowns.append((equity / peak - 1).min())
+        trade_returns.append(trade_return)
+        stopped = reason == 'stop_loss'
+        stop_times.append(exit_index[stopped] - entry_index[stopped])
+        for name, n in zip(*np.unique(reason, return_counts=True)):
+            reasons[str(name)] = reasons.get(str(name), 0) + int(n)
+
+    sketches = _new_sketches()
+    sketches['total_return'].update(path_returns)
+    sketches['max_drawdown'].update(drawdowns)
+    sketches['trades'].update(counts)
+    if trade_returns:
+        sketches['trade_return'].update(np.concatenate(trade_returns))
+        sketches['time_to_stop'].update(np.concatenate(stop_times))
+    return {'paths': n_paths, 'sketches': sketches, 'exit_reasons': reasons}
+
+
+_worker_config = None
+
+
+def _init_worker(config):
+    """Keep the simulation settings and the bootstrap sample once per worker process"""
+    global _worker_config
+    _worker_config = config
+
+
+def _run_batch(batch):
+    config = _worker_config
+    n_paths = min(config['batch_paths'], config['paths'] - batch * config['batch_paths'])
+    return simulate_batch(np.random.default_rng([config['seed'], batch]), n_paths, config)
+
+
+def stress_config(pair='EUR/USD', paths=1000, bars=10000, model='regime', timeframe='1h', seed=42,
+                  max_bars=None, history=None, path_params=None, **params):
+    """Settings shared by every batch of a run_stress_test call"""
+    if model not in MODELS:
+        raise ValueError(f"Unknown model: {model}")
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown strategy parameters: {', '.join(sorted(unknown))}")
+
+    dt = TIMEFRAMES[timeframe][0] / SECONDS_PER_YEAR
+    sample = None
+    start_price = BASE_PRICES.get(pair, 1.0)
+    if model == 'bootstrap':
+        history = load_forex_data(pair, HISTORY_BARS, timeframe) if history is None else history
+        closes = history['Close'].to_numpy(dtype=float)
+        sample = np.diff(np.log(closes))
+        start_price = closes[-1]
+    return {
+        'pair': pair, 'paths': paths, 'bars': bars, 'model': model, 'timeframe': timeframe, 'seed': seed,
+        'max_bars': max_bars, 'params': params, 'path_params': path_params or {}, 'sample': sample,
+        'sigma': BASE_VOLATILITY.get(pair, 0.08) * math.sqrt(dt), 'start_price': start_price,
+        'batch_paths': max(1, min(paths, BATCH_VALUES // bars)),
+    }
+
+
+def run_stress_test(pair='EUR/USD', paths=1000, bars=10000, model='regime', timeframe='1h', seed=42,
+                    max_workers=None, max_bars=None, history=None, path_params=None, progress=None, **params):
+    """Run the backtest rules over simulated paths of one pair across a process pool.
+
+    params override the backtest's DEFAULT_PARAMS and path_params the
+    PATH_PARAMS of the path model. progress(paths_done, paths) is called
+    as batches finish. Returns the merged sketches, a quantile table of
+    every metric, exit reason counts and the elapsed seconds.
+    """
+    config = stress_config(pair, paths, bars, model, timeframe, seed, max_bars, history, path_params, **params)
+    batches = range(math.ceil(paths / config['batch_paths']))
+    max_workers = min(max_workers or os.cpu_count(), len(batches))
+
+    started = time.perf_counter()
+    sketches = _new_sketches()
+    reasons = {}
+    done = 0
+
+    def collect(results):
+        nonlocal done
+        for result in results:
+            for metric, sketch in result['sketches'].items():
+                sketches[metric].merge(sketch)
+            for reason, n in result['exit_reasons'].items():
+                reasons[reason] = reasons.get(reason, 0) + n
+            done += result['paths']
+            if progress is not None:
+                progress(done, paths)
+
+    if max_workers <= 1:
+        _init_worker(config)
+        collect(map(_run_batch, batches))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(config,)) as pool:
+            collect(pool.map(_run_batch, batches))
+
+    return {
+        'pair': pair, 'model': model, 'paths': done, 'bars': bars, 'seconds': time.perf_counter() - started,
+        'sketches': sketches, 'quantiles': quantile_table(sketches), 'exit_reasons': reasons,
+    }
+
+
+def quantile_table(sketches, quantiles=QUANTILES):
+    """One row per metric: observation count, mean and the given quantiles"""
+    return pd.DataFrame([{'count': sketch.count, 'mean': sketch.mean,
+                          **{f'p{q * 100:g}': sketch.quantile(q) for q in quantiles}}
+                         for sketch in sketches.values()], index=pd.Index(list(sketches), name='metric'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pair', default='EUR/USD')
+    parser.add_argument('--paths', type=int, default=1000)
+    parser.add_argument('--bars', type=int, default=10000)
+    parser.add_argument('--model', default='regime', choices=MODELS)
+    parser.add_argument('--timeframe', default='1h', choices=list(TIMEFRAMES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-bars', type=int, default=None, help='close trades open this many bars')
+    parser.add_argument('--df', type=float, default=PATH_PARAMS['df'], help='Student-t degrees of freedom')
+    for name, value in DEFAULT_PARAMS.items():
+        if name != 'pattern_decay':
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args(argv)
+
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS if name != 'pattern_decay'}
+    last = itertools.count()
+
+    def progress(done, total):
+        if next(last) % 20 == 0 or done == total:
+            print(f"  {done:,}/{total:,} paths", file=sys.stderr)
+
+    result = run_stress_test(args.pair, args.paths, args.bars, args.model, args.timeframe, args.seed,
+                             args.workers, args.max_bars, path_params={'df': args.df}, progress=progress,
+                             **params)
+    print(f"{result['paths']:,} {args.model} paths x {args.bars:,} {args.timeframe} bars of {args.pair} "
+          f"in {result['seconds']:.1f}s")
+    with pd.option_context('display.width', 160, 'display.float_format', '{:.6g}'.format):
+        print(result['quantiles'].to_string())
+    print("Exit reasons: " + (', '.join(f"{reason} {n:,}" for reason, n in sorted(result['exit_reasons'].items()))
+                              or 'no trades'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
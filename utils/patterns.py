@@ -0,0 +1,253 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+
+EVENT_COLUMNS = ['bar', 'Date', 'pattern', 'bias', 'start', 'level']
+
+# Tolerances are in multiples of the average true range, so the same
+# defaults work for minute and daily bars alike
+DEFAULT_PARAMS = {
+    'order': 5,            # a pivot is the extreme of order bars either side
+    'atr_period': 14,
+    'tolerance': 0.5,      # max gap between matching tops, bottoms or shoulders
+    'depth': 2.0,          # min retracement between tops/bottoms, head above shoulders
+    'max_span': 100,       # max bars between consecutive pivots of one pattern
+    'flat': 0.5,           # max change of a "flat" triangle boundary
+    'pole': 10,            # flag pole length in bars
+    'pole_strength': 4.0,  # min pole move
+    'flag': 8,             # flag consolidation length in bars
+}
+
+
+class Pivots:
+    """Confirmed swing highs and lows of one series, extracted once and indexed.
+
+    A peak at bar i is the highest high from i - order to i + order (ties go
+    to the earlier bar). It only becomes known at bar i + order, its
+    confirmation bar, so detections never look ahead.
+    """
+
+    def __init__(self, high, low, order=5):
+        self.order = order
+        self.peaks = self._extrema(np.asarray(high, dtype=float), order, np.greater, np.greater_equal)
+        self.troughs = self._extrema(np.asarray(low, dtype=float), order, np.less, np.less_equal)
+        self.peak_values = np.asarray(high, dtype=float)[self.peaks]
+        self.trough_values = np.asarray(low, dtype=float)[self.troughs]
+        self.peak_confirmed = self.peaks + order
+        self.trough_confirmed = self.troughs + order
+
+    @staticmethod
+    def _extrema(values, order, beats_left, beats_right):
+        n = len(values)
+        if n < 2 * order + 1:
+            return np.empty(0, dtype=np.int64)
+        centre = values[order:n - order]
+        keep = np.ones(len(centre), dtype=bool)
+        for shift in range(1, order + 1):
+            keep &= beats_left(centre, values[order - shift:n - order - shift])
+            keep &= beats_right(centre, values[order + shift:n - order + shift])
+        return np.flatnonzero(keep) + order
+
+    def last_peak(self, bars):
+        """Index into peaks of the latest peak confirmed at or before each bar, -1 if none"""
+        return np.searchsorted(self.peak_confirmed, bars, side='right') - 1
+
+    def last_trough(self, bars):
+        return np.searchsorted(self.trough_confirmed, bars, side='right') - 1
+
+
+def _range_extreme(values, starts, stops, reducer):
+    """reducer over values[starts[i]:stops[i]] for each i; ranges must be non-empty and stops < len(values)"""
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = stops
+    # reduceat over interleaved bounds yields each range at the even positions
+    return reducer.reduceat(values, bounds)[0::2]
+
+
+def _rolling_extreme(values, window, reducer):
+    """reducer over values[i:i + window] for every full window, by repeated pairwise reduction"""
+    out = values[:len(values) - window + 1].copy()
+    for shift in range(1, window):
+        reducer(out, values[shift:len(values) - window + 1 + shift], out=out)
+    return out
+
+
+def _events(bars, pattern, bias, start, level):
+    return pd.DataFrame({'bar': bars, 'pattern': pattern, 'bias': bias,
+                         'start': start, 'level': level})
+
+
+def _double_tops(piv, high, low, atr, p):
+    """Two peaks at the same height with a retracement of at least depth between them"""
+    found = []
+    for kind, idx, values, extreme, nearer, other, sign in (
+            ('Double Top', piv.peaks, piv.peak_values, np.minimum, np.minimum, low, 1),
+            ('Double Bottom', piv.troughs, piv.trough_values, np.maximum, np.maximum, high, -1)):
+        if len(idx) < 2:
+            continue
+        first, second = idx[:-1], idx[1:]
+        scale = atr[second]
+        between = _range_extreme(other, first + 1, second, extreme)
+        retracement = sign * (nearer(values[1:], values[:-1]) - between)
+        hit = ((np.abs(values[1:] - values[:-1]) <= p['tolerance'] * scale)
+               & (retracement >= p['depth'] * scale)
+               & (second - first <= p['max_span']))
+        bias = 'bearish' if sign > 0 else 'bullish'
+        found.append(_events(second[hit] + piv.order, kind, bias, first[hit], between[hit]))
+    return found
+
+
+def _head_and_shoulders(piv, high, low, atr, p):
+    """Three peaks with the middle one highest and the outer two level (and the inverse)"""
+    found = []
+    for kind, idx, values, extreme, other, sign in (
+            ('Head and Shoulders', piv.peaks, piv.peak_values, np.minimum, low, 1),
+            ('Inverse Head and Shoulders', piv.troughs, piv.trough_values, np.maximum, high, -1)):
+        if len(idx) < 3:
+            continue
+        left, head, right = idx[:-2], idx[1:-1], idx[2:]
+        lv, hv, rv = values[:-2] * sign, values[1:-1] * sign, values[2:] * sign
+        scale = atr[right]
+        hit = ((hv - np.maximum(lv, rv) >= p['depth'] * scale)
+               & (np.abs(lv - rv) <= p['tolerance'] * 2 * scale)
+               & (head - left <= p['max_span']) & (right - head <= p['max_span']))
+        # Neckline: average of the two reaction extremes between the shoulders and the head
+        neckline = (_range_extreme(other, left + 1, head, extreme)
+                    + _range_extreme(other, head + 1, right, extreme)) / 2
+        bias = 'bearish' if sign > 0 else 'bullish'
+        found.append(_events(right[hit] + piv.order, kind, bias, left[hit], neckline[hit]))
+    return found
+
+
+def _triangles(piv, atr, p):
+    """Converging swing highs and lows over the last three of each, checked at every new pivot"""
+    bars = np.sort(np.concatenate([piv.peak_confirmed, piv.trough_confirmed]))
+    bars = bars[np.concatenate([[True], np.diff(bars) > 0])]
+    ip, it = piv.last_peak(bars), piv.last_trough(bars)
+    ok = (ip >= 2) & (it >= 2)
+    bars, ip, it = bars[ok], ip[ok], it[ok]
+    if len(bars) == 0:
+        return []
+
+    pv, tv = piv.peak_values, piv.trough_values
+    scale = atr[bars]
+    flat = p['flat'] * scale
+    upper = pv[ip] - pv[ip - 2]
+    lower = tv[it] - tv[it - 2]
+    # Boundaries must move monotonically through the middle pivot
+    upper_falling = (upper < -flat) & (pv[ip - 1] <= pv[ip - 2]) & (pv[ip] <= pv[ip - 1])
+    lower_rising = (lower > flat) & (tv[it - 1] >= tv[it - 2]) & (tv[it] >= tv[it - 1])
+    upper_flat = np.abs(upper) <= flat
+    lower_flat = np.abs(lower) <= flat
+    start = np.minimum(piv.peaks[ip - 2], piv.troughs[it - 2])
+    compact = bars - start <= 3 * p['max_span']
+
+    pattern = np.select(
+        [upper_falling & lower_rising, upper_flat & lower_rising, upper_falling & lower_flat],
+        ['Symmetrical Triangle', 'Ascending Triangle', 'Descending Triangle'], '')
+    pattern = np.where(compact, pattern, '')
+    # Report a triangle when it forms, not again at every pivot that keeps it intact
+    previous = np.concatenate([[''], pattern[:-1]])
+    hit = (pattern != '') & (pattern != previous)
+    bias = np.select([pattern == 'Ascending Triangle', pattern == 'Descending Triangle'],
+                     ['bullish', 'bearish'], 'neutral')
+    level = np.where(pattern == 'Descending Triangle', tv[it], pv[ip])
+    return [_events(bars[hit], pattern[hit], bias[hit], start[hit], level[hit])]
+
+
+def _flags(high, low, close, atr, p):
+    """A strong pole followed by a tight consolidation that does not extend the move"""
+    pole, flag = p['pole'], p['flag']
+    n = len(close)
+    if n < pole + flag + 1:
+        return []
+    t = np.arange(pole + flag, n)
+    base, top = t - flag - pole, t - flag
+    move = close[top] - close[base]
+    # Consolidation window (t - flag, t] starts at t - flag + 1
+    rows = t - flag + 1
+    flag_high = _rolling_extreme(high, flag, np.maximum)[rows]
+    flag_low = _rolling_extreme(low, flag, np.minimum)[rows]
+    drift = close[t] - close[top]
+
+    strong = np.abs(move) >= p['pole_strength'] * atr[top]
+    tight = flag_high - flag_low <= 0.5 * np.abs(move)
+    holds = np.sign(drift) != np.sign(move)
+    hit = strong & tight & holds
+    # One event per run of qualifying bars
+    hit[1:] &= ~hit[:-1]
+    bull = move[hit] > 0
+    return [_events(t[hit], np.where(bull, 'Bull Flag', 'Bear Flag'), np.where(bull, 'bullish', 'bearish'),
+                    base[hit], np.where(bull, flag_high[hit], flag_low[hit]))]
+
+
+def detect_patterns(data, **params):
+    """Scan the whole history once and return a sparse table of pattern events.
+
+    Each row is a pattern completed at `bar` (positional; Date is that bar's
+    date), where it first became detectable, with the bar where it started
+    and its key price level (neckline, breakout boundary or flag edge).
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+    close = data['Close'].to_numpy(dtype=float)
+    atr = kernels.rolling_mean(kernels.true_range(high, low, close), p['atr_period'])
+
+    piv = Pivots(high, low, p['order'])
+    found = (_double_tops(piv, high, low, atr, p)
+             + _head_and_shoulders(piv, high, low, atr, p)
+             + _triangles(piv, atr, p)
+             + _flags(high, low, close, atr, p))
+    found = [f for f in found if len(f)]
+    if not found:
+        return pd.DataFrame({name: [] for name in EVENT_COLUMNS})
+
+    events = pd.concat(found, ignore_index=True)
+    events = events[events['bar'] < len(data)].sort_values(['bar', 'pattern'], kind='stable')
+    events.insert(1, 'Date', data['Date'].to_numpy()[events['bar'].to_numpy()] if 'Date' in data
+                  else events['bar'].to_numpy())
+    return events.reset_index(drop=True)
+
+
+def event_features(events, n_bars, decay=None):
+    """Dense per-bar feature from an event table: +1 bullish, -1 bearish at each event bar.
+
+    With decay (in bars) the value fades exponentially after the event, so
+    strategies can condition on recent patterns rather than exact bars.
+    """
+    impulse = np.zeros(n_bars)
+    direction = events['bias'].map({'bullish': 1.0, 'bearish': -1.0}).fillna(0.0).to_numpy()
+    np.add.at(impulse, events['bar'].to_numpy(dtype=np.int64), direction)
+    if decay is None:
+        return impulse
+    factor = np.exp(-1.0 / decay)
+    return kernels._linear_recurrence(impulse, factor, 0.0) / (1.0 - factor)
+
+
+def _detect_pair(pair, loader, params):
+    events = detect_patterns(loader(pair), **params)
+    events.insert(0, 'pair', pair)
+    return events
+
+
+def detect_patterns_batch(pairs, loader, max_workers=None, **params):
+    """Event table for many pairs, each loaded and scanned inside a worker process.
+
+    loader(pair) must return the pair's OHLCV frame and be picklable (a
+    module-level function or functools.partial), so only the sparse events
+    cross process boundaries. max_workers=1 runs in-process.
+    """
+    pairs = list(pairs)
+    if max_workers == 1 or len(pairs) == 1:
+        tables = [_detect_pair(pair, loader, params) for pair in pairs]
+    else:
+        max_workers = max_workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            tables = list(pool.map(_detect_pair, pairs, [loader] * len(pairs), [params] * len(pairs)))
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,245 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .trade_journal import SnapshotConflict
+
+
+class TradeHistory:
+    """Append-only columnar trade history backed by growable NumPy arrays"""
+
+    def __init__(self, capacity=1024):
+        self._timestamps = np.empty(capacity, dtype='datetime64[us]')
+        self._pair_codes = np.empty(capacity, dtype='int32')
+        self._sides = np.empty(capacity, dtype='int8')  # +1 buy, -1 sell
+        self._amounts = np.empty(capacity)
+        self._prices = np.empty(capacity)
+        self.pairs = []
+        self._codes = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = 2 * len(self._amounts)
+        for name in ('_timestamps', '_pair_codes', '_sides', '_amounts', '_prices'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def append(self, timestamp, pair, side, amount, price):
+        if self._size == len(self._amounts):
+            self._grow()
+        code = self._codes.get(pair)
+        if code is None:
+            code = self._codes[pair] = len(self.pairs)
+            self.pairs.append(pair)
+        i = self._size
+        self._timestamps[i] = np.datetime64(timestamp, 'us')
+        self._pair_codes[i] = code
+        self._sides[i] = 1 if side == 'buy' else -1
+        self._amounts[i] = amount
+        self._prices[i] = price
+        self._size += 1
+
+    def to_frame(self, start=0, stop=None):
+        """Rows [start, stop) as a DataFrame with the columns the Portfolio page shows"""
+        stop = self._size if stop is None else min(stop, self._size)
+        start = max(0, min(start, stop))
+        amounts = self._amounts[start:stop]
+        prices = self._prices[start:stop]
+        return pd.DataFrame({
+            'timestamp': self._timestamps[start:stop],
+            'pair': pd.Categorical.from_codes(self._pair_codes[start:stop], categories=self.pairs)
+                    if self.pairs else pd.Categorical([]),
+            'side': np.where(self._sides[start:stop] > 0, 'buy', 'sell'),
+            'amount': amounts,
+            'price': prices,
+            'value': amounts * prices,
+        }, index=pd.RangeIndex(start, stop))
+
+
+class PairPosition:
+    """Net position and average-cost accounting for one pair"""
+
+    __slots__ = ('pair', 'quantity', 'average_cost', 'realized_pnl', 'mark', 'unrealized_pnl')
+
+    def __init__(self, pair):
+        self.pair = pair
+        self.quantity = 0.0  # signed: positive long, negative short
+        self.average_cost = 0.0
+        self.realized_pnl = 0.0
+        self.mark = None
+        self.unrealized_pnl = 0.0
+
+    def apply(self, quantity, price):
+        """Apply a signed fill; returns the realized PnL it produced"""
+        realized = 0.0
+        if self.quantity == 0 or (self.quantity > 0) == (quantity > 0):
+            total = self.quantity + quantity
+            self.average_cost = (self.quantity * self.average_cost + quantity * price) / total
+            self.quantity = total
+            return realized
+
+        closed = min(abs(quantity), abs(self.quantity))
+        direction = 1.0 if self.quantity > 0 else -1.0
+        realized = closed * (price - self.average_cost) * direction
+        self.realized_pnl += realized
+        self.quantity += quantity
+        if abs(self.quantity) < 1e-12:
+            self.quantity = 0.0
+            self.average_cost = 0.0
+        elif (self.quantity > 0) != (direction > 0):
+            # Crossed through flat: the remainder opens at the fill price
+            self.average_cost = price
+        return realized
+
+
+class PortfolioLedger:
+    """Incremental portfolio accounting.
+
+    Keeps net position, average cost and realized/unrealized PnL per pair,
+    plus running totals, so a fill or a price update only touches the
+    affected pair. Trade history is stored columnar in a TradeHistory, or
+    in a TradeJournal when one is given.
+    """
+
+    def __init__(self, initial_balance=100000.0, journal=None, account='default'):
+        self.balance = initial_balance
+        self.positions = {}
+        self.journal = journal
+        self.account = account
+        self.version = 0  # journal snapshot version this ledger was restored from or last saved
+        self.stale = False  # another ledger saved the account since; this one can no longer be saved
+        # With a journal, history lives on disk and is read back a page at a time
+        self.history = TradeHistory() if journal is None else None
+        self.buy_count = 0
+        self.sell_count = 0
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.market_value = 0.0  # sum of signed quantity * mark over all pairs
+
+    @property
+    def trade_count(self):
+        return self.buy_count + self.sell_count
+
+    @property
+    def equity(self):
+        """Cash plus the mark-to-market value of every open position"""
+        return self.balance + self.market_value
+
+    def open_position_count(self):
+        return sum(1 for position in self.positions.values() if position.quantity != 0)
+
+    def _position(self, pair):
+        position = self.positions.get(pair)
+        if position is None:
+            position = self.positions[pair] = PairPosition(pair)
+        return position
+
+    def _revalue(self, position, old_quantity, old_mark, old_unrealized):
+        """Swap one pair's contribution in the running totals"""
+        if old_mark is not None:
+            self.market_value -= old_quantity * old_mark
+        self.unrealized_pnl -= old_unrealized
+        if position.mark is not None:
+            position.unrealized_pnl = position.quantity * (position.mark - position.average_cost)
+            self.market_value += position.quantity * position.mark
+        else:
+            position.unrealized_pnl = 0.0
+        self.unrealized_pnl += position.unrealized_pnl
+
+    def record_fill(self, pair, side, amount, price, timestamp=None):
+        """Book a fill: cash, position, PnL, counters and history"""
+        if side not in ('buy', 'sell'):
+            raise ValueError("Invalid trade side")
+        position = self._position(pair)
+        old = (position.quantity, position.mark, position.unrealized_pnl)
+
+        signed = amount if side == 'buy' else -amount
+        self.balance -= signed * price
+        self.realized_pnl += position.apply(signed, price)
+        position.mark = price
+        self._revalue(position, *old)
+
+        if side == 'buy':
+            self.buy_count += 1
+        else:
+            self.sell_count += 1
+        timestamp = timestamp or datetime.now()
+        if self.journal is None:
+            self.history.append(timestamp, pair, side, amount, price)
+        else:
+            self.journal.append(self.account, timestamp, pair, side, amount, price, self.version)
+
+    @classmethod
+    def restore(cls, journal, account='default', initial_balance=100000.0):
+        """Ledger for account from the journal's last snapshot, without reading its trades"""
+        ledger = cls(initial_balance, journal=journal, account=account)
+        snapshot = journal.load_snapshot(account)
+        if snapshot is None:
+            return ledger
+
+        ledger.balance = snapshot['balance']
+        ledger.buy_count = snapshot['buy_count']
+        ledger.sell_count = snapshot['sell_count']
+        ledger.realized_pnl = snapshot['realized_pnl']
+        ledger.version = snapshot['version']
+        for pair, quantity, average_cost, realized_pnl, mark in snapshot['positions']:
+            position = ledger._position(pair)
+            position.quantity = quantity
+            position.average_cost = average_cost
+            position.realized_pnl = realized_pnl
+            position.mark = mark
+            ledger._revalue(position, 0.0, None, 0.0)
+        return ledger
+
+    def checkpoint(self):
+        """Persist balances and positions (and any queued trades) to the journal.
+
+        Raises SnapshotConflict, and marks the ledger stale, if another ledger
+        saved the account since this one was restored or last saved.
+        """
+        if self.journal is not None:
+            try:
+                self.version = self.journal.save_snapshot(self.account, self)
+            except SnapshotConflict:
+                self.stale = True
+                raise
+
+    def history_page(self, page=0, page_size=100):
+        """One page of trade history, newest first, and the total number of trades"""
+        if self.journal is not None:
+            total = self.journal.count(self.account)
+            return self.journal.trades(self.account, limit=page_size, offset=page * page_size), total
+
+        total = len(self.history)
+        stop = total - page * page_size
+        frame = self.history.to_frame(max(0, stop - page_size), stop).iloc[::-1]
+        return frame.reset_index(drop=True), total
+
+    def mark(self, pair, price):
+        """Mark one pair to market"""
+        position = self.positions.get(pair)
+        if position is None or position.mark == price:
+            return
+        old = (position.quantity, position.mark, position.unrealized_pnl)
+        position.mark = price
+        self._revalue(position, *old)
+
+    def positions_frame(self):
+        """One row per open pair position"""
+        rows = [{
+            'pair': p.pair,
+            'side': 'long' if p.quantity > 0 else 'short',
+            'amount': abs(p.quantity),
+            'average_cost': p.average_cost,
+            'mark': p.mark,
+            'market_value': p.quantity * p.mark,
+            'unrealized_pnl': p.unrealized_pnl,
+            'realized_pnl': p.realized_pnl,
+        } for p in self.positions.values() if p.quantity != 0]
+        return pd.DataFrame(rows)
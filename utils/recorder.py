@@ -0,0 +1,606 @@
+"""Session recorder: ticks and bars in a compact binary file, and deterministic replay.
+
+Run from the repository root:
+
+    python -m utils.recorder record --out data/sessions/day.fxr --hours 24
+    python -m utils.recorder info data/sessions/day.fxr
+    python -m utils.recorder replay data/sessions/day.fxr --speed 60 --start "2026-01-05 09:00"
+    python -m utils.recorder replay data/sessions/day.fxr --trade --timeframe 5m
+
+A recording is a sequence of chunks of up to CHUNK_SIZE records in time
+order. Each column of a chunk is byte-shuffled and zlib-compressed, and
+timestamps are stored as deltas. A footer indexes the chunks by first and
+last timestamp, so seeking to a time is a binary search over chunks, then
+one within the chunk. If a writer dies before writing the footer, the
+reader rebuilds the index from the chunk headers.
+
+Replay delivers records in recorded order to the same callbacks the live
+path uses: ticks as ingestion Ticks, bars as BarAggregator publishes them.
+It runs at recorded pace times speed, or as fast as possible. Nothing
+depends on the wall clock, so a replay gives the same signals and fills
+every time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .ingestion import BarAggregator, BarRingBuffer, FeedAdapter, Tick
+from .market_simulator import TIMEFRAMES, generate_ticks
+
+CHUNK_SIZE = 65536
+COMPRESSION_LEVEL = 1
+DEFAULT_DIR = os.path.join('data', 'sessions')
+
+# Ticks store bid, ask and volume in v1-v3; bars store open, high, low, close and volume
+RECORD_DTYPE = np.dtype([
+    ('time', 'i8'),    # nanoseconds; for a bar, the time of the tick that completed it
+    ('start', 'i8'),   # a bar's bucket start (a tick's own time)
+    ('pair', 'u2'),    # position in the recording's pair list
+    ('kind', 'u1'),    # 0 for a tick, 1 + position in TIMEFRAMES for a bar
+    ('v1', 'f8'), ('v2', 'f8'), ('v3', 'f8'), ('v4', 'f8'), ('v5', 'f8'),
+])
+TICK = 0
+KINDS = {timeframe: i + 1 for i, timeframe in enumerate(TIMEFRAMES)}
+TIMEFRAME_OF = {kind: timeframe for timeframe, kind in KINDS.items()}
+
+MAGIC = b'FXREC001'
+FOOTER_MAGIC = b'FXIDX001'
+_CHUNK = struct.Struct('<4sIqqII')  # b'CHNK', records, first time, last time, header bytes, payload bytes
+_FOOTER = struct.Struct('<Q8s')     # index offset, FOOTER_MAGIC
+
+
+def _shuffle(values):
+    """Bytes of an array regrouped by byte position, which zlib compresses far better for numbers"""
+    values = np.ascontiguousarray(values)
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _unshuffle(raw, dtype, count):
+    dtype = np.dtype(dtype)
+    return np.frombuffer(raw, np.uint8).reshape(dtype.itemsize, count).T.copy().view(dtype).ravel()
+
+
+def _encode(records, header, level):
+    times = records['time']
+    columns = {
+        'time': np.diff(times, prepend=times[:1]),
+        'start': times - records['start'],
+        **{name: records[name] for name in RECORD_DTYPE.names[2:]},
+    }
+    payload = b''.join(struct.pack('<I', len(block)) + block
+                       for block in (zlib.compress(_shuffle(columns[name]), level) for name in RECORD_DTYPE.names))
+    names = json.dumps(header).encode()
+    return _CHUNK.pack(b'CHNK', len(records), int(times[0]), int(times[-1]), len(names), len(payload)) + names + payload
+
+
+def _decode(payload, count, first):
+    records = np.empty(count, dtype=RECORD_DTYPE)
+    offset = 0
+    for name in RECORD_DTYPE.names:
+        (size,) = struct.unpack_from('<I', payload, offset)
+        raw = zlib.decompress(payload[offset + 4:offset + 4 + size])
+        offset += 4 + size
+        records[name] = _unshuffle(raw, RECORD_DTYPE[name], count)
+    records['time'][0] = first
+    records['time'] = np.cumsum(records['time'])
+    records['start'] = records['time'] - records['start']
+    return records
+
+
+def _nanoseconds(value):
+    return None if value is None else pd.Timestamp(value).value
+
+
+class SessionWriter:
+    """Appends ticks and bars to a recording, one compressed chunk at a time.
+
+    Records must arrive in time order. attach() records everything a
+    BarAggregator sees: each tick before it is folded in, then any bars it
+    completes, stamped with that tick's time. A writer is single-threaded.
+    Call close() (or use it as a context manager) to write the index.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, level=COMPRESSION_LEVEL):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.level = level
+        self.pairs = []
+        self.timeframes = []
+        self.chunks = []
+        self.count = 0
+        self.last_time = None
+        self._codes = {}
+        self._rows = []
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _code(self, pair):
+        code = self._codes.get(pair)
+        if code is None:
+            code = self._codes[pair] = len(self.pairs)
+            self.pairs.append(pair)
+        return code
+
+    def _check(self, timestamp):
+        if self.last_time is not None and timestamp < self.last_time:
+            raise ValueError("Records must be written in time order")
+        self.last_time = timestamp
+
+    def tick(self, tick):
+        """Record one ingestion Tick"""
+        self._check(tick.timestamp)
+        self._rows.append((tick.timestamp, tick.timestamp, self._code(tick.pair), TICK,
+                           tick.bid, tick.ask, tick.volume, 0.0, 0.0))
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def bar(self, pair, timeframe, bar):
+        """Record one completed bar ([start, open, high, low, close, volume]) at the last tick's time"""
+        if timeframe not in self.timeframes:
+            self.timeframes.append(timeframe)
+        self._rows.append((self.last_time if self.last_time is not None else int(bar[0]), int(bar[0]),
+                           self._code(pair), KINDS[timeframe], *map(float, bar[1:6])))
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def attach(self, aggregator):
+        """Record every tick and completed bar of an ingestion BarAggregator"""
+        aggregator.subscribe_ticks(self.tick)
+        aggregator.subscribe(self.bar)
+
+    def write(self, records, pairs):
+        """Record a RECORD_DTYPE array in time order, its pair codes indexing pairs"""
+        if not len(records):
+            return
+        self.flush()
+        codes = np.array([self._code(pair) for pair in pairs], dtype='u2')
+        records = records.copy()
+        records['pair'] = codes[records['pair']]
+        for kind in np.unique(records['kind']).tolist():
+            if kind != TICK and TIMEFRAME_OF[kind] not in self.timeframes:
+                self.timeframes.append(TIMEFRAME_OF[kind])
+        self._check(int(records['time'][0]))
+        if np.any(np.diff(records['time']) < 0):
+            raise ValueError("Records must be written in time order")
+        for start in range(0, len(records), self.chunk_size):
+            self._write_chunk(records[start:start + self.chunk_size])
+        self.last_time = int(records['time'][-1])
+
+    def flush(self):
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self._write_chunk(np.array(rows, dtype=RECORD_DTYPE))
+        self._file.flush()
+
+    def _write_chunk(self, records):
+        offset = self._file.tell()
+        self._file.write(_encode(records, {'pairs': self.pairs, 'timeframes': self.timeframes}, self.level))
+        self.chunks.append([offset, len(records), int(records['time'][0]), int(records['time'][-1])])
+        self.count += len(records)
+
+    def close(self):
+        """Write any buffered records and the index"""
+        if self._file.closed:
+            return
+        self.flush()
+        offset = self._file.tell()
+        index = {'pairs': self.pairs, 'timeframes': self.timeframes, 'count': self.count, 'chunks': self.chunks}
+        self._file.write(json.dumps(index).encode())
+        self._file.write(_FOOTER.pack(offset, FOOTER_MAGIC))
+        self._file.close()
+
+
+class SessionReader:
+    """Random access to a recording through its chunk index"""
+
+    def __init__(self, path, cache_chunks=4):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        index = self._read_index()
+        self.pairs = index['pairs']
+        self.timeframes = index['timeframes']
+        self.chunks = index['chunks']
+        self.count = index['count']
+        self._firsts = [chunk[2] for chunk in self.chunks]
+        self._lasts = [chunk[3] for chunk in self.chunks]
+        self._offsets = np.cumsum([0] + [chunk[1] for chunk in self.chunks])
+        self._cache = OrderedDict()
+        self.cache_chunks = cache_chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._file.close()
+
+    def _read_index(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= len(MAGIC) + _FOOTER.size:
+            self._file.seek(size - _FOOTER.size)
+            offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+            if magic == FOOTER_MAGIC:
+                self._file.seek(offset)
+                return json.loads(self._file.read(size - _FOOTER.size - offset))
+        # No footer: the writer didn't close, so walk the chunk headers that made it to disk
+        chunks, header, offset = [], {'pairs': [], 'timeframes': []}, len(MAGIC)
+        while offset + _CHUNK.size <= size:
+            self._file.seek(offset)
+            magic, count, first, last, names, payload = _CHUNK.unpack(self._file.read(_CHUNK.size))
+            end = offset + _CHUNK.size + names + payload
+            if magic != b'CHNK' or end > size:
+                break
+            header = json.loads(self._file.read(names))
+            chunks.append([offset, count, first, last])
+            offset = end
+        return {**header, 'count': sum(chunk[1] for chunk in chunks), 'chunks': chunks}
+
+    @property
+    def start(self):
+        return pd.Timestamp(self._firsts[0]) if self.chunks else None
+
+    @property
+    def end(self):
+        return pd.Timestamp(self._lasts[-1]) if self.chunks else None
+
+    def chunk(self, i):
+        """Records of chunk i, decompressed (the last few are cached)"""
+        records = self._cache.get(i)
+        if records is not None:
+            self._cache.move_to_end(i)
+            return records
+        offset, count, first, _ = self.chunks[i]
+        self._file.seek(offset)
+        _, _, _, _, names, payload = _CHUNK.unpack(self._file.read(_CHUNK.size))
+        self._file.seek(names, os.SEEK_CUR)
+        records = _decode(self._file.read(payload), count, first)
+        self._cache[i] = records
+        while len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return records
+
+    def seek(self, timestamp):
+        """Position of the first record at or after timestamp: O(log n), one chunk decompressed"""
+        timestamp = _nanoseconds(timestamp)
+        i = bisect_left(self._lasts, timestamp)
+        if i == len(self.chunks):
+            return self.count
+        row = int(np.searchsorted(self.chunk(i)['time'], timestamp, side='left'))
+        return int(self._offsets[i]) + row
+
+    def records(self, start=None, end=None, pairs=None, kinds=None):
+        """RECORD_DTYPE arrays, one per chunk, for records in [start, end) in time order"""
+        position = 0 if start is None else self.seek(start)
+        stop = self.count if end is None else self.seek(end)
+        codes = None if pairs is None else [self.pairs.index(pair) for pair in pairs if pair in self.pairs]
+        i = int(np.searchsorted(self._offsets, position, side='right')) - 1
+        while position < stop and i < len(self.chunks):
+            base = int(self._offsets[i])
+            records = self.chunk(i)[position - base:stop - base]
+            if codes is not None:
+                records = records[np.isin(records['pair'], codes)]
+            if kinds is not None:
+                records = records[np.isin(records['kind'], kinds)]
+            if len(records):
+                yield records
+            position = int(self._offsets[i + 1])
+            i += 1
+
+    def ticks(self, start=None, end=None, pairs=None):
+        """Recorded ticks as a DataFrame with Date, pair, Bid, Ask and Volume"""
+        records = list(self.records(start, end, pairs, [TICK]))
+        records = np.concatenate(records) if records else np.empty(0, dtype=RECORD_DTYPE)
+        return pd.DataFrame({'Date': records['time'].view('datetime64[ns]'),
+                             'pair': np.array(self.pairs, dtype=object)[records['pair']],
+                             'Bid': records['v1'], 'Ask': records['v2'], 'Volume': records['v3']})
+
+    def bars(self, pair, timeframe, start=None, end=None):
+        """Recorded bars of one pair and timeframe, shaped like the ingestion ring buffers' snapshots"""
+        records = list(self.records(start, end, [pair], [KINDS[timeframe]]))
+        records = np.concatenate(records) if records else np.empty(0, dtype=RECORD_DTYPE)
+        return pd.DataFrame({'Date': records['start'].view('datetime64[ns]'), 'Open': records['v1'],
+                             'High': records['v2'], 'Low': records['v3'], 'Close': records['v4'],
+                             'Volume': records['v5']})
+
+    def summary(self):
+        """Record counts per pair and kind, plus the time span"""
+        counts = {}
+        for records in self.records():
+            kinds, sizes = np.unique(records['pair'].astype('i8') * 256 + records['kind'], return_counts=True)
+            for key, size in zip(kinds.tolist(), sizes.tolist()):
+                counts[key] = counts.get(key, 0) + size
+        rows = [{'pair': self.pairs[key // 256], 'kind': 'tick' if key % 256 == TICK else TIMEFRAME_OF[key % 256],
+                 'records': size} for key, size in sorted(counts.items())]
+        return {'path': self.path, 'start': self.start, 'end': self.end, 'records': self.count,
+                'chunks': len(self.chunks), 'bytes': os.path.getsize(self.path),
+                'counts': pd.DataFrame(rows, columns=['pair', 'kind', 'records'])}
+
+
+class Replay:
+    """Plays a recording back through tick and bar callbacks in recorded order.
+
+    speed=None replays as fast as possible; otherwise recorded time runs
+    speed times faster than the wall clock (1.0 is real time). Callbacks
+    take the live path's shapes: on_tick(Tick) and
+    on_bar(pair, timeframe, [start, open, high, low, close, volume]).
+    """
+
+    def __init__(self, reader, speed=None, start=None, end=None, pairs=None):
+        self.reader = reader
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.pairs = pairs
+        self.now = None
+        self._tick_callbacks = []
+        self._bar_callbacks = []
+
+    def subscribe(self, on_tick=None, on_bar=None):
+        if on_tick is not None:
+            self._tick_callbacks.append(on_tick)
+        if on_bar is not None:
+            self._bar_callbacks.append(on_bar)
+
+    def run(self):
+        """Deliver every record; returns counts plus recorded and wall-clock seconds"""
+        pairs = self.reader.pairs
+        timeframes = [None] + list(TIMEFRAMES)
+        ticks = bars = 0
+        first = None
+        started = time.perf_counter()
+        for records in self.reader.records(self.start, self.end, self.pairs):
+            if first is None:
+                first = int(records['time'][0])
+            columns = [records[name].tolist() for name in RECORD_DTYPE.names]
+            for timestamp, start, pair, kind, v1, v2, v3, v4, v5 in zip(*columns):
+                if self.speed:
+                    delay = started + (timestamp - first) / 1e9 / self.speed - time.perf_counter()
+                    if delay > 0.001:
+                        time.sleep(delay)
+                self.now = timestamp
+                if kind == TICK:
+                    ticks += 1
+                    if self._tick_callbacks:
+                        tick = Tick(pairs[pair], timestamp, v1, v2, v3)
+                        for callback in self._tick_callbacks:
+                            callback(tick)
+                else:
+                    bars += 1
+                    for callback in self._bar_callbacks:
+                        callback(pairs[pair], timeframes[kind], [start, v1, v2, v3, v4, v5])
+        return {'ticks': ticks, 'bars': bars, 'seconds': time.perf_counter() - started,
+                'recorded_seconds': 0.0 if first is None else (self.now - first) / 1e9}
+
+
+class ReplayFeed(FeedAdapter):
+    """Feed adapter replaying a recording's ticks, for an IngestionPipeline"""
+
+    def __init__(self, path, speed=None, start=None, end=None, pairs=None, batch_size=1000):
+        self.path = path
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.pairs = pairs
+        self.batch_size = batch_size
+
+    async def ticks(self):
+        with SessionReader(self.path) as reader:
+            started, first, emitted = time.perf_counter(), None, 0
+            for records in reader.records(self.start, self.end, self.pairs, [TICK]):
+                first = int(records['time'][0]) if first is None else first
+                for timestamp, pair, bid, ask, volume in zip(records['time'].tolist(), records['pair'].tolist(),
+                                                             records['v1'].tolist(), records['v2'].tolist(),
+                                                             records['v3'].tolist()):
+                    yield Tick(reader.pairs[pair], timestamp, bid, ask, volume)
+                    emitted += 1
+                    if emitted % self.batch_size == 0:
+                        delay = 0.0
+                        if self.speed:
+                            delay = max(0.0, started + (timestamp - first) / 1e9 / self.speed - time.perf_counter())
+                        await asyncio.sleep(delay)
+
+
+def replay_trading(reader, timeframe='5m', amount=10000.0, speed=None, start=None, end=None, pairs=None,
+                   window=100, min_bars=50, initial_balance=100000.0):
+    """Replay a recording through the signal and trading paths.
+
+    Each completed bar of timeframe (recorded, or aggregated from the
+    ticks when the recording has none) runs generate_trading_signals over
+    the pair's last window bars. A buy or sell on a flat pair goes to a
+    MatchingEngine as a market entry with its stop and target attached,
+    as execute_trade does, and every tick moves the engine's price so the
+    exits fire on the tick that crosses them. Fills are booked in a
+    PortfolioLedger at recorded time. Returns the signals, fills, ledger
+    and replay counts.
+    """
+    from .matching_engine import MatchingEngine
+    from .portfolio_ledger import PortfolioLedger
+    from .trading_signals import generate_trading_signals
+
+    replay = Replay(reader, speed, start, end, pairs)
+    engine = MatchingEngine()
+    ledger = PortfolioLedger(initial_balance)
+    buffers = {}
+    signals, fills = [], []
+
+    def book(new_fills):
+        for fill in new_fills:
+            ledger.record_fill(fill.pair, fill.side, fill.amount, fill.price, pd.Timestamp(replay.now))
+            fills.append({'time': pd.Timestamp(replay.now), 'pair': fill.pair, 'side': fill.side,
+                          'amount': fill.amount, 'price': fill.price})
+
+    def on_bar(pair, bar_timeframe, bar):
+        if bar_timeframe != timeframe:
+            return
+        buffer = buffers.get(pair)
+        if buffer is None:
+            buffer = buffers[pair] = BarRingBuffer(window)
+        buffer.append(*bar)
+        if len(buffer) < min_bars:
+            return
+        signal = generate_trading_signals(buffer.snapshot())
+        signals.append({'time': pd.Timestamp(replay.now), 'pair': pair, 'action': signal['action'],
+                        'confidence': signal['confidence'], 'entry_price': signal['entry_price'],
+                        'stop_loss': signal['stop_loss'], 'take_profit': signal['take_profit']})
+        position = ledger.positions.get(pair)
+        if signal['action'] in ('buy', 'sell') and (position is None or abs(position.quantity) < 1e-9):
+            _, entry_fills = engine.submit_signal(pair, signal, amount, owner='replay')
+            book(entry_fills)
+
+    def on_tick(tick):
+        price = tick.mid
+        book(engine.update_price(tick.pair, price))
+        ledger.mark(tick.pair, price)
+
+    replay.subscribe(on_tick=on_tick)
+    if timeframe in reader.timeframes:
+        replay.subscribe(on_bar=on_bar)
+    else:
+        aggregator = BarAggregator((timeframe,), capacity=window)
+        aggregator.subscribe(on_bar)
+        replay.subscribe(on_tick=aggregator.add_tick)
+    stats = replay.run()
+    return {
+        'signals': pd.DataFrame(signals, columns=['time', 'pair', 'action', 'confidence', 'entry_price',
+                                                  'stop_loss', 'take_profit']),
+        'fills': pd.DataFrame(fills, columns=['time', 'pair', 'side', 'amount', 'price']),
+        'ledger': ledger,
+        'stats': stats,
+    }
+
+
+def tick_bars(times, mid, volume, timeframe):
+    """Completed bars of one pair's ticks as BarAggregator builds them, vectorized.
+
+    Returns (event times, bucket starts, (bars, 5) OHLCV); a bar's event
+    time is that of the tick opening the next bucket, and the last,
+    still-forming bucket is left out.
+    """
+    bucket_ns = TIMEFRAMES[timeframe][0] * 1_000_000_000
+    buckets = times - times % bucket_ns
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1]) if len(times) else np.zeros(0, 'i8')
+    if len(starts) < 2:
+        return np.zeros(0, 'i8'), np.zeros(0, 'i8'), np.zeros((0, 5))
+    values = np.column_stack([
+        mid[starts],
+        np.maximum.reduceat(mid, starts),
+        np.minimum.reduceat(mid, starts),
+        mid[np.append(starts[1:], len(mid)) - 1],
+        np.add.reduceat(volume, starts),
+    ])[:-1]
+    return times[starts[1:]], buckets[starts[:-1]], values
+
+
+def record_simulated(path, pairs=('EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF'), start=None, hours=24.0,
+                     ticks_per_second=5.0, seed=42, timeframes=('1m', '5m', '1h'), chunk_size=CHUNK_SIZE):
+    """Record a synthetic multi-pair session (generate_ticks) with its bars; returns the record count"""
+    start = pd.Timestamp.now().floor('D') if start is None else pd.Timestamp(start)
+    n_ticks = int(hours * 3600 * ticks_per_second)
+    parts = []
+    for code, pair in enumerate(pairs):
+        ticks = generate_ticks(pair, n_ticks, seed=seed, start=start, ticks_per_second=ticks_per_second)
+        times = ticks['Date'].to_numpy().astype('datetime64[ns]').view('int64')
+        bid, ask = ticks['Bid'].to_numpy(), ticks['Ask'].to_numpy()
+        volume = ticks['Volume'].to_numpy(dtype=float)
+        part = np.zeros(n_ticks, dtype=RECORD_DTYPE)
+        part['time'] = part['start'] = times
+        part['pair'] = code
+        part['v1'], part['v2'], part['v3'] = bid, ask, volume
+        parts.append(part)
+        for timeframe in timeframes:
+            event, bucket, values = tick_bars(times, (bid + ask) / 2, volume, timeframe)
+            part = np.zeros(len(event), dtype=RECORD_DTYPE)
+            part['time'], part['start'], part['pair'], part['kind'] = event, bucket, code, KINDS[timeframe]
+            for j, name in enumerate(('v1', 'v2', 'v3', 'v4', 'v5')):
+                part[name] = values[:, j]
+            parts.append(part)
+    records = np.concatenate(parts)
+    # Time order; at equal times ticks come before the bars they complete
+    records = records[np.lexsort((records['kind'], records['time']))]
+    with SessionWriter(path, chunk_size) as writer:
+        writer.write(records, list(pairs))
+    return len(records)
+
+
+def _print_summary(summary):
+    print(f"{summary['path']}: {summary['records']:,} records in {summary['chunks']} chunks, "
+          f"{summary['bytes'] / 2**20:.1f} MiB, {summary['start']} to {summary['end']}")
+    print(summary['counts'].to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help='record a synthetic session')
+    rec.add_argument('--out', default=os.path.join(DEFAULT_DIR, 'session.fxr'))
+    rec.add_argument('--pairs', nargs='*', default=['EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF'])
+    rec.add_argument('--hours', type=float, default=24.0)
+    rec.add_argument('--rate', type=float, default=5.0, help='ticks per second per pair')
+    rec.add_argument('--start', default=None)
+    rec.add_argument('--seed', type=int, default=42)
+    info = sub.add_parser('info', help='time span and record counts')
+    info.add_argument('path')
+    rep = sub.add_parser('replay', help='replay a recording')
+    rep.add_argument('path')
+    rep.add_argument('--speed', type=float, default=None, help='times real time; omit for max speed')
+    rep.add_argument('--start', default=None)
+    rep.add_argument('--end', default=None)
+    rep.add_argument('--pairs', nargs='*', default=None)
+    rep.add_argument('--trade', action='store_true', help='run the signal and trading paths')
+    rep.add_argument('--timeframe', default='5m', choices=list(TIMEFRAMES))
+    rep.add_argument('--amount', type=float, default=10000.0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        started = time.perf_counter()
+        count = record_simulated(args.out, args.pairs, args.start, args.hours, args.rate, args.seed)
+        print(f"Recorded {count:,} records in {time.perf_counter() - started:.2f}s")
+        with SessionReader(args.out) as reader:
+            _print_summary(reader.summary())
+        return 0
+
+    with SessionReader(args.path) as reader:
+        if args.command == 'info':
+            _print_summary(reader.summary())
+            return 0
+        if not args.trade:
+            stats = Replay(reader, args.speed, args.start, args.end, args.pairs).run()
+        else:
+            result = replay_trading(reader, args.timeframe, args.amount, args.speed, args.start, args.end,
+                                    args.pairs)
+            stats = result['stats']
+            print(result['fills'].to_string(index=False) if len(result['fills']) else "No fills")
+            ledger = result['ledger']
+            print(f"{len(result['signals'])} signals, {len(result['fills'])} fills, "
+                  f"equity {ledger.equity:,.2f}, realized PnL {ledger.realized_pnl:,.2f}")
+    print(f"Replayed {stats['ticks']:,} ticks and {stats['bars']:,} bars "
+          f"({stats['recorded_seconds']:,.0f}s recorded) in {stats['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+from functools import lru_cache
+from statistics import NormalDist
+
+import numpy as np
+
+from .correlation import CorrelationEngine, load_closes
+from .instrumentation import instrument
+from .market_simulator import BASE_PRICES
+
+# Exposure limits are multiples of account equity; VaR is a fraction of it
+DEFAULT_LIMITS = {
+    'risk_per_trade': 0.01,     # equity lost when a sized trade hits its stop
+    'max_pair_leverage': 5.0,   # |position| * price per pair
+    'max_leverage': 10.0,       # sum over pairs of |position| * price
+    'max_var': 0.20,            # one-bar parametric VaR at the engine's confidence
+}
+
+
+def size_positions(equity, entry, stop, risk_per_trade=DEFAULT_LIMITS['risk_per_trade'],
+                   max_pair_leverage=DEFAULT_LIMITS['max_pair_leverage']):
+    """Amounts that lose risk_per_trade of equity if price moves from entry to stop.
+
+    Works elementwise on arrays (e.g. a SignalBatch's entry_price and
+    stop_loss columns); missing or zero stop distances size to 0, and no
+    amount exceeds the per-pair exposure limit.
+    """
+    entry = np.asarray(entry, dtype=float)
+    distance = np.abs(entry - np.asarray(stop, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amount = np.where(distance > 0, equity * risk_per_trade / distance, 0.0)
+        cap = np.where(entry > 0, equity * max_pair_leverage / entry, 0.0)
+    return np.nan_to_num(np.minimum(amount, cap))
+
+
+class RiskEngine(CorrelationEngine):
+    """Return statistics for a pair universe plus pre-trade limit checks.
+
+    A CorrelationEngine over a single window of one-bar simple returns,
+    so each new bar updates the covariance in O(pairs^2) without
+    rescanning history. Portfolio VaR and expected shortfall are computed
+    from an exposure vector (signed position * price per pair), either
+    from the covariance (parametric, normal) or from the stored return
+    matrix (historical), and cached until the returns or exposures change.
+    """
+
+    def __init__(self, pairs, window=250, confidence=0.99, limits=None):
+        super().__init__(pairs, (window,))
+        self.window = window
+        self.confidence = confidence
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._cache = {}
+
+    def _changed(self):
+        super()._changed()
+        self._cache.clear()
+
+    def exposures(self, ledger):
+        """Signed position * mark per pair, in pair order; pairs outside the universe are left out"""
+        exposure = np.zeros(len(self.pairs))
+        for pair, position in ledger.positions.items():
+            column = self.columns.get(pair)
+            if column is not None and position.quantity and position.mark is not None:
+                exposure[column] = position.quantity * position.mark
+        return exposure
+
+    def parametric(self, exposure, confidence=None):
+        """Normal one-bar (VaR, ES) of the portfolio P&L for an exposure vector"""
+        confidence = confidence or self.confidence
+        exposure = np.asarray(exposure, dtype=float)
+        sigma = float(np.sqrt(max(exposure @ self.covariance() @ exposure, 0.0)))
+        mu = float(exposure @ self.mean())
+        z = NormalDist().inv_cdf(confidence)
+        return (sigma * z - mu,
+                sigma * float(np.exp(-z * z / 2) / np.sqrt(2 * np.pi)) / (1 - confidence) - mu)
+
+    def historical(self, exposure, confidence=None):
+        """(VaR, ES) from the portfolio P&L over every stored bar of returns"""
+        confidence = confidence or self.confidence
+        exposure = np.asarray(exposure, dtype=float)
+        if not self.count or not exposure.any():
+            return 0.0, 0.0
+        losses = -(self.returns[:self.count] @ exposure)
+        var = float(np.quantile(losses, confidence))
+        return var, float(losses[losses >= var].mean())
+
+    @instrument()
+    def value_at_risk(self, exposure, method='parametric', confidence=None):
+        """Cached (VaR, ES) for an exposure vector; method is 'parametric' or 'historical'"""
+        exposure = np.asarray(exposure, dtype=float)
+        key = (method, confidence, exposure.tobytes())
+        result = self._cache.get(key)
+        if result is None:
+            result = (self.parametric if method == 'parametric' else self.historical)(exposure, confidence)
+            if len(self._cache) > 256:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+    def report(self, ledger):
+        """Equity, leverage and both VaR/ES estimates for a ledger's open positions"""
+        exposure = self.exposures(ledger)
+        equity = float(ledger.equity)
+        var, es = self.value_at_risk(exposure)
+        hist_var, hist_es = self.value_at_risk(exposure, 'historical')
+        return {
+            'equity': equity,
+            'gross_exposure': float(np.abs(exposure).sum()),
+            'net_exposure': float(exposure.sum()),
+            'leverage': float(np.abs(exposure).sum() / equity) if equity > 0 else float('inf'),
+            'var': var,
+            'es': es,
+            'historical_var': hist_var,
+            'historical_es': hist_es,
+        }
+
+    def size(self, equity, entry, stop):
+        """Amount for one trade under the engine's limits (see size_positions)"""
+        return float(size_positions(equity, entry, stop, self.limits['risk_per_trade'],
+                                    self.limits['max_pair_leverage']))
+
+    @instrument()
+    def check(self, ledger, pair, side, amount, price):
+        """Pre-trade check of a fill against every limit; returns (ok, message)"""
+        limits = self.limits
+        equity = ledger.equity
+        if equity <= 0:
+            return False, "Account has no equity"
+
+        position = ledger.positions.get(pair)
+        quantity = position.quantity if position is not None else 0.0
+        mark = position.mark if position is not None and position.mark is not None else price
+        signed = amount if side == 'buy' else -amount
+
+        pair_exposure = abs(quantity + signed) * price
+        if pair_exposure > limits['max_pair_leverage'] * equity and pair_exposure > abs(quantity) * price:
+            return False, (f"{pair} exposure {pair_exposure:,.2f} would exceed "
+                           f"{limits['max_pair_leverage']:g}x equity")
+
+        # Gross exposure changes only in this pair, so reuse the ledger's other positions
+        exposure = self.exposures(ledger)
+        gross = np.abs(exposure).sum() - abs(quantity) * mark + pair_exposure
+        if gross > limits['max_leverage'] * equity and pair_exposure > abs(quantity) * price:
+            return False, f"Gross exposure {gross:,.2f} would exceed {limits['max_leverage']:g}x equity"
+
+        column = self.columns.get(pair)
+        if column is not None and self.count >= 2:
+            before = self.value_at_risk(exposure)[0]
+            exposure[column] = (quantity + signed) * price
+            var = self.value_at_risk(exposure)[0]
+            if var > limits['max_var'] * equity and var > before:
+                return False, f"VaR {var:,.2f} would exceed {limits['max_var']:.0%} of equity"
+        return True, "Within risk limits"
+
+
+@lru_cache(maxsize=4)
+def _cached_engine(pairs, window):
+    return RiskEngine(pairs, window)
+
+
+def get_risk_engine(pairs=tuple(BASE_PRICES), window=250):
+    """Process-wide risk engine over daily bars, topped up with any bars newer than its last"""
+    engine = _cached_engine(tuple(pairs), window)
+    engine.refresh(*load_closes(pairs, window + 1, '1D'))
+    return engine
@@ -0,0 +1,220 @@
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+# Category codes: each field stores the position of its value in these tuples
+ACTIONS = ('hold', 'buy', 'sell')
+STRENGTHS = ('neutral', 'strong', 'weak')
+TRENDS = ('neutral', 'bullish', 'bearish')
+TREND_STRENGTHS = ('weak', 'strong')
+VOLUME_TRENDS = ('neutral', 'strong_bullish', 'strong_bearish')
+
+CATEGORIES = {
+    'action': ACTIONS,
+    'strength': STRENGTHS,
+    'trend': TRENDS,
+    'trend_strength': TREND_STRENGTHS,
+    'volume_trend': VOLUME_TRENDS,
+}
+
+
+class Reason(IntEnum):
+    """Reasons generate_trading_signals can give, in the order it gives them; 0 is unused"""
+    STRONG_TREND = 1
+    STRONG_BUY = 2
+    BULLISH_VOLUME = 3
+    STRONG_SELL = 4
+    BEARISH_VOLUME = 5
+    DOUBLE_TOP = 6
+    DOUBLE_BOTTOM = 7
+    TREND_ALIGNED = 8
+    RSI_OVERSOLD = 9
+    RSI_OVERBOUGHT = 10
+    NEAR_SUPPORT = 11
+    NEAR_RESISTANCE = 12
+
+
+REASON_TEXT = {
+    Reason.STRONG_TREND: "Strong trend detected (ADX: {adx:.1f})",
+    Reason.STRONG_BUY: "Strong buy signal: RSI oversold and MACD bullish crossover",
+    Reason.BULLISH_VOLUME: "High volume confirming bullish move",
+    Reason.STRONG_SELL: "Strong sell signal: RSI overbought and MACD bearish crossover",
+    Reason.BEARISH_VOLUME: "High volume confirming bearish move",
+    Reason.DOUBLE_TOP: "Price pattern detected: Double Top (bearish)",
+    Reason.DOUBLE_BOTTOM: "Price pattern detected: Double Bottom (bullish)",
+    Reason.TREND_ALIGNED: "Trend aligned with signal",
+    Reason.RSI_OVERSOLD: "RSI confirms oversold condition",
+    Reason.RSI_OVERBOUGHT: "RSI confirms overbought condition",
+    Reason.NEAR_SUPPORT: "Price near support level",
+    Reason.NEAR_RESISTANCE: "Price near resistance level",
+}
+
+# At most one of each mutually exclusive group can apply to a signal
+MAX_REASONS = 8
+
+PRICE_FIELDS = ('entry_price', 'stop_loss', 'take_profit')
+METRIC_FIELDS = ('trend', 'trend_strength', 'rsi', 'macd', 'support', 'resistance', 'adx', 'volume_trend')
+
+SIGNAL_DTYPE = np.dtype([
+    ('action', 'i1'), ('strength', 'i1'), ('trend', 'i1'), ('trend_strength', 'i1'),
+    ('volume_trend', 'i1'), ('confidence', 'i2'),
+    ('entry_price', 'f8'), ('stop_loss', 'f8'), ('take_profit', 'f8'),
+    ('rsi', 'f8'), ('macd', 'f8'), ('support', 'f8'), ('resistance', 'f8'), ('adx', 'f8'),
+    ('reasons', 'u1', (MAX_REASONS,)),
+])
+
+
+def _reason_code(text):
+    """Reason for one line of signal reasoning"""
+    if text.startswith("Strong trend detected"):
+        return Reason.STRONG_TREND
+    for reason, template in REASON_TEXT.items():
+        if text == template:
+            return reason
+    raise ValueError(f"No reason code for {text!r}")
+
+
+def render_reasons(codes, adx):
+    """Reasoning text for a row of reason codes"""
+    return [REASON_TEXT[Reason(code)].format(adx=adx) for code in codes if code]
+
+
+def _price(value):
+    return None if np.isnan(value) else value
+
+
+class SignalRecord:
+    """One signal as typed fields, with reasons as codes rendered to text on demand"""
+
+    __slots__ = SIGNAL_DTYPE.names
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_dict(cls, signal):
+        """Record from the dict returned by generate_trading_signals.
+
+        Raises ValueError for reasoning without a Reason code, such as the
+        lines generate_multi_timeframe_signals and dedupe_signals add.
+        """
+        metrics = signal['metrics']
+        fields = {name: metrics[name] for name in METRIC_FIELDS}
+        fields.update({name: np.nan if signal[name] is None else float(signal[name]) for name in PRICE_FIELDS})
+        fields.update(action=signal['action'], strength=signal['strength'],
+                      confidence=signal['confidence'],
+                      reasons=tuple(_reason_code(text) for text in signal['reasoning']))
+        return cls(**fields)
+
+    @property
+    def reasoning(self):
+        return render_reasons(self.reasons, self.adx)
+
+    def to_dict(self):
+        """The generate_trading_signals dict shape"""
+        return {
+            'action': self.action,
+            'strength': self.strength,
+            'entry_price': self.entry_price,
+            'stop_loss': _price(self.stop_loss),
+            'take_profit': _price(self.take_profit),
+            'reasoning': self.reasoning,
+            'metrics': {name: getattr(self, name) for name in METRIC_FIELDS},
+            'confidence': self.confidence,
+        }
+
+    def __repr__(self):
+        return f'SignalRecord({self.action}, confidence={self.confidence}, entry_price={self.entry_price})'
+
+
+class SignalBatch:
+    """Many signals as one NumPy structured array (SIGNAL_DTYPE), optionally labelled.
+
+    Categorical fields hold codes into CATEGORIES and reasons hold Reason
+    codes, so a signal takes SIGNAL_DTYPE.itemsize bytes. Indexing returns
+    a SignalRecord; columns() and to_frame() decode whole columns at once.
+    """
+
+    def __init__(self, records, index=None):
+        self.records = records
+        self.index = pd.RangeIndex(len(records)) if index is None else pd.Index(index)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes
+
+    @classmethod
+    def empty(cls, n, index=None):
+        return cls(np.zeros(n, dtype=SIGNAL_DTYPE), index)
+
+    @classmethod
+    def from_columns(cls, columns, reasons, index=None):
+        """Batch from decoded column arrays (category strings allowed) and an (n, MAX_REASONS) code array"""
+        batch = cls.empty(len(reasons), index)
+        for name in SIGNAL_DTYPE.names[:-1]:
+            values = np.asarray(columns[name])
+            if name in CATEGORIES and values.dtype.kind in 'OUS':
+                values = pd.Categorical(values, categories=CATEGORIES[name]).codes
+            batch.records[name] = values
+        batch.records['reasons'] = reasons
+        return batch
+
+    @classmethod
+    def from_dicts(cls, signals, index=None):
+        """Batch from generate_trading_signals dicts (or a dict of label -> signal)"""
+        if isinstance(signals, dict):
+            index = list(signals) if index is None else index
+            signals = list(signals.values())
+        batch = cls.empty(len(signals), index)
+        for i, signal in enumerate(signals):
+            batch.set(i, SignalRecord.from_dict(signal))
+        return batch
+
+    def set(self, i, record):
+        row = self.records[i]
+        for name in SIGNAL_DTYPE.names[:-1]:
+            value = getattr(record, name)
+            row[name] = CATEGORIES[name].index(value) if name in CATEGORIES else value
+        codes = np.zeros(MAX_REASONS, dtype='u1')
+        codes[:len(record.reasons)] = record.reasons
+        row['reasons'] = codes
+
+    def __getitem__(self, i):
+        row = self.records[i]
+        fields = {name: (CATEGORIES[name][row[name]] if name in CATEGORIES else row[name].item())
+                  for name in SIGNAL_DTYPE.names[:-1]}
+        fields['reasons'] = tuple(Reason(code) for code in row['reasons'] if code)
+        return SignalRecord(**fields)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def get(self, label):
+        """Record for an index label"""
+        return self[self.index.get_loc(label)]
+
+    def reasoning(self):
+        """Reasoning text per signal, rendered now"""
+        return [render_reasons(codes, adx) for codes, adx in zip(self.records['reasons'], self.records['adx'])]
+
+    def columns(self):
+        """Dict of decoded column arrays, one per field except reasons"""
+        return {name: (np.array(CATEGORIES[name], dtype=object)[self.records[name]]
+                       if name in CATEGORIES else self.records[name])
+                for name in SIGNAL_DTYPE.names[:-1]}
+
+    def to_frame(self, reasoning=False):
+        """Decoded columns as a DataFrame; reasoning adds the rendered text"""
+        frame = pd.DataFrame(self.columns(), index=self.index)
+        if reasoning:
+            frame['reasoning'] = self.reasoning()
+        return frame
+
+    def to_dicts(self):
+        """The generate_trading_signals dict for every signal"""
+        return [record.to_dict() for record in self]
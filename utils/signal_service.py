@@ -0,0 +1,360 @@
+"""Headless signal service: trading signals for a pair universe over a local HTTP API.
+
+Run from the repository root:
+
+    python -m utils.signal_service scan --pairs EUR/USD GBP/USD --periods 500
+    python -m utils.signal_service serve --port 8765
+
+Bars for every pair are written into one shared-memory block that the
+worker processes attach to by name, so only a pair index goes out to a
+worker and only the signal dict comes back. Signals are cached per pair
+until that pair gets a new bar, so repeated requests are answered from
+memory (the full-universe JSON is serialized once per update).
+
+Endpoints:
+    GET /signals[?pairs=EUR/USD,GBP/USD]   JSON object of pair -> signal
+    GET /signals/stream[?pairs=...]        NDJSON, one pair per line as it completes
+    GET /health                            pairs, periods, timeframe and cache state
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import shared_memory
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import OHLCV_COLUMNS, get_bar_store
+from .data_generator import load_forex_data
+from .market_simulator import BASE_PRICES, TIMEFRAMES
+from .trading_signals import generate_trading_signals
+
+DEFAULT_PAIRS = tuple(BASE_PRICES)
+
+# Shared block layout: int64 dates then float64 OHLCV, both (pairs, periods[, 5])
+_FIELDS = len(OHLCV_COLUMNS)
+
+
+def _views(buffer, n_pairs, periods):
+    """(dates, bars) arrays laid over a shared-memory buffer"""
+    dates = np.ndarray((n_pairs, periods), dtype='int64', buffer=buffer)
+    bars = np.ndarray((n_pairs, periods, _FIELDS), dtype='float64', buffer=buffer,
+                      offset=dates.nbytes)
+    return dates, bars
+
+
+def _block_size(n_pairs, periods):
+    return n_pairs * periods * 8 * (1 + _FIELDS)
+
+
+_worker_block = None
+_worker_arrays = None
+
+
+def _init_worker(name, n_pairs, periods):
+    """Attach to the shared bars once per worker process"""
+    global _worker_block, _worker_arrays
+    _worker_block = shared_memory.SharedMemory(name=name)
+    _worker_arrays = _views(_worker_block.buf, n_pairs, periods)
+
+
+def _frame(dates, bars, row):
+    data = {'Date': dates[row].view('datetime64[ns]')}
+    for i, name in enumerate(OHLCV_COLUMNS):
+        data[name] = bars[row, :, i]
+    # Copy out of the block so the bars can be rewritten while the signal is computed
+    return pd.DataFrame(data).copy()
+
+
+def _scan_row(row):
+    dates, bars = _worker_arrays
+    return _jsonable(generate_trading_signals(_frame(dates, bars, row)))
+
+
+def _jsonable(value):
+    """Signal dict with numpy scalars as Python values and NaN as None"""
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class SignalService:
+    """Signals for a fixed pair universe, recomputed on a process pool only for pairs with new bars.
+
+    A pair's bars are reloaded when its bar-store row count changes or the
+    timeframe rolls over to a new bar, checked at most once per
+    refresh_interval seconds. max_workers=1 computes in-process, without
+    shared memory.
+    """
+
+    def __init__(self, pairs=DEFAULT_PAIRS, periods=100, timeframe='1D', max_workers=None,
+                 refresh_interval=1.0, store=None):
+        self.pairs = list(pairs)
+        self.rows = {pair: i for i, pair in enumerate(self.pairs)}
+        self.periods = periods
+        self.timeframe = timeframe
+        self.max_workers = max_workers or min(os.cpu_count() or 1, len(self.pairs))
+        self.refresh_interval = refresh_interval
+        self.store = store or get_bar_store()
+
+        self.signals = {}      # pair -> (as_of, signal)
+        self._tokens = {}      # pair -> bar token the loaded bars belong to
+        self._frames = {}      # in-process bars when max_workers == 1
+        self._pending = {}     # pair -> future being computed
+        self._payload = None   # serialized full-universe response
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._block = None
+        self._pool = None
+        if self.max_workers > 1:
+            self._block = shared_memory.SharedMemory(create=True,
+                                                     size=_block_size(len(self.pairs), periods))
+            self._dates, self._bars = _views(self._block.buf, len(self.pairs), periods)
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                             initargs=(self._block.name, len(self.pairs), periods))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._block is not None:
+            self._dates = self._bars = None
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def _token(self, pair):
+        """Changes whenever the pair's latest bars may have changed"""
+        freq = TIMEFRAMES[self.timeframe][1]
+        return self.store.count(pair, self.timeframe), pd.Timestamp.now().floor(freq)
+
+    def refresh(self, force=False):
+        """Reload bars for pairs that have new ones; returns the pairs that changed"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked < self.refresh_interval:
+                return []
+            self._checked = now
+            changed = []
+            for pair in self.pairs:
+                token = self._token(pair)
+                if self._tokens.get(pair) != token:
+                    changed.append((pair, token))
+            if not changed:
+                return []
+
+            # Workers may still be reading rows that are about to be rewritten
+            wait(list(self._pending.values()))
+            for pair, token in changed:
+                self._pending.pop(pair, None)
+                data = load_forex_data(pair, self.periods, self.timeframe, store=self.store)
+                if len(data) != self.periods:
+                    raise ValueError(f"{pair}: expected {self.periods} bars, got {len(data)}")
+                if self._pool is None:
+                    self._frames[pair] = data
+                else:
+                    row = self.rows[pair]
+                    self._dates[row] = pd.to_datetime(data['Date']).to_numpy(dtype='datetime64[ns]').view('int64')
+                    self._bars[row] = data[OHLCV_COLUMNS].to_numpy(dtype='float64')
+                self._tokens[pair] = token
+                self.signals.pop(pair, None)
+            self._payload = None
+            return [pair for pair, _ in changed]
+
+    def _submit(self, pairs):
+        """Futures for the pairs without a cached signal, sharing any already in flight"""
+        futures = {}
+        with self._lock:
+            for pair in pairs:
+                if pair in self.signals or self._pool is None:
+                    continue
+                future = self._pending.get(pair)
+                if future is None:
+                    future = self._pending[pair] = self._pool.submit(_scan_row, self.rows[pair])
+                futures[future] = (pair, self._tokens[pair])
+        return futures
+
+    def _as_of(self, pair):
+        if self._pool is None:
+            return str(self._frames[pair]['Date'].iloc[-1])
+        return str(pd.Timestamp(self._dates[self.rows[pair], -1]))
+
+    def _store(self, pair, token, signal, future=None):
+        """Cache a computed signal unless the pair's bars were reloaded meanwhile"""
+        with self._lock:
+            if future is not None and self._pending.get(pair) is future:
+                del self._pending[pair]
+            if self._tokens.get(pair) == token:
+                self.signals[pair] = (self._as_of(pair), signal)
+                return self.signals[pair]
+            return None, signal
+
+    def iter_signals(self, pairs=None):
+        """Iterator of (pair, as_of, signal): cached pairs first, the rest as they complete.
+
+        Pairs are checked, bars refreshed and work submitted before this
+        returns, so an unknown pair raises KeyError here rather than
+        midway through the iteration.
+        """
+        pairs = self._select(pairs)
+        self.refresh()
+        return self._results(pairs, self._submit(pairs))
+
+    def _results(self, pairs, futures):
+        waiting = {pair for pair, _ in futures.values()}
+        for pair in pairs:
+            if pair not in waiting:
+                cached = self.signals.get(pair)
+                if cached is None:
+                    # max_workers == 1: compute in this thread
+                    with self._lock:
+                        data, token = self._frames[pair], self._tokens[pair]
+                    cached = self._store(pair, token, _jsonable(generate_trading_signals(data)))
+                yield (pair, *cached)
+        while futures:
+            done, _ = wait(list(futures), return_when='FIRST_COMPLETED')
+            for future in done:
+                pair, token = futures.pop(future)
+                yield (pair, *self._store(pair, token, future.result(), future))
+
+    def scan(self, pairs=None):
+        """Dict of pair -> {'as_of', 'signal'} for the requested pairs"""
+        return {pair: {'as_of': as_of, 'signal': signal}
+                for pair, as_of, signal in self.iter_signals(pairs)}
+
+    def payload(self, pairs=None):
+        """JSON bytes for scan(pairs); the full-universe response is cached until bars change"""
+        if pairs is not None:
+            return json.dumps(self.scan(pairs)).encode()
+        self.refresh()
+        payload = self._payload
+        if payload is None:
+            payload = json.dumps(self.scan()).encode()
+            with self._lock:
+                if len(self.signals) == len(self.pairs):
+                    self._payload = payload
+        return payload
+
+    def _select(self, pairs):
+        if pairs is None:
+            return list(self.pairs)
+        unknown = [pair for pair in pairs if pair not in self.rows]
+        if unknown:
+            raise KeyError(f"Unknown pairs: {', '.join(unknown)}")
+        return list(pairs)
+
+    def health(self):
+        with self._lock:
+            return {'pairs': self.pairs, 'periods': self.periods, 'timeframe': self.timeframe,
+                    'workers': self.max_workers, 'cached': len(self.signals),
+                    'pending': len(self._pending)}
+
+
+class _SignalHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        pairs = query['pairs'][0].split(',') if 'pairs' in query else None
+        try:
+            if url.path == '/signals':
+                self._send(self.service.payload(pairs), 'application/json')
+            elif url.path == '/signals/stream':
+                self._stream(pairs)
+            elif url.path == '/health':
+                self._send(json.dumps(self.service.health()).encode(), 'application/json')
+            else:
+                self.send_error(404)
+        except (KeyError, ValueError) as e:
+            # Unknown pairs, or bars that can't be loaded for them
+            self._send(json.dumps({'error': str(e.args[0])}).encode(), 'application/json', status=400)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, pairs):
+        """Chunked NDJSON, one line per pair, flushed as each signal is ready"""
+        signals = self.service.iter_signals(pairs)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for pair, as_of, signal in signals:
+            line = json.dumps({'pair': pair, 'as_of': as_of, 'signal': signal}).encode() + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(service, port=8765, host='127.0.0.1'):
+    """HTTP server for service; call serve_forever() on the result"""
+    handler = type('SignalHandler', (_SignalHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.protocol_version = 'HTTP/1.1'
+    handler.protocol_version = 'HTTP/1.1'
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['scan', 'serve'])
+    parser.add_argument('--pairs', nargs='*', default=list(DEFAULT_PAIRS))
+    parser.add_argument('--periods', type=int, default=100)
+    parser.add_argument('--timeframe', default='1D', choices=list(TIMEFRAMES))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--refresh', type=float, default=1.0, help='seconds between new-bar checks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ndjson', action='store_true', help='scan: print one line per pair as it completes')
+    args = parser.parse_args(argv)
+
+    with SignalService(args.pairs, args.periods, args.timeframe, args.workers, args.refresh) as service:
+        if args.command == 'scan':
+            if args.ndjson:
+                for pair, as_of, signal in service.iter_signals():
+                    print(json.dumps({'pair': pair, 'as_of': as_of, 'signal': signal}), flush=True)
+            else:
+                json.dump(service.scan(), sys.stdout, indent=2)
+                print()
+            return 0
+
+        server = serve(service, args.port, args.host)
+        print(f"Serving signals for {len(service.pairs)} pairs on http://{args.host}:{args.port}/signals")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Startup helpers: server warm-up, import-time reporting and a cold-start budget.
+
+Run from the repository root:
+
+    python -m utils.startup run [streamlit options]    # warm up, then serve app.py in the same process
+    python -m utils.startup report                     # import times and cold first renders vs the budget
+
+`run` starts the warm-up on a background thread before the Streamlit server
+boots, so the first session finds pandas, plotly and the default pairs'
+data and signals already loaded. Under a plain `streamlit run app.py` the
+same warm-up starts once the first session has rendered the home page.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Seconds; `report` exits with status 1 when a measurement goes over
+STARTUP_BUDGET = {
+    'imports': 2.0,       # importing every module the pages use, in a fresh interpreter
+    'first_render': 1.5,  # a page's first run in a fresh interpreter, after imports
+}
+
+# What the pages import at the top, heaviest third-party modules first
+STARTUP_MODULES = ('pandas', 'numpy', 'streamlit', 'plotly.graph_objects',
+                   'utils.data_generator', 'utils.trading_signals', 'utils.charts',
+                   'utils.trading', 'utils.timeframes', 'utils.risk', 'utils.correlation')
+
+PAGES = ('app.py', 'pages/1_Trading.py', 'pages/2_Analysis.py', 'pages/3_Portfolio.py', 'pages/5_Watchlist.py')
+
+DEFAULT_PAIRS = ('EUR/USD', 'GBP/USD', 'USD/JPY', 'USD/CHF')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_status = {'state': 'idle', 'stages': {}}
+_lock = threading.Lock()
+
+
+def _stage(name, func):
+    started = time.perf_counter()
+    func()
+    _status['stages'][name] = time.perf_counter() - started
+
+
+def _warm_imports():
+    import altair  # noqa: F401  (st.line_chart on the home page)
+    import pandas  # noqa: F401
+    import plotly.graph_objects as go
+    import plotly.io
+
+    # The first figure loads plotly's trace validators, the first to_json its encoders
+    fig = go.Figure(go.Candlestick(x=[0, 1], open=[1, 1], high=[1, 1], low=[1, 1], close=[1, 1]))
+    fig.add_trace(go.Scatter(x=[0, 1], y=[1, 1]))
+    fig.add_trace(go.Bar(x=[0, 1], y=[1, 1]))
+    fig.add_hline(y=1, line_dash='dash', annotation_text='level')
+    fig.update_layout(title='warm-up', template='plotly_dark')
+    plotly.io.to_json(fig.to_dict())
+
+
+def _warm_data(pairs, periods, timeframe):
+    from .data_generator import load_forex_data
+    from .indicator_cache import indicator_cache
+    from .trading_signals import generate_trading_signals
+
+    for pair in pairs:
+        indicator_cache.compute(load_forex_data(pair, periods, timeframe), generate_trading_signals)
+
+
+def _warm_analysis(pairs):
+    from .timeframes import get_timeframe_pyramid
+
+    for pair in pairs:
+        get_timeframe_pyramid(pair)
+
+
+def _warm_risk(pairs, timeframe):
+    from .correlation import get_correlation_engine
+    from .risk import get_risk_engine
+
+    get_risk_engine(pairs)
+    get_correlation_engine(timeframe=timeframe)
+
+
+def warm_up(pairs=DEFAULT_PAIRS, periods=100, timeframe='1D'):
+    """Load the heavy modules and precompute what the pages show first for the default pairs"""
+    from .instrumentation import span
+
+    with _lock:
+        _status['state'] = 'running'
+    started = time.perf_counter()
+    try:
+        with span('startup.warm_up'):
+            _stage('imports', _warm_imports)
+            _stage('data_and_signals', lambda: _warm_data(pairs, periods, timeframe))
+            _stage('risk_and_correlation', lambda: _warm_risk(pairs, timeframe))
+            _stage('timeframe_pyramids', lambda: _warm_analysis(pairs))
+    except Exception as e:
+        _status['state'] = f'failed: {e}'
+        raise
+    _status['stages']['total'] = time.perf_counter() - started
+    _status['state'] = 'done'
+
+
+def start_warm_up(**kwargs):
+    """Run warm_up once per process on a daemon thread; later calls do nothing"""
+    with _lock:
+        if _status['state'] != 'idle':
+            return False
+        _status['state'] = 'starting'
+    threading.Thread(target=warm_up, kwargs=kwargs, name='warm-up', daemon=True).start()
+    return True
+
+
+def warm_up_status():
+    """State ('idle', 'running', 'done' or the failure) and seconds per completed stage"""
+    return {'state': _status['state'], 'stages': dict(_status['stages'])}
+
+
+def import_report(modules=STARTUP_MODULES, top=15):
+    """Import modules in a fresh interpreter under -X importtime.
+
+    Returns the wall time and the top modules by cumulative and by self
+    time, in seconds, so regressions show which import grew.
+    """
+    code = f"import time; t = time.perf_counter(); import {', '.join(modules)}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                     'self': int(self_us) / 1e6, 'cumulative': int(cumulative_us) / 1e6})
+    top_level = [row for row in rows if row['depth'] == 0]
+    return {
+        'wall': float(result.stdout.strip().splitlines()[-1]),
+        'by_cumulative': sorted(top_level, key=lambda row: row['cumulative'], reverse=True)[:top],
+        'by_self': sorted(rows, key=lambda row: row['self'], reverse=True)[:top],
+    }
+
+
+_RENDER_SNIPPET = """
+import sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+from utils.portfolio_ledger import PortfolioLedger
+at = AppTest.from_file({page!r}, default_timeout=120)
+at.session_state['portfolio'] = PortfolioLedger()
+if {warm}:
+    from utils.startup import warm_up
+    warm_up()
+started = time.perf_counter()
+at.run()
+print(time.perf_counter() - started, len(at.exception))
+"""
+
+
+def first_render(page, warm=False):
+    """Seconds for a page's first run in a fresh interpreter, imports of the harness excluded"""
+    code = _RENDER_SNIPPET.format(root=ROOT, page=os.path.join(ROOT, page), warm=warm)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, errors = result.stdout.strip().splitlines()[-1].split()
+    if int(errors):
+        raise RuntimeError(f"{page} raised on its first run")
+    return float(seconds)
+
+
+def report(pages=PAGES, budget=STARTUP_BUDGET):
+    """Import report plus cold and warmed first renders per page, checked against the budget"""
+    imports = import_report()
+    renders = {page: {'cold': first_render(page), 'warm': first_render(page, warm=True)} for page in pages}
+    over = []
+    if imports['wall'] > budget['imports']:
+        over.append(f"imports took {imports['wall']:.2f}s (budget {budget['imports']:.2f}s)")
+    for page, seconds in renders.items():
+        if seconds['cold'] > budget['first_render']:
+            over.append(f"{page} first render took {seconds['cold']:.2f}s (budget {budget['first_render']:.2f}s)")
+    return {'imports': imports, 'first_render': renders, 'budget': budget, 'over_budget': over}
+
+
+def _print_report(result):
+    imports = result['imports']
+    print(f"Imports: {imports['wall']:.3f}s")
+    for row in imports['by_cumulative']:
+        print(f"  {row['module']:<40} {row['cumulative'] * 1000:9.1f} ms cumulative")
+    print("Slowest single modules:")
+    for row in imports['by_self'][:10]:
+        print(f"  {row['module']:<40} {row['self'] * 1000:9.1f} ms self")
+    print("First render (s):")
+    for page, seconds in result['first_render'].items():
+        print(f"  {page:<40} cold {seconds['cold']:6.3f}   after warm-up {seconds['warm']:6.3f}")
+    for line in result['over_budget']:
+        print(f"OVER BUDGET: {line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='warm up and serve app.py; other options go to streamlit run')
+    run.add_argument('--no-warm-up', action='store_true')
+    rep = sub.add_parser('report', help='import times and first renders against the startup budget')
+    rep.add_argument('--pages', nargs='*', default=list(PAGES))
+    rep.add_argument('--json', action='store_true')
+    rep.add_argument('--import-budget', type=float, default=STARTUP_BUDGET['imports'])
+    rep.add_argument('--render-budget', type=float, default=STARTUP_BUDGET['first_render'])
+    args, extra = parser.parse_known_args(argv)
+
+    if args.command == 'run':
+        if not args.no_warm_up:
+            start_warm_up()
+        from streamlit.web import cli
+        sys.argv = ['streamlit', 'run', os.path.join(ROOT, 'app.py'), *extra]
+        return cli.main()
+
+    result = report(args.pages, {'imports': args.import_budget, 'first_render': args.render_budget})
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_report(result)
+    return 1 if result['over_budget'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import math
+import threading
+from collections import deque
+from functools import lru_cache
+
+import pandas as pd
+
+from . import kernels
+
+
+def _divide(numerator, denominator):
+    """Divide two floats with NumPy semantics for zero and NaN denominators"""
+    if math.isnan(numerator) or math.isnan(denominator):
+        return math.nan
+    if denominator == 0:
+        if numerator == 0:
+            return math.nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class RollingMean:
+    """Rolling mean over a fixed window, matching Series.rolling(window).mean()"""
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+        self._nan_count = 0
+
+    def update(self, value):
+        self._values.append(value)
+        if math.isnan(value):
+            self._nan_count += 1
+        else:
+            self._sum += value
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nan_count -= 1
+            else:
+                self._sum -= old
+
+        if len(self._values) < self.window or self._nan_count:
+            return math.nan
+        return self._sum / self.window
+
+
+class EMA:
+    """Exponential moving average, matching Series.ewm(span, adjust=False).mean()"""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def update(self, value):
+        if math.isnan(self.value):
+            self.value = value
+        else:
+            self.value = self.alpha * value + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RSI:
+    """Relative Strength Index with the same rolling-mean smoothing as calculate_rsi"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._gain = RollingMean(period)
+        self._loss = RollingMean(period)
+        self._prev_close = None
+
+    def update(self, close):
+        # The first bar has no delta; calculate_rsi fills it with zero gain and loss
+        delta = 0.0 if self._prev_close is None else close - self._prev_close
+        self._prev_close = close
+
+        gain = self._gain.update(delta if delta > 0 else 0.0)
+        loss = self._loss.update(-delta if delta < 0 else 0.0)
+        rs = _divide(gain, loss)
+        if math.isnan(rs):
+            return math.nan
+        return 100 - (100 / (1 + rs))
+
+
+class MACD:
+    """MACD line and signal line, matching calculate_macd"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.spans = (fast, slow, signal)
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+
+    def update(self, close):
+        macd = self._fast.update(close) - self._slow.update(close)
+        return macd, self._signal.update(macd)
+
+
+class ADX:
+    """Average Directional Index accumulators, matching calculate_adx"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._tr = RollingMean(period)
+        self._pos_dm = RollingMean(period)
+        self._neg_dm = RollingMean(period)
+        self._dx = RollingMean(period)
+        self._prev_high = None
+        self._prev_low = None
+        self._prev_close = None
+
+    def update(self, high, low, close):
+        # True Range; the first bar only has the high-low range
+        if self._prev_close is None:
+            tr = abs(high - low)
+            pos_dm = neg_dm = 0.0
+        else:
+            tr = max(abs(high - low),
+                     abs(high - self._prev_close),
+                     abs(low - self._prev_close))
+            up_move = high - self._prev_high
+            down_move = self._prev_low - low
+            pos_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+            neg_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+
+        self._prev_high = high
+        self._prev_low = low
+        self._prev_close = close
+
+        tr_smooth = self._tr.update(tr)
+        pos_di = 100 * _divide(self._pos_dm.update(pos_dm), tr_smooth)
+        neg_di = 100 * _divide(self._neg_dm.update(neg_dm), tr_smooth)
+
+        dx = 100 * _divide(abs(pos_di - neg_di), pos_di + neg_di)
+        adx = self._dx.update(dx)
+
+        return adx, pos_di, neg_di
+
+
+class StreamingIndicators:
+    """Stateful indicator engine updated in O(1) per appended bar.
+
+    Keeps running state for the indicators in technical_analysis and
+    trading_signals so a new bar can be folded in without recomputing the
+    whole DataFrame. Values match the batch functions bar for bar.
+    """
+
+    def __init__(self, sma_periods=(20,), ema_periods=(20, 50), rsi_period=14, adx_period=14):
+        self._params = {'sma_periods': sma_periods, 'ema_periods': ema_periods,
+                        'rsi_period': rsi_period, 'adx_period': adx_period}
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        params = self._params
+        self._sma = {period: RollingMean(period) for period in params['sma_periods']}
+        self._ema = {period: EMA(period) for period in params['ema_periods']}
+        self._rsi = RSI(params['rsi_period'])
+        self._macd = MACD()
+        self._adx = ADX(params['adx_period'])
+        self.bars = 0
+        self.first_date = None
+        self.last_date = None
+        self.values = None
+        self.previous = None
+
+    @classmethod
+    def from_dataframe(cls, data, **kwargs):
+        """Build an engine and warm it up with every bar in data"""
+        engine = cls(**kwargs)
+        engine.extend(data)
+        return engine
+
+    def extend(self, data):
+        """Fold every row of an OHLCV DataFrame into the running state"""
+        has_dates = 'Date' in data.columns
+        for row in zip(data['High'].values, data['Low'].values, data['Close'].values,
+                       data['Date'].values if has_dates else [None] * len(data)):
+            high, low, close, date = row
+            self.update({'High': high, 'Low': low, 'Close': close, 'Date': date})
+        return self.values
+
+    def extend_new(self, data):
+        """Fold in only the rows of data dated after the last processed bar"""
+        if self.last_date is not None and 'Date' in data.columns:
+            data = data[data['Date'] > self.last_date]
+        return self.extend(data)
+
+    def sync(self, data):
+        """Bring the engine up to the last bar of data and return the latest values.
+
+        Only the bars dated after last_date are folded in. When data doesn't
+        extend what the engine has seen (it starts on another bar, or holds a
+        different bar at last_date) the engine is rebuilt from data instead,
+        so its values always match the batch functions run on data.
+        """
+        with self.lock:
+            dates = data['Date']
+            if self.last_date is not None and len(data) and dates.iloc[0] == self.first_date:
+                at = dates.searchsorted(pd.Timestamp(self.last_date))
+                if (at < len(data) and dates.iloc[at] == self.last_date
+                        and data['Close'].iloc[at] == self.values['close']):
+                    return self.extend(data.iloc[at + 1:])
+            self._reset()
+            self._warm(data)
+            return self.values
+
+    def _warm(self, data):
+        """Seed the state from a whole history without looping over every bar.
+
+        Rolling windows only depend on their last inputs, so the tail is
+        replayed bar by bar; the EMA carry values before the tail come from
+        the batch kernels.
+        """
+        close = data['Close'].to_numpy(dtype=float)
+        # DX is a rolling mean of values that are themselves rolling means
+        replay = max([*self._sma, self._rsi.period, 2 * self._adx.period]) + 1
+        start = max(len(data) - replay, 0)
+        if start:
+            head = close[:start]
+            for period, ema in self._ema.items():
+                ema.value = kernels.ema(head, period)[-1]
+            fast, slow, signal = self._macd.spans
+            fast_ema, slow_ema = kernels.ema(head, fast), kernels.ema(head, slow)
+            self._macd._fast.value = fast_ema[-1]
+            self._macd._slow.value = slow_ema[-1]
+            self._macd._signal.value = kernels.ema(fast_ema - slow_ema, signal)[-1]
+            self._rsi._prev_close = close[start - 1]
+            self._adx._prev_high = float(data['High'].iloc[start - 1])
+            self._adx._prev_low = float(data['Low'].iloc[start - 1])
+            self._adx._prev_close = close[start - 1]
+            self.bars = start
+        self.first_date = pd.Timestamp(data['Date'].iloc[0]) if len(data) else None
+        self.extend(data.iloc[start:])
+
+    def update(self, bar):
+        """Append one bar (a mapping with High, Low and Close) and return the latest values"""
+        high = float(bar['High'])
+        low = float(bar['Low'])
+        close = float(bar['Close'])
+
+        macd, macd_signal = self._macd.update(close)
+        adx, pos_di, neg_di = self._adx.update(high, low, close)
+
+        values = {
+            'close': close,
+            'sma': {period: sma.update(close) for period, sma in self._sma.items()},
+            'ema': {period: ema.update(close) for period, ema in self._ema.items()},
+            'rsi': self._rsi.update(close),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'adx': adx,
+            'plus_di': pos_di,
+            'minus_di': neg_di,
+        }
+
+        self.previous = self.values
+        self.values = values
+        self.bars += 1
+        if bar.get('Date') is not None:
+            self.last_date = bar['Date']
+        return values
+
+    def trend(self, short_period=20, long_period=50):
+        """Moving average crossover trend, matching identify_trend"""
+        if self.previous is None:
+            return 'neutral'
+        short_ma, long_ma = self.values['ema'][short_period], self.values['ema'][long_period]
+        prev_short, prev_long = self.previous['ema'][short_period], self.previous['ema'][long_period]
+
+        if short_ma > long_ma and prev_short <= prev_long:
+            return 'bullish'
+        elif short_ma < long_ma and prev_short >= prev_long:
+            return 'bearish'
+        return 'neutral'
+
+    def signal_strength(self):
+        """RSI and MACD signals for the latest bar, matching calculate_signal_strength"""
+        rsi = self.values['rsi']
+        macd, signal = self.values['macd'], self.values['macd_signal']
+
+        rsi_signal = 0
+        if rsi < 30:
+            rsi_signal = 1  # Oversold
+        elif rsi > 70:
+            rsi_signal = -1  # Overbought
+
+        macd_signal = 0
+        if self.previous is not None:
+            prev_macd, prev_signal = self.previous['macd'], self.previous['macd_signal']
+            if macd > signal and prev_macd <= prev_signal:
+                macd_signal = 1  # Bullish crossover
+            elif macd < signal and prev_macd >= prev_signal:
+                macd_signal = -1  # Bearish crossover
+
+        return rsi_signal, macd_signal, rsi, macd
+
+
+@lru_cache(maxsize=64)
+def _cached_engine(pair, timeframe, periods):
+    return StreamingIndicators()
+
+
+def get_streaming_indicators(pair, timeframe, data):
+    """Process-wide indicator engine for a pair, timeframe and history length, synced to the last bar of data"""
+    engine = _cached_engine(pair, timeframe, len(data))
+    engine.sync(data)
+    return engine
@@ -1,26 +1,33 @@
 import pandas as pd
 import numpy as np
+from . import kernels
+from .instrumentation import instrument
 
+@instrument()
 def calculate_sma(data, period):
     """Calculate Simple Moving Average"""
-    return data['Close'].rolling(window=period).mean()
+    return pd.Series(kernels.rolling_mean(data['Close'].to_numpy(dtype=float), period),
+                     index=data.index, name='Close')
 
+@instrument()
 def calculate_ema(data, period):
     """Calculate Exponential Moving Average"""
-    return data['Close'].ewm(span=period, adjust=False).mean()
+    return pd.Series(kernels.ema(data['Close'].to_numpy(dtype=float), period),
+                     index=data.index, name='Close')
 
-def calculate_rsi(data, period=14):
-    """Calculate Relative Strength Index"""
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+@instrument()
+def calculate_rsi(data, period=14, rsi_method='sma'):
+    """Calculate Relative Strength Index
 
+    rsi_method='sma' averages gains and losses with a rolling mean;
+    rsi_method='wilder' uses Wilder's recursive smoothing.
+    """
+    return pd.Series(kernels.rsi(data['Close'].to_numpy(dtype=float), period, rsi_method),
+                     index=data.index, name='Close')
+
+@instrument()
 def calculate_macd(data):
     """Calculate MACD (Moving Average Convergence Divergence)"""
-    exp1 = data['Close'].ewm(span=12, adjust=False).mean()
-    exp2 = data['Close'].ewm(span=26, adjust=False).mean()
-    macd = exp1 - exp2
-    signal = macd.ewm(span=9, adjust=False).mean()
-    return macd, signal
+    macd, signal = kernels.macd(data['Close'].to_numpy(dtype=float))
+    return (pd.Series(macd, index=data.index, name='Close'),
+            pd.Series(signal, index=data.index, name='Close'))
@@ -0,0 +1,227 @@
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .data_generator import load_forex_data
+from .indicator_cache import indicator_cache
+from .market_simulator import TIMEFRAMES, generate_market_data
+
+PYRAMID_LEVELS = ('1m', '5m', '15m', '1h', '4h', '1D')
+
+_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _rollup(dates, columns, step):
+    """Aggregate bars (sorted int64 ns dates) into buckets of step ns; returns (dates, columns)"""
+    ids = dates // step
+    starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+    ends = np.append(starts[1:], len(dates)) - 1
+    return ids[starts] * step, {
+        'Open': columns['Open'][starts],
+        'High': np.maximum.reduceat(columns['High'], starts),
+        'Low': np.minimum.reduceat(columns['Low'], starts),
+        'Close': columns['Close'][ends],
+        'Volume': np.add.reduceat(columns['Volume'], starts),
+    }
+
+
+class _Level:
+    """Growable columnar bars for one timeframe; the last row may still be forming"""
+
+    def __init__(self, timeframe, capacity=1024):
+        self.timeframe = timeframe
+        self.step = TIMEFRAMES[timeframe][0] * 1_000_000_000
+        self.dates = np.empty(capacity, dtype='int64')
+        self.columns = {name: np.empty(capacity) for name in _FIELDS}
+        self.size = 0
+        self.version = 0
+
+    def write(self, start, dates, columns):
+        """Overwrite rows from start onwards with the given bars, dropping any rows after them"""
+        stop = start + len(dates)
+        if stop > len(self.dates):
+            capacity = max(stop, 2 * len(self.dates))
+            self.dates = np.concatenate([self.dates[:start], np.empty(capacity - start, dtype='int64')])
+            self.columns = {name: np.concatenate([values[:start], np.empty(capacity - start)])
+                            for name, values in self.columns.items()}
+        self.dates[start:stop] = dates
+        for name in _FIELDS:
+            self.columns[name][start:stop] = columns[name]
+        self.size = stop
+        self.version += 1
+
+
+class TimeframePyramid:
+    """1m bars rolled up incrementally into every higher timeframe.
+
+    Each level is built from the level directly below it. When bars are
+    appended, a level only re-aggregates its bucket that was still forming
+    plus any new ones, reading at most one bucket's worth of rows from the
+    level below, so an update never rescans the raw history. Bucket
+    boundaries are aligned to the epoch, so every level nests in the next.
+    """
+
+    def __init__(self, levels=PYRAMID_LEVELS, pair=None):
+        self.pair = pair
+        self.levels = {tf: _Level(tf) for tf in levels}
+        self.order = list(levels)
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.levels[self.order[0]].size
+
+    @property
+    def last_date(self):
+        base = self.levels[self.order[0]]
+        return pd.Timestamp(base.dates[base.size - 1]) if base.size else None
+
+    def append(self, data):
+        """Add base-timeframe bars (Date plus OHLCV) newer than, or replacing, the last one"""
+        if len(data) == 0:
+            return
+        dates = pd.to_datetime(data['Date']).to_numpy(dtype='datetime64[ns]').view('int64')
+        columns = {name: data[name].to_numpy(dtype=float) for name in _FIELDS}
+        with self._lock:
+            self._append(dates, columns)
+
+    def append_bar(self, timestamp, open_, high, low, close, volume):
+        """Add one base bar given its bucket start in int64 nanoseconds"""
+        with self._lock:
+            base = self.levels[self.order[0]]
+            if base.size and timestamp <= base.dates[base.size - 1]:
+                columns = {'Open': [open_], 'High': [high], 'Low': [low], 'Close': [close], 'Volume': [volume]}
+                self._append(np.array([timestamp], dtype='int64'),
+                             {name: np.asarray(values, dtype=float) for name, values in columns.items()})
+                return
+
+            # A brand-new bar extends or opens exactly one bucket per level
+            # with its own values, so no level needs re-aggregating
+            for timeframe in self.order:
+                level = self.levels[timeframe]
+                bucket = timestamp // level.step * level.step
+                last = level.size - 1
+                if level.size and level.dates[last] == bucket:
+                    columns = level.columns
+                    columns['High'][last] = max(columns['High'][last], high)
+                    columns['Low'][last] = min(columns['Low'][last], low)
+                    columns['Close'][last] = close
+                    columns['Volume'][last] += volume
+                    level.version += 1
+                else:
+                    level.write(level.size, [bucket], {'Open': open_, 'High': high, 'Low': low,
+                                                       'Close': close, 'Volume': volume})
+
+    def _append(self, dates, columns):
+        base = self.levels[self.order[0]]
+        if np.any(np.diff(dates) <= 0):
+            raise ValueError("Bar timestamps must be strictly increasing")
+        # A bar with the last stored timestamp is an update of that (forming) bar
+        start = base.size
+        if base.size and dates[0] <= base.dates[base.size - 1]:
+            start = np.searchsorted(base.dates[:base.size], dates[0])
+            if start != base.size - 1 or base.dates[start] != dates[0]:
+                raise ValueError("Only the last bar can be replaced")
+        base.write(start, dates, columns)
+
+        dirty, lower = start, base
+        for timeframe in self.order[1:]:
+            level = self.levels[timeframe]
+            # First bucket touched by the change, and the rows below it that feed it
+            bucket = lower.dates[dirty] // level.step * level.step
+            first_row = np.searchsorted(lower.dates[:lower.size], bucket)
+            rows = slice(first_row, lower.size)
+            new_dates, new_columns = _rollup(lower.dates[rows],
+                                             {name: values[rows] for name, values in lower.columns.items()},
+                                             level.step)
+            dirty = np.searchsorted(level.dates[:level.size], bucket)
+            level.write(dirty, new_dates, new_columns)
+            lower = level
+
+    def frame(self, timeframe, n=None, include_forming=True):
+        """Bars of one level as a DataFrame; cached until the level changes.
+
+        The frame owns its data, so it can be handed to the indicator cache
+        and stays valid while later updates rewrite the level.
+        """
+        with self._lock:
+            level = self.levels[timeframe]
+            key = (timeframe, n, include_forming)
+            cached = self._views.get(key)
+            if cached is not None and cached[0] == level.version:
+                return cached[1]
+            stop = level.size if include_forming else max(level.size - 1, 0)
+            start = 0 if n is None else max(stop - n, 0)
+            view = pd.DataFrame({'Date': pd.to_datetime(level.dates[start:stop].copy())})
+            for name in _FIELDS:
+                view[name] = level.columns[name][start:stop].copy()
+            self._views[key] = (level.version, view)
+            return view
+
+    def frames(self, timeframes=None, n=None):
+        return {tf: self.frame(tf, n) for tf in (timeframes or self.order)}
+
+    def compute(self, timeframe, func, *args, n=None, **kwargs):
+        """func(frame, ...) for one level, shared through the indicator cache"""
+        return indicator_cache.compute(self.frame(timeframe, n), func, *args, **kwargs)
+
+    def on_bar(self, pair, timeframe, bar):
+        """BarAggregator subscriber: feed completed base-timeframe bars for this pyramid's pair"""
+        if timeframe == self.order[0] and self.pair in (None, pair):
+            self.append_bar(*bar)
+
+
+def build_pyramid(data, levels=PYRAMID_LEVELS, pair=None):
+    pyramid = TimeframePyramid(levels, pair)
+    pyramid.append(data)
+    return pyramid
+
+
+@lru_cache(maxsize=16)
+def _cached_pyramid(pair, periods):
+    return build_pyramid(load_forex_data(pair, periods, '1m'), pair=pair)
+
+
+_top_up_lock = threading.Lock()
+
+
+def _new_bars(pair, pyramid, periods, now, store):
+    """1m bars after the pyramid's last one, up to now.
+
+    With enough stored bars (as load_forex_data decides) they come from the
+    bar store. Otherwise the synthetic walk is continued from the last
+    close, seeded by the last bar's minute so every process draws the same
+    bars; after a gap longer than periods only the latest periods are made.
+    """
+    last_date = pyramid.last_date
+    if store.count(pair, '1m') >= periods:
+        data = store.load(pair, '1m', start=last_date)
+        return data[pd.to_datetime(data['Date']) > last_date]
+    missing = min(int((now - last_date) // pd.Timedelta(minutes=1)), periods)
+    if missing <= 0:
+        return None
+    data = generate_market_data([pair], missing, '1m', seed=int(last_date.value // 60_000_000_000) % 2**32,
+                                end=now)[pair]
+    # generate_market_data starts at the base price; rescale so the walk continues from the last close
+    scale = pyramid.frame(pyramid.order[0], n=1)['Close'].iloc[-1] / data['Open'].iloc[0]
+    data[['Open', 'High', 'Low', 'Close']] *= scale
+    return data
+
+
+def get_timeframe_pyramid(pair, periods=144_000):
+    """Pyramid over the latest 1m bars of a pair (100 days by default), shared by every session.
+
+    The pyramid is built once per process from load_forex_data. Each later
+    call appends only the 1m bars that have completed since its last one,
+    so the history is never rescanned; live 1m bars can also be streamed in
+    through its on_bar subscriber.
+    """
+    pyramid = _cached_pyramid(pair, periods)
+    with _top_up_lock:
+        data = _new_bars(pair, pyramid, periods, pd.Timestamp.now().floor('min'), get_bar_store())
+        if data is not None and len(data):
+            pyramid.append(data)
+    return pyramid
@@ -0,0 +1,225 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+DEFAULT_PATH = os.environ.get('FOREX_JOURNAL', os.path.join('data', 'journal.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    pair TEXT NOT NULL,
+    side TEXT NOT NULL,
+    amount REAL NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_account_ts ON trades (account, ts);
+CREATE INDEX IF NOT EXISTS trades_account_pair_ts ON trades (account, pair, ts);
+CREATE TABLE IF NOT EXISTS accounts (
+    account TEXT PRIMARY KEY,
+    balance REAL NOT NULL,
+    buy_count INTEGER NOT NULL,
+    sell_count INTEGER NOT NULL,
+    realized_pnl REAL NOT NULL,
+    updated_at INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS positions (
+    account TEXT NOT NULL,
+    pair TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    average_cost REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    mark REAL,
+    PRIMARY KEY (account, pair)
+);
+"""
+
+INSERT_TRADE = 'INSERT INTO trades (account, ts, pair, side, amount, price) VALUES (?, ?, ?, ?, ?, ?)'
+
+
+class SnapshotConflict(RuntimeError):
+    """Another ledger saved the account since this one was restored or last saved"""
+
+
+def _to_micros(value):
+    return int(pd.Timestamp(value).value // 1000)
+
+
+class TradeJournal:
+    """Durable, append-only trade journal in a local SQLite database.
+
+    Writes are buffered and committed in batches on a single writer
+    connection; reads borrow from a small pool of connections, which WAL
+    mode lets run alongside the writer. One journal is shared by every
+    session in the process (see get_trade_journal).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=200, flush_interval=1.0, pool_size=4):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        columns = [row[1] for row in self._writer.execute('PRAGMA table_info(accounts)')]
+        if 'version' not in columns:
+            self._writer.execute('ALTER TABLE accounts ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        self._write_lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+        self._readers = queue.Queue()
+        for _ in range(pool_size):
+            self._readers.put(self._connect())
+        atexit.register(self.flush)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @contextmanager
+    def _reader(self):
+        connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def append(self, account, timestamp, pair, side, amount, price, version=None):
+        """Queue a trade; it is committed with the next batch.
+
+        A trade queued with the snapshot version of the ledger that made it
+        is dropped instead if the account has been saved at another version
+        by then: that ledger lost a SnapshotConflict.
+        """
+        with self._write_lock:
+            self._pending.append(((account, _to_micros(timestamp), pair, side, float(amount), float(price)),
+                                  version))
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def _write_pending(self):
+        """Insert queued trades; the caller holds the write lock and the transaction"""
+        if self._pending:
+            accounts = {row[0] for row, version in self._pending if version is not None}
+            stored = dict(self._writer.execute(
+                f'SELECT account, version FROM accounts WHERE account IN ({", ".join("?" * len(accounts))})',
+                list(accounts)).fetchall()) if accounts else {}
+            self._writer.executemany(INSERT_TRADE, [row for row, version in self._pending
+                                                    if version is None or stored.get(row[0], 0) == version])
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Commit every queued trade in one transaction"""
+        with self._write_lock:
+            with self._writer:
+                self._write_pending()
+
+    def save_snapshot(self, account, ledger):
+        """Persist the ledger's balances and positions, committing queued trades with them.
+
+        The account row carries a version that each save increments. A save
+        from a ledger holding an older version than the stored one raises
+        SnapshotConflict and writes nothing, so two ledgers restored from
+        the same account can't overwrite each other; the trades that ledger
+        queued are dropped with it. Returns the new version.
+        """
+        with self._write_lock:
+            with self._writer:
+                row = self._writer.execute('SELECT version FROM accounts WHERE account = ?', (account,)).fetchone()
+                if row is not None and row[0] != ledger.version:
+                    self._pending = [(trade, version) for trade, version in self._pending
+                                     if not (trade[0] == account and version == ledger.version)]
+                    raise SnapshotConflict(f"Account {account!r} was saved by another session "
+                                           f"(version {row[0]}, this session has {ledger.version})")
+                self._write_pending()
+                version = ledger.version + 1
+                self._writer.execute(
+                    'INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (account, ledger.balance, ledger.buy_count, ledger.sell_count,
+                     ledger.realized_pnl, _to_micros(datetime.now()), version))
+                self._writer.executemany(
+                    'INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?, ?)',
+                    [(account, p.pair, p.quantity, p.average_cost, p.realized_pnl, p.mark)
+                     for p in ledger.positions.values()])
+        return version
+
+    def load_snapshot(self, account):
+        """Saved balances and positions for an account, or None"""
+        self.flush()
+        with self._reader() as connection:
+            row = connection.execute(
+                'SELECT balance, buy_count, sell_count, realized_pnl, version FROM accounts WHERE account = ?',
+                (account,)).fetchone()
+            if row is None:
+                return None
+            positions = connection.execute(
+                'SELECT pair, quantity, average_cost, realized_pnl, mark FROM positions WHERE account = ?',
+                (account,)).fetchall()
+        return {
+            'balance': row[0],
+            'buy_count': row[1],
+            'sell_count': row[2],
+            'realized_pnl': row[3],
+            'version': row[4],
+            'positions': positions,
+        }
+
+    def _where(self, account, pair, start, end):
+        clauses, params = ['account = ?'], [account]
+        if pair is not None:
+            clauses.append('pair = ?')
+            params.append(pair)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(_to_micros(start))
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(_to_micros(end))
+        return ' AND '.join(clauses), params
+
+    def count(self, account, pair=None, start=None, end=None):
+        """Number of trades matching the filters"""
+        self.flush()
+        where, params = self._where(account, pair, start, end)
+        with self._reader() as connection:
+            return connection.execute(f'SELECT COUNT(*) FROM trades WHERE {where}', params).fetchone()[0]
+
+    def trades(self, account, pair=None, start=None, end=None, limit=100, offset=0, newest_first=True):
+        """One page of trades as a DataFrame, using the (account, pair, ts) indexes"""
+        self.flush()
+        where, params = self._where(account, pair, start, end)
+        order = 'DESC' if newest_first else 'ASC'
+        with self._reader() as connection:
+            rows = connection.execute(
+                f'SELECT ts, pair, side, amount, price FROM trades WHERE {where} '
+                f'ORDER BY ts {order}, id {order} LIMIT ? OFFSET ?',
+                params + [limit, offset]).fetchall()
+
+        frame = pd.DataFrame(rows, columns=['timestamp', 'pair', 'side', 'amount', 'price'])
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='us')
+        frame['value'] = frame['amount'] * frame['price']
+        return frame
+
+
+@lru_cache(maxsize=None)
+def get_trade_journal(path=DEFAULT_PATH):
+    """Process-wide journal shared by every session"""
+    return TradeJournal(path)
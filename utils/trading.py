@@ -1,41 +1,80 @@
 import streamlit as st
 from datetime import datetime
+from .matching_engine import MatchingEngine
+from .instrumentation import instrument
+from .risk import get_risk_engine
+from .trade_journal import SnapshotConflict
 
-def execute_trade(side, amount, price, pair):
-    """Execute a mock trade and update portfolio"""
+def get_matching_engine():
+    """Matching engine for the current session"""
+    if 'matching_engine' not in st.session_state:
+        engine = MatchingEngine()
+        # Positions restored from the journal are the session's too, so exits can close them
+        for pair, position in st.session_state.portfolio.positions.items():
+            engine.positions[(pair, 'session')] = position.quantity
+        st.session_state.matching_engine = engine
+    return st.session_state.matching_engine
+
+def _apply_fill(fill):
+    """Book one of the session's own fills in its portfolio ledger"""
+    st.session_state.portfolio.record_fill(fill.pair, fill.side, fill.amount, fill.price, datetime.now())
+
+def _apply_fills(fills):
+    for fill in fills:
+        if fill.owner == 'session':
+            _apply_fill(fill)
+
+STALE_MESSAGE = "This account was changed by another session; reload the page to continue trading"
+
+def _checkpoint():
+    """Save the session's ledger; stop its trading instead of overwriting when another session saved the account"""
+    try:
+        st.session_state.portfolio.checkpoint()
+    except SnapshotConflict as e:
+        st.warning(f"{e}. {STALE_MESSAGE}.")
+
+@instrument()
+def execute_trade(side, amount, price, pair, stop_loss=None, take_profit=None):
+    """Execute a mock trade through the matching engine and update portfolio"""
     if side not in ['buy', 'sell']:
         raise ValueError("Invalid trade side")
-    
-    cost = amount * price
-    
-    if cost > st.session_state.portfolio['balance']:
-        return False, "Insufficient funds"
-    
-    trade = {
-        'timestamp': datetime.now(),
-        'pair': pair,
-        'side': side,
-        'amount': amount,
-        'price': price,
-        'value': cost
-    }
-    
-    # Update portfolio
-    if side == 'buy':
-        st.session_state.portfolio['balance'] -= cost
-        st.session_state.portfolio['positions'].append(trade)
-    else:  # sell
-        st.session_state.portfolio['balance'] += cost
-    
-    st.session_state.portfolio['history'].append(trade)
+    if st.session_state.portfolio.stale:
+        return False, STALE_MESSAGE
+
+    # The new price may fire existing stop-loss/take-profit exits; book them before sizing this trade
+    check_exit_triggers(pair, price)
+
+    # Exposure, leverage and VaR limits replace the old cash-only check
+    allowed, message = get_risk_engine().check(st.session_state.portfolio, pair, side, amount, price)
+    if not allowed:
+        return False, message
+
+    engine = get_matching_engine()
+    order, fills = engine.submit(pair, side, amount, owner='session')
+    _apply_fills(fills)
+    _checkpoint()
+
+    if order.status != 'filled':
+        return False, f"Order partially filled ({order.filled:g} of {amount:g})"
+
+    if stop_loss is not None or take_profit is not None:
+        exit_side = 'sell' if side == 'buy' else 'buy'
+        engine.attach_exits(pair, exit_side, amount, stop_loss, take_profit, owner='session')
+
     return True, "Trade executed successfully"
 
+@instrument()
+def check_exit_triggers(pair, price):
+    """Feed a new price to the engine and apply any stop-loss/take-profit fills"""
+    if st.session_state.portfolio.stale:
+        return []
+    fills = get_matching_engine().update_price(pair, price)
+    _apply_fills(fills)
+    if fills:
+        _checkpoint()
+    st.session_state.portfolio.mark(pair, price)
+    return fills
+
 def get_portfolio_value():
-    """Calculate total portfolio value including open positions"""
-    total_value = st.session_state.portfolio['balance']
-    
-    for position in st.session_state.portfolio['positions']:
-        # In a real application, we would use current market prices
-        total_value += position['value']
-    
-    return total_value
+    """Calculate total portfolio value, marking open positions to their last known prices"""
+    return st.session_state.portfolio.equity
@@ -1,41 +1,27 @@
 import pandas as pd
 import numpy as np
 from .technical_analysis import calculate_sma, calculate_ema, calculate_rsi, calculate_macd
-
-def calculate_adx(data, period=14):
-    """Calculate Average Directional Index"""
-    high = data['High']
-    low = data['Low']
-    close = data['Close']
-
-    # Calculate True Range
-    tr1 = abs(high - low)
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.DataFrame([tr1, tr2, tr3]).max()
-
-    # Calculate +DM and -DM
-    up_move = high - high.shift()
-    down_move = low.shift() - low
-
-    pos_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0)
-    neg_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0)
-
-    # Calculate smoothed TR and DM
-    tr_smooth = tr.rolling(window=period).mean()
-    pos_dm_smooth = pd.Series(pos_dm).rolling(window=period).mean()
-    neg_dm_smooth = pd.Series(neg_dm).rolling(window=period).mean()
-
-    # Calculate +DI and -DI
-    pos_di = 100 * (pos_dm_smooth / tr_smooth)
-    neg_di = 100 * (neg_dm_smooth / tr_smooth)
-
-    # Calculate ADX
-    dx = 100 * abs(pos_di - neg_di) / (pos_di + neg_di)
-    adx = dx.rolling(window=period).mean()
-
-    return adx, pos_di, neg_di
-
+from .indicator_cache import indicator_cache
+from .levels import build_level_index, nearest_support_resistance
+from . import kernels
+from .instrumentation import instrument
+
+@instrument()
+def calculate_adx(data, period=14, adx_method='sma'):
+    """Calculate Average Directional Index
+
+    adx_method='sma' smooths TR, DM and DX with rolling means;
+    adx_method='wilder' uses Wilder's recursive smoothing.
+    """
+    adx, pos_di, neg_di = kernels.adx(data['High'].to_numpy(dtype=float),
+                                      data['Low'].to_numpy(dtype=float),
+                                      data['Close'].to_numpy(dtype=float),
+                                      period, adx_method)
+    return (pd.Series(adx, index=data.index),
+            pd.Series(pos_di, index=data.index),
+            pd.Series(neg_di, index=data.index))
+
+@instrument()
 def identify_price_patterns(data):
     """Identify common price action patterns"""
     patterns = []
@@ -61,6 +47,7 @@ def identify_price_patterns(data):
 
     return patterns
 
+@instrument()
 def analyze_volume(data):
     """Analyze volume patterns for trend confirmation"""
     volume = data['Volume']
@@ -82,6 +69,7 @@ def analyze_volume(data):
 
     return vol_trend
 
+@instrument()
 def calculate_signal_confidence(signals):
     """Calculate confidence level of trading signals"""
     confidence = 0
@@ -119,15 +107,27 @@ def calculate_signal_confidence(signals):
 
     return confidence, reasons
 
-def generate_trading_signals(data):
-    """Generate comprehensive trading signals with confidence levels"""
+@instrument()
+def generate_trading_signals(data, indicators=None):
+    """Generate comprehensive trading signals with confidence levels
+
+    indicators is an optional StreamingIndicators engine synced to data; its
+    running values replace recomputing trend, RSI, MACD and ADX over the
+    whole series.
+    """
     # Basic trend and indicators
-    trend, short_ma, long_ma = identify_trend(data)
     support, resistance = find_support_resistance(data)
-    rsi_signal, macd_signal, rsi_value, macd_value = calculate_signal_strength(data)
+    if indicators is None:
+        trend, short_ma, long_ma = identify_trend(data)
+        rsi_signal, macd_signal, rsi_value, macd_value = calculate_signal_strength(data)
+        adx = indicator_cache.compute(data, calculate_adx)[0].iloc[-1]
+    else:
+        with indicators.lock:
+            trend = indicators.trend()
+            rsi_signal, macd_signal, rsi_value, macd_value = indicators.signal_strength()
+            adx = indicators.values['adx']
 
     # Advanced indicators
-    adx, plus_di, minus_di = calculate_adx(data)
     volume_trend = analyze_volume(data)
     price_patterns = identify_price_patterns(data)
 
@@ -148,15 +148,15 @@ def generate_trading_signals(data):
             'macd': macd_value,
             'support': support,
             'resistance': resistance,
-            'adx': adx.iloc[-1],
+            'adx': adx,
             'volume_trend': volume_trend
         }
     }
 
     # Trend strength confirmation
-    if adx.iloc[-1] > 25:
+    if adx > 25:
         signal['metrics']['trend_strength'] = 'strong'
-        signal['reasoning'].append(f"Strong trend detected (ADX: {adx.iloc[-1]:.1f})")
+        signal['reasoning'].append(f"Strong trend detected (ADX: {adx:.1f})")
 
     # Signal generation logic
     if trend == 'bullish' and signal['metrics']['trend_strength'] == 'strong':
@@ -192,10 +192,60 @@ def generate_trading_signals(data):
 
     return signal
 
+def trend_direction(data, short_period=20, long_period=50):
+    """Standing trend of a series: 'bullish' while the short EMA is above the long EMA"""
+    short_ma = indicator_cache.compute(data, calculate_ema, short_period)
+    long_ma = indicator_cache.compute(data, calculate_ema, long_period)
+    if len(data) < long_period:
+        return 'neutral'
+    if short_ma.iloc[-1] > long_ma.iloc[-1]:
+        return 'bullish'
+    if short_ma.iloc[-1] < long_ma.iloc[-1]:
+        return 'bearish'
+    return 'neutral'
+
+@instrument()
+def generate_multi_timeframe_signals(frames, entry_timeframe):
+    """Generate trading signals on one timeframe, confirmed by the trend of the others
+
+    frames maps timeframe -> OHLCV DataFrame (e.g. TimeframePyramid.frames()).
+    The entry timeframe produces the usual signal; every other timeframe
+    contributes its standing trend. Each one agreeing with the signal adds
+    10 confidence points and each one against it removes 10. A signal that
+    a majority of the other timeframes oppose is downgraded to weak.
+    """
+    signal = indicator_cache.compute(frames[entry_timeframe], generate_trading_signals)
+    # The cached signal is shared; work on a copy
+    signal = {**signal, 'reasoning': list(signal['reasoning']), 'metrics': dict(signal['metrics'])}
+
+    trends = {tf: trend_direction(data) for tf, data in frames.items() if tf != entry_timeframe}
+    signal['metrics']['timeframe_trends'] = trends
+
+    direction = {'buy': 'bullish', 'sell': 'bearish'}.get(signal['action'])
+    bullish = sum(trend == 'bullish' for trend in trends.values())
+    bearish = sum(trend == 'bearish' for trend in trends.values())
+    signal['metrics']['trend_alignment'] = (bullish - bearish) / len(trends) if trends else 0.0
+
+    if direction is not None:
+        agree = bullish if direction == 'bullish' else bearish
+        oppose = bearish if direction == 'bullish' else bullish
+        signal['confidence'] = max(0, signal['confidence'] + 10 * (agree - oppose))
+        if agree:
+            signal['reasoning'].append(f"{agree} of {len(trends)} other timeframes confirm the {direction} trend")
+        if oppose > len(trends) / 2:
+            signal['strength'] = 'weak'
+            signal['reasoning'].append(f"{oppose} of {len(trends)} other timeframes trend against the signal")
+    elif trends and (bullish == len(trends) or bearish == len(trends)):
+        overall = 'bullish' if bullish else 'bearish'
+        signal['reasoning'].append(f"All other timeframes trend {overall}")
+
+    return signal
+
+@instrument()
 def identify_trend(data, short_period=20, long_period=50):
     """Identify current market trend using moving averages"""
-    short_ma = calculate_ema(data, short_period)
-    long_ma = calculate_ema(data, long_period)
+    short_ma = indicator_cache.compute(data, calculate_ema, short_period)
+    long_ma = indicator_cache.compute(data, calculate_ema, long_period)
 
     trend = 'neutral'
     if short_ma.iloc[-1] > long_ma.iloc[-1] and short_ma.iloc[-2] <= long_ma.iloc[-2]:
@@ -205,20 +255,18 @@ def identify_trend(data, short_period=20, long_period=50):
 
     return trend, short_ma, long_ma
 
-def find_support_resistance(data, window=20):
-    """Calculate dynamic support and resistance levels"""
-    high_roll = data['High'].rolling(window=window, center=True).max()
-    low_roll = data['Low'].rolling(window=window, center=True).min()
-
-    resistance = high_roll.iloc[-1]
-    support = low_roll.iloc[-1]
-
-    return support, resistance
+@instrument()
+def find_support_resistance(data, min_touches=1):
+    """Nearest clustered swing levels below and above the latest close"""
+    index = indicator_cache.compute(data, build_level_index)
+    return nearest_support_resistance(index, data['Close'].iloc[-1], data['Low'].to_numpy(),
+                                      data['High'].to_numpy(), min_touches)
 
+@instrument()
 def calculate_signal_strength(data):
     """Calculate overall signal strength using multiple indicators"""
-    rsi = calculate_rsi(data)
-    macd, signal = calculate_macd(data)
+    rsi = indicator_cache.compute(data, calculate_rsi)
+    macd, signal = indicator_cache.compute(data, calculate_macd)
     
     # RSI conditions
     rsi_signal = 0